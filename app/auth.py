@@ -1,13 +1,29 @@
-import time
-from collections import defaultdict
+import math
 
 from fastapi import Header, HTTPException, Request
 
 from app.config import settings
+from core.rate_limit import MemoryRateLimiter, RateLimiter, SQLiteRateLimiter
 
-# In-memory rate limit: key -> list of request timestamps (sliding window)
-_rate_limit_cache: dict[str, list[float]] = defaultdict(list)
-_rate_limit_window = 60.0  # seconds
+
+def _build_rate_limiter() -> RateLimiter | None:
+    if settings.rate_limit_per_minute <= 0:
+        return None
+    if settings.rate_limit_backend == "sqlite":
+        # Shared by all uvicorn workers on the host, so the limit holds across processes.
+        return SQLiteRateLimiter(
+            settings.rate_limit_path,
+            settings.rate_limit_per_minute,
+            burst=settings.rate_limit_burst,
+        )
+    return MemoryRateLimiter(
+        settings.rate_limit_per_minute,
+        burst=settings.rate_limit_burst,
+        max_keys=settings.rate_limit_max_keys,
+    )
+
+
+rate_limiter = _build_rate_limiter()
 
 
 def require_api_key(
@@ -27,13 +43,12 @@ def check_rate_limit(
     request: Request,
     x_api_key: str | None = Header(None, alias="X-API-Key"),
 ) -> None:
-    if settings.rate_limit_per_minute <= 0:
+    if rate_limiter is None:
         return
-    key = _rate_limit_key(request, x_api_key)
-    now = time.monotonic()
-    window_start = now - _rate_limit_window
-    cache = _rate_limit_cache[key]
-    cache[:] = [t for t in cache if t > window_start]
-    if len(cache) >= settings.rate_limit_per_minute:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    cache.append(now)
+    retry_after = rate_limiter.hit(_rate_limit_key(request, x_api_key))
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
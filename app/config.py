@@ -8,10 +8,34 @@ class Settings(BaseSettings):
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
     qdrant_collection: str = "rag_collection"
+    qdrant_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = False
+    qdrant_timeout: int = 10
+    vector_store_backend: str = "qdrant"
+    local_vector_path: str = ".rag_data/vectors"
+    local_vector_dtype: str = "float32"
+    local_ann_min_points: int = 0
+    local_ann_nprobe: int = 8
+    vector_quantization: str = "none"
+    vector_on_disk: bool = False
+    vector_truncate_dim: int = 0
+    vector_oversampling: float = 2.0
+    vector_rescore: bool = True
 
     embedding_provider: str = "local"
     embedding_model_name: str = "BAAI/bge-small-en"
     embedding_dim: int = 384
+    embedding_batch_max_size: int = 32
+    embedding_batch_max_wait_ms: float = 5.0
+    embedding_cache_size: int = 10000
+    embedding_cache_ttl: float = 3600.0
+    embedding_disk_cache_path: str = ".rag_data/embedding_cache.sqlite"
+    embedding_disk_cache_max_mb: int = 1024
+    onnx_model_path: str = ".rag_data/onnx/bge-small-en"
+    onnx_quantized: bool = True
+    onnx_batch_size: int = 32
+    onnx_intra_op_threads: int = 0
+    onnx_inter_op_threads: int = 1
     openai_api_key: str = ""
     openai_embedding_model: str = "text-embedding-3-small"
 
@@ -19,19 +43,61 @@ class Settings(BaseSettings):
     ollama_model: str = "mistral"
     ollama_timeout: int = 120
 
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = True
+
     retrieval_top_k: int = 5
+    query_batch_max_size: int = 256
+    query_batch_concurrency: int = 4
+    query_coalescing_enabled: bool = True
+    retriever_type: str = "vector"
+    sparse_index_path: str = ".rag_data/bm25_index.sqlite"
+    hybrid_candidate_k: int = 50
     rerank_enabled: bool = False
     rerank_initial_k: int = 20
     reranker_type: str = "keyword"
 
+    context_max_tokens: int = 0
+    context_dedup: bool = True
+    context_select_sentences: bool = False
+    context_tokenizer: str = ""
+
+    answer_cache_enabled: bool = False
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl: float = 3600.0
+    answer_cache_max_entries: int = 1000
+    # One marker file per collection, bumped by ingestion so other processes notice writes.
+    collection_version_dir: str = ".rag_data/collection_versions"
+
     chunk_size: int = 512
     chunk_overlap: int = 50
+    # "chars" or "tokens": the unit of chunk_size and chunk_overlap.
+    chunk_size_unit: str = "chars"
+    chunk_tokenizer: str = ""
     ingest_batch_size: int = 32
+    ingest_queue_size: int = 4
+    ingest_load_concurrency: int = 4
+    ingest_embed_concurrency: int = 1
+    ingest_upsert_concurrency: int = 2
+    ingest_parallel_loading: bool = False
+    ingest_loader_workers: int = 0
+    ingest_loader_timeout: float = 60.0
     ingest_root: str = ""
+    ingest_manifest_path: str = ".rag_data/ingest_manifest.sqlite"
+    ingest_job_store_path: str = ".rag_data/ingest_jobs.sqlite"
+    ingest_job_workers: int = 1
     chunker_type: str = "smart"
 
+    startup_warmup: bool = True
+
     api_key: str = ""
     rate_limit_per_minute: int = 0
+    rate_limit_burst: int = 0
+    rate_limit_backend: str = "memory"
+    rate_limit_path: str = ".rag_data/rate_limits.sqlite"
+    rate_limit_max_keys: int = 1_000_000
 
     class Config:
         env_prefix = ""
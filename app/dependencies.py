@@ -1,55 +1,337 @@
-from app.config import settings
-from core.embeddings.local import LocalEmbedding
-from core.embeddings.openai import OpenAIEmbedding
-from core.retriever.vector import VectorRetriever
-from core.retriever.reranker import BM25Reranker, KeywordReranker, RerankingRetriever
-from core.llm.ollama import OllamaLLM
-from db.vector.qdrant import QdrantVectorStore
-from core.rag_service import RAGService
-from qdrant_client.http.exceptions import UnexpectedResponse
-
-if settings.embedding_provider == "openai":
-    embedding = OpenAIEmbedding(
-        model=settings.openai_embedding_model,
-        api_key=settings.openai_api_key or None,
-    )
-else:
-    embedding = LocalEmbedding(model_name=settings.embedding_model_name)
-
-vector_store = QdrantVectorStore(
-    collection_name=settings.qdrant_collection,
-    host=settings.qdrant_host,
-    port=settings.qdrant_port,
-)
-
-try:
-    vector_store.client.get_collection(settings.qdrant_collection)
-except UnexpectedResponse:
-    vector_store.create_collection(vector_size=settings.embedding_dim)
-
-_vector_retriever = VectorRetriever(embedding, vector_store)
-if settings.rerank_enabled:
-    reranker = (
-        BM25Reranker()
-        if settings.reranker_type == "bm25"
-        else KeywordReranker()
-    )
-    retriever = RerankingRetriever(
-        _vector_retriever,
-        reranker,
-        initial_k=settings.rerank_initial_k,
-        top_k=settings.retrieval_top_k,
-    )
-else:
-    retriever = _vector_retriever
-
-llm = OllamaLLM(
-    model=settings.ollama_model,
-    base_url=settings.ollama_base_url,
-    timeout=settings.ollama_timeout,
-)
-rag_service = RAGService(
-    retriever,
-    llm,
-    top_k=settings.retrieval_top_k,
-)
\ No newline at end of file
+"""Application components, built on first use.
+
+Importing this module is cheap: nothing is constructed and no heavy third-party
+package (sentence-transformers, qdrant-client, ...) is imported until a component is
+first accessed. The API builds what it needs at startup (see `app.main.lifespan`) and
+can warm the embedding model and vector store in the background; scripts only pay for
+the components they touch, e.g. `container.embedding`.
+"""
+import asyncio
+import logging
+import threading
+
+from app.config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+class _lazy:
+    """Like `functools.cached_property`, but built at most once when threads race for it."""
+
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+
+    def __get__(self, container, owner=None):
+        if container is None:
+            return self
+        try:
+            return container.__dict__[self.name]
+        except KeyError:
+            pass
+        with container._locks.setdefault(self.name, threading.RLock()):
+            if self.name not in container.__dict__:
+                container.__dict__[self.name] = self.build(container)
+            return container.__dict__[self.name]
+
+
+class Container:
+    """Builds and owns the app's components. Access any attribute to build it (and its dependencies)."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._locks: dict[str, threading.RLock] = {}
+        # Warmup step -> "pending" | "ok" | error message. Empty until warmup() runs.
+        self.readiness: dict[str, str] = {}
+
+    def built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    @_lazy
+    def http_client(self):
+        from core.http_client import SharedHTTPClient
+
+        s = self.settings
+        return SharedHTTPClient(
+            timeout=s.ollama_timeout,
+            max_connections=s.http_max_connections,
+            max_keepalive_connections=s.http_max_keepalive_connections,
+            keepalive_expiry=s.http_keepalive_expiry,
+            http2=s.http2_enabled,
+        )
+
+    @_lazy
+    def base_embedding(self):
+        s = self.settings
+        if s.embedding_provider == "openai":
+            from core.embeddings.openai import OpenAIEmbedding
+
+            return OpenAIEmbedding(
+                model=s.openai_embedding_model,
+                api_key=s.openai_api_key or None,
+                http=self.http_client,
+            )
+        if s.embedding_provider == "onnx":
+            from core.embeddings.onnx import OnnxEmbedding
+
+            return OnnxEmbedding(
+                s.onnx_model_path,
+                quantized=s.onnx_quantized,
+                batch_size=s.onnx_batch_size,
+                intra_op_threads=s.onnx_intra_op_threads,
+                inter_op_threads=s.onnx_inter_op_threads,
+                max_batch_size=s.embedding_batch_max_size,
+                max_wait_ms=s.embedding_batch_max_wait_ms,
+            )
+        from core.embeddings.local import LocalEmbedding
+
+        return LocalEmbedding(
+            model_name=s.embedding_model_name,
+            max_batch_size=s.embedding_batch_max_size,
+            max_wait_ms=s.embedding_batch_max_wait_ms,
+        )
+
+    @_lazy
+    def embedding(self):
+        from core.embeddings.cache import CachedEmbedding, DiskEmbeddingCache, MemoryEmbeddingCache
+
+        s = self.settings
+        return CachedEmbedding(
+            self.base_embedding,
+            model_name=self._embedding_cache_key(),
+            memory=MemoryEmbeddingCache(
+                max_entries=s.embedding_cache_size,
+                ttl_seconds=s.embedding_cache_ttl,
+            ),
+            disk=(
+                DiskEmbeddingCache(
+                    s.embedding_disk_cache_path,
+                    max_bytes=s.embedding_disk_cache_max_mb * 1024 * 1024,
+                )
+                if s.embedding_disk_cache_path
+                else None
+            ),
+        )
+
+    def _embedding_cache_key(self) -> str:
+        s = self.settings
+        if s.embedding_provider == "openai":
+            return s.openai_embedding_model
+        if s.embedding_provider == "onnx":
+            from core.embeddings.onnx import exported_model_name
+
+            # Close to, but not bit-identical with, the PyTorch vectors: keep them apart in the cache.
+            # Keyed on the model the export was made from, which EMBEDDING_MODEL_NAME need not match.
+            model = exported_model_name(s.onnx_model_path) or s.onnx_model_path
+            return f"{model}:onnx{'-int8' if s.onnx_quantized else ''}"
+        return s.embedding_model_name
+
+    @_lazy
+    def vector_store(self):
+        from db.vector.quantization import QuantizationConfig
+
+        s = self.settings
+        quantization = QuantizationConfig(
+            mode=s.vector_quantization,
+            truncate_dim=s.vector_truncate_dim,
+            on_disk=s.vector_on_disk,
+            oversampling=s.vector_oversampling,
+            rescore=s.vector_rescore,
+        )
+        if s.vector_store_backend == "local":
+            from db.vector.local import LocalVectorStore
+
+            store = LocalVectorStore(
+                collection_name=s.qdrant_collection,
+                path=s.local_vector_path,
+                dtype=s.local_vector_dtype,
+                ann_min_points=s.local_ann_min_points,
+                ann_nprobe=s.local_ann_nprobe,
+                quantization=quantization,
+            )
+        else:
+            from db.vector.qdrant import QdrantVectorStore
+
+            store = QdrantVectorStore(
+                collection_name=s.qdrant_collection,
+                host=s.qdrant_host,
+                port=s.qdrant_port,
+                grpc_port=s.qdrant_grpc_port,
+                prefer_grpc=s.qdrant_prefer_grpc,
+                timeout=s.qdrant_timeout,
+                quantization=quantization,
+            )
+        # Raises while the store is unreachable; nothing is cached, so the next access retries.
+        store.ensure_collection(vector_size=s.embedding_dim)
+        return store
+
+    @_lazy
+    def ingest_manifest(self):
+        from ingestion.manifest import FileManifest
+
+        s = self.settings
+        return FileManifest(s.ingest_manifest_path, namespace=s.qdrant_collection) if s.ingest_manifest_path else None
+
+    @_lazy
+    def sparse_index(self):
+        from db.sparse.bm25 import BM25Index
+
+        s = self.settings
+        return BM25Index(s.sparse_index_path) if s.retriever_type == "hybrid" else None
+
+    def ingestion_pipeline(self):
+        from ingestion.pipeline import IngestionPipeline
+
+        return IngestionPipeline(
+            self.embedding,
+            self.vector_store,
+            manifest=self.ingest_manifest,
+            sparse_index=self.sparse_index,
+            collection_version=self.collection_version,
+        )
+
+    @_lazy
+    def ingest_jobs(self):
+        from ingestion.worker import IngestionJobManager, JobStore
+
+        async def close_vector_store():
+            if self.built("vector_store"):
+                await self.vector_store.aclose()
+
+        return IngestionJobManager(
+            JobStore(self.settings.ingest_job_store_path),
+            pipeline_factory=self.ingestion_pipeline,
+            workers=self.settings.ingest_job_workers,
+            loop_closers=[close_vector_store, self.http_client.aclose],
+        )
+
+    @_lazy
+    def single_flight(self):
+        from core.singleflight import SingleFlight
+
+        return SingleFlight() if self.settings.query_coalescing_enabled else None
+
+    @_lazy
+    def retriever(self):
+        from core.retriever.hybrid import HybridRetriever
+        from core.retriever.reranker import BM25Reranker, KeywordReranker, RerankingRetriever
+        from core.retriever.vector import VectorRetriever
+
+        s = self.settings
+        retriever = VectorRetriever(self.embedding, self.vector_store, single_flight=self.single_flight)
+        if self.sparse_index is not None:
+            retriever = HybridRetriever(retriever, self.sparse_index, candidate_k=s.hybrid_candidate_k)
+        if s.rerank_enabled:
+            reranker = BM25Reranker() if s.reranker_type == "bm25" else KeywordReranker()
+            retriever = RerankingRetriever(
+                retriever,
+                reranker,
+                initial_k=s.rerank_initial_k,
+                top_k=s.retrieval_top_k,
+            )
+        return retriever
+
+    @_lazy
+    def llm(self):
+        from core.llm.ollama import OllamaLLM
+
+        s = self.settings
+        return OllamaLLM(
+            model=s.ollama_model,
+            base_url=s.ollama_base_url,
+            timeout=s.ollama_timeout,
+            http=self.http_client,
+        )
+
+    @_lazy
+    def answer_cache(self):
+        from core.semantic_cache import SemanticCache
+
+        s = self.settings
+        if not s.answer_cache_enabled:
+            return None
+        return SemanticCache(
+            self.embedding,
+            self.vector_store,
+            threshold=s.answer_cache_threshold,
+            ttl_seconds=s.answer_cache_ttl,
+            max_entries=s.answer_cache_max_entries,
+            collection_version=self.collection_version,
+        )
+
+    @_lazy
+    def collection_version(self):
+        from pathlib import Path
+
+        from core.collection_version import CollectionVersion
+
+        s = self.settings
+        return CollectionVersion(Path(s.collection_version_dir) / s.qdrant_collection) if s.collection_version_dir else None
+
+    @_lazy
+    def rag_service(self):
+        from core.prompt.context import ContextBuilder, TokenCounter
+        from core.rag_service import RAGService
+
+        s = self.settings
+        return RAGService(
+            self.retriever,
+            self.llm,
+            top_k=s.retrieval_top_k,
+            cache=self.answer_cache,
+            context_builder=ContextBuilder(
+                TokenCounter(s.context_tokenizer),
+                max_tokens=s.context_max_tokens,
+                dedup=s.context_dedup,
+                select_sentences=s.context_select_sentences,
+            ),
+            single_flight=self.single_flight,
+        )
+
+    def _warm_embedding(self) -> None:
+        warmup = getattr(self.base_embedding, "warmup", None)
+        if warmup is not None:
+            warmup()
+
+    def _warm_query_path(self) -> None:
+        # Builds (and connects) the vector store, retriever and LLM client.
+        self.rag_service
+
+    async def warmup(self) -> None:
+        """Load the embedding model (one dummy encode) and connect the query path, off the event loop."""
+        steps = {"embedding": self._warm_embedding, "query_path": self._warm_query_path}
+        self.readiness.update(dict.fromkeys(steps, "pending"))
+
+        async def run(name, step) -> None:
+            try:
+                await asyncio.to_thread(step)
+                self.readiness[name] = "ok"
+            except Exception as e:
+                logger.exception("warmup step %s failed", name)
+                self.readiness[name] = str(e) or type(e).__name__
+
+        await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+
+    async def aclose(self) -> None:
+        """Close whatever was built."""
+        if self.built("ingest_jobs"):
+            await asyncio.to_thread(self.ingest_jobs.stop)
+        if self.built("vector_store"):
+            await self.vector_store.aclose()
+        if self.built("base_embedding") and hasattr(self.base_embedding, "close"):
+            self.base_embedding.close()
+        if self.built("http_client"):
+            await self.http_client.aclose()
+
+
+container = Container(settings)
+
+
+# Route dependencies. They are plain functions, so FastAPI calls them in its thread
+# pool and a first-use build (or a wait on a running warmup) never blocks the event loop.
+def get_rag_service():
+    return container.rag_service
+
+
+def get_ingest_jobs():
+    return container.ingest_jobs
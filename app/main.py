@@ -1,20 +1,38 @@
+import asyncio
 import logging
 import time
 import uuid
+from contextlib import asynccontextmanager
 
-import httpx
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 
 from app.config import settings
-from app.dependencies import vector_store
+from app.dependencies import container
 from app.routes.query import router as query_router
 from app.routes.ingest import router as ingest_router
+from core.metrics import HTTP_REQUEST_SECONDS, REGISTRY
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container.http_client.start()
+    await asyncio.to_thread(lambda: container.ingest_jobs.start())
+    # The app accepts requests right away; /ready reports when the warmup has finished.
+    warmup = asyncio.create_task(container.warmup()) if settings.startup_warmup else None
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        await container.aclose()
+
+
 app = FastAPI(
     title="RAG API",
     description="Query your documents with retrieval-augmented generation.",
+    lifespan=lifespan,
 )
 
 app.include_router(query_router)
@@ -27,7 +45,13 @@ async def request_logging(request: Request, call_next):
     request.state.request_id = request_id
     start = time.perf_counter()
     response = await call_next(request)
-    duration_ms = (time.perf_counter() - start) * 1000
+    elapsed = time.perf_counter() - start
+    duration_ms = elapsed * 1000
+    # Label by route template (/ingest/jobs/{job_id}), not the raw path, to keep series bounded.
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route is not None else "unmatched", response.status_code
+    ).observe(elapsed)
     logger.info(
         "request_id=%s method=%s path=%s status=%s duration_ms=%.1f",
         request_id, request.method, request.url.path, response.status_code, duration_ms,
@@ -40,18 +64,36 @@ async def root():
     return {"status": "ok", "message": "RAG API. Use POST /query/ with {\"query\": \"your question\"}."}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, stage, reranking, prompt and ingestion metrics."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """200 once the startup warmup has loaded the model and connected the query path, else 503."""
+    readiness = container.readiness
+    is_ready = all(v == "ok" for v in readiness.values())
+    response.status_code = 200 if is_ready else 503
+    return {"status": "ready" if is_ready else "starting", "checks": readiness}
+
+
 @app.get("/health")
 async def health():
     checks = {}
     try:
-        vector_store.client.get_collections()
-        checks["qdrant"] = "ok"
+        vector_store = await asyncio.to_thread(lambda: container.vector_store)
+        await vector_store.ping()
+        checks[settings.vector_store_backend] = "ok"
     except Exception as e:
-        checks["qdrant"] = str(e)
+        checks[settings.vector_store_backend] = str(e)
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            r = await client.get(f"{settings.ollama_base_url.rstrip('/')}/api/tags")
-            checks["ollama"] = "ok" if r.status_code == 200 else f"status={r.status_code}"
+        r = await container.http_client.client.get(
+            f"{settings.ollama_base_url.rstrip('/')}/api/tags",
+            timeout=5.0,
+        )
+        checks["ollama"] = "ok" if r.status_code == 200 else f"status={r.status_code}"
     except Exception as e:
         checks["ollama"] = str(e)
     status = 200 if all(v == "ok" for v in checks.values()) else 503
@@ -6,8 +6,8 @@ from pydantic import BaseModel
 
 from app.auth import check_rate_limit, require_api_key
 from app.config import settings
-from app.dependencies import embedding, vector_store
-from ingestion.pipeline import IngestionPipeline
+from app.dependencies import container
+from ingestion.worker import FINISHED_STATES
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -17,7 +17,30 @@ class IngestRequest(BaseModel):
     path: str
 
 
-@router.post("/")
+class IngestJobResponse(BaseModel):
+    id: str
+    path: str
+    status: str
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    files_discovered: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    chunks: int = 0
+    chunks_per_sec: float = 0.0
+    elapsed_s: float = 0.0
+    error: str | None = None
+
+
+def _get_job(job_id: str):
+    job = container.ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@router.post("/", response_model=IngestJobResponse, status_code=202)
 async def ingest(
     request: Request,
     body: IngestRequest,
@@ -36,11 +59,34 @@ async def ingest(
                 status_code=403,
                 detail="Path must be under configured INGEST_ROOT",
             )
-    pipeline = IngestionPipeline(embedding, vector_store)
-    try:
-        n = await pipeline.run(source)
-        request_id = getattr(request.state, "request_id", "")
-        logger.info("request_id=%s path=%s indexed=%d", request_id, body.path, n)
-        return {"indexed": n}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    job = container.ingest_jobs.submit(str(source))
+    request_id = getattr(request.state, "request_id", "")
+    logger.info("request_id=%s path=%s job_id=%s", request_id, body.path, job.id)
+    return job.to_dict()
+
+
+@router.get("/jobs", response_model=list[IngestJobResponse])
+async def list_jobs(
+    limit: int = 50,
+    _auth: None = Depends(require_api_key),
+):
+    return [job.to_dict() for job in container.ingest_jobs.recent(limit)]
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_job(
+    job_id: str,
+    _auth: None = Depends(require_api_key),
+):
+    return _get_job(job_id).to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestJobResponse)
+async def cancel_job(
+    job_id: str,
+    _auth: None = Depends(require_api_key),
+):
+    job = _get_job(job_id)
+    if job.status in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return container.ingest_jobs.cancel(job_id).to_dict()
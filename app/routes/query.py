@@ -1,10 +1,13 @@
+import json
 import logging
 
-from fastapi import APIRouter, Depends, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from app.auth import check_rate_limit, require_api_key
-from app.dependencies import rag_service
+from app.config import settings
+from app.dependencies import get_rag_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/query", tags=["query"])
@@ -20,9 +23,45 @@ class SourceResponse(BaseModel):
     id: str | None = None
 
 
+class Usage(BaseModel):
+    prompt_tokens: int
+    context_tokens: int
+    raw_context_tokens: int
+
+
 class QueryResponse(BaseModel):
     answer: str
     sources: list[SourceResponse]
+    usage: Usage | None = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1)
+    retrieval_only: bool = False
+
+
+class BatchQueryResult(BaseModel):
+    index: int
+    query: str
+    answer: str | None = None
+    sources: list[SourceResponse]
+    usage: Usage | None = None
+    error: str | None = None
+
+
+def _to_sources(docs) -> list[SourceResponse]:
+    return [
+        SourceResponse(
+            text=doc.payload.get("text", ""),
+            score=doc.score,
+            id=str(doc.id) if doc.id else None,
+        )
+        for doc in docs
+    ]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @router.post("/", response_model=QueryResponse)
@@ -31,19 +70,90 @@ async def query(
     body: QueryRequest,
     _auth: None = Depends(require_api_key),
     _rate: None = Depends(check_rate_limit),
+    rag_service=Depends(get_rag_service),
 ):
     result = await rag_service.answer(body.query)
     request_id = getattr(request.state, "request_id", "")
-    logger.info("request_id=%s query_len=%d sources_count=%d", request_id, len(body.query), len(result["sources"]))
-    sources = [
-        SourceResponse(
-            text=doc.payload.get("text", ""),
-            score=doc.score,
-            id=str(doc.id) if doc.id else None,
-        )
-        for doc in result["sources"]
-    ]
+    usage = result.get("usage") or {}
+    logger.info(
+        "request_id=%s query_len=%d sources_count=%d prompt_tokens=%s raw_context_tokens=%s",
+        request_id, len(body.query), len(result["sources"]), usage.get("prompt_tokens"), usage.get("raw_context_tokens"),
+    )
     return QueryResponse(
         answer=result["answer"],
-        sources=sources,
-    )
\ No newline at end of file
+        sources=_to_sources(result["sources"]),
+        usage=usage or None,
+    )
+
+
+@router.post("/stream")
+async def query_stream(
+    request: Request,
+    body: QueryRequest,
+    _auth: None = Depends(require_api_key),
+    _rate: None = Depends(check_rate_limit),
+    rag_service=Depends(get_rag_service),
+):
+    """Server-sent events: one `sources` event, then `token` events, then `done` with token usage (or `error`)."""
+    request_id = getattr(request.state, "request_id", "")
+
+    async def events():
+        tokens = 0
+        try:
+            async for event in rag_service.answer_stream(body.query):
+                if event["type"] == "sources":
+                    sources = _to_sources(event["sources"])
+                    yield _sse("sources", {"sources": [s.model_dump() for s in sources]})
+                elif event["type"] == "token":
+                    tokens += 1
+                    yield _sse("token", {"token": event["token"]})
+                else:
+                    yield _sse("done", {"usage": event.get("usage")})
+        except Exception as e:
+            logger.exception("request_id=%s stream failed", request_id)
+            yield _sse("error", {"detail": str(e)})
+        logger.info("request_id=%s query_len=%d streamed_tokens=%d", request_id, len(body.query), tokens)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch")
+async def query_batch(
+    request: Request,
+    body: BatchQueryRequest,
+    _auth: None = Depends(require_api_key),
+    _rate: None = Depends(check_rate_limit),
+    rag_service=Depends(get_rag_service),
+):
+    """Newline-delimited JSON: one `BatchQueryResult` per query, in completion order (match on `index`)."""
+    if len(body.queries) > settings.query_batch_max_size:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.query_batch_max_size} queries per batch",
+        )
+    request_id = getattr(request.state, "request_id", "")
+
+    async def lines():
+        done = 0
+        try:
+            async for result in rag_service.answer_batch(
+                body.queries,
+                concurrency=settings.query_batch_concurrency,
+                retrieval_only=body.retrieval_only,
+            ):
+                done += 1
+                item = BatchQueryResult(**{**result, "sources": _to_sources(result["sources"])})
+                yield item.model_dump_json() + "\n"
+        except Exception as e:
+            logger.exception("request_id=%s batch failed", request_id)
+            yield json.dumps({"error": str(e)}) + "\n"
+        logger.info(
+            "request_id=%s batch_size=%d completed=%d retrieval_only=%s",
+            request_id, len(body.queries), done, body.retrieval_only,
+        )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,5 +1,11 @@
+import re
+import uuid
 from abc import ABC, abstractmethod
-from typing import TypedDict
+from typing import Callable, Iterable, Iterator, TypedDict
+
+# Fixed namespace so chunk IDs are stable across runs and machines.
+_CHUNK_NAMESPACE = uuid.UUID("6f1f6c1e-4b8e-4c55-9d6a-2b7f1c0e9a41")
+_SLICE = 1 << 16
 
 
 class Chunk(TypedDict):
@@ -8,6 +14,72 @@ class Chunk(TypedDict):
 
 
 class BaseChunker(ABC):
+    """Chunk sizes are measured with `length` (characters by default; e.g. `TokenCounter(...).count` for tokens)."""
+
+    def __init__(self, chunk_size: int, overlap: int, length: Callable[[str], int] | None = None):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.length = length or len
+
     @abstractmethod
+    def iter_chunks(self, blocks: Iterable[str], metadata: dict | None = None) -> Iterator[Chunk]:
+        """Chunks of the text `"".join(blocks)`, each yielded as soon as it is complete.
+
+        Metadata gets `chunk_index` and `char_offset`, where the chunk starts in that text.
+        """
+
     def chunk(self, text: str, metadata: dict | None = None) -> list[Chunk]:
-        pass
\ No newline at end of file
+        # Slices keep the per-block work (regex matches, copies) small for large texts.
+        return list(self.iter_chunks((text[i : i + _SLICE] for i in range(0, len(text), _SLICE)), metadata))
+
+
+def split_blocks(blocks: Iterable[str], separator: re.Pattern) -> Iterator[tuple[int, str]]:
+    """(offset, piece) for the pieces of `"".join(blocks)` between `separator` matches, without joining the blocks.
+
+    A piece is yielded once the separator after it has been read, so a separator or piece
+    spanning several blocks is handled. Only the unfinished piece is kept; each block is
+    scanned once (plus the end of the piece before it), so the work is linear in the text.
+    `separator` must only match whitespace, after one character of lookbehind at most.
+    """
+    parts: list[str] = []
+    # Last non-space character of the unfinished piece and the whitespace after it:
+    # enough context to find a separator that starts before the new block.
+    tail = ""
+    start = 0  # offset of the unfinished piece
+    consumed = 0  # length of the blocks before this one
+    for block in blocks:
+        if not block:
+            continue
+        window = tail + block
+        window_start = consumed - len(tail)
+        consumed += len(block)
+        matches = list(separator.finditer(window))
+        # A separator touching the end of the text may continue in the next block.
+        if matches and matches[-1].end() == len(window):
+            matches.pop()
+        if not matches:
+            parts.append(block)
+            stripped = block.rstrip()
+            tail = block[len(stripped) - 1 :] if stripped else tail + block
+            continue
+        # The first separator may start inside `tail`, which ends the unfinished piece.
+        cut = matches[0].start() - len(tail)
+        if cut >= 0:
+            parts.append(block[:cut])
+            yield start, "".join(parts)
+        else:
+            yield start, "".join(parts)[:cut]
+        for before, m in zip(matches, matches[1:]):
+            yield window_start + before.end(), window[before.end() : m.start()]
+        rest = window[matches[-1].end() :]
+        start = window_start + matches[-1].end()
+        parts = [rest]
+        stripped = rest.rstrip()
+        tail = rest[max(0, len(stripped) - 1) :]
+    if parts:
+        yield start, "".join(parts)
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Deterministic point ID for a chunk, so re-ingesting overwrites instead of duplicating."""
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{source}\0{text}"))
@@ -1,43 +1,54 @@
-from .base import BaseChunker, Chunk
+import re
+from collections import deque
+from typing import Callable, Iterable, Iterator
+
+from .base import BaseChunker, Chunk, split_blocks
+
+_PARAGRAPH_BREAK = re.compile(r"\n\n")
 
 
 class ParagraphChunker(BaseChunker):
-    def __init__(self, chunk_size: int = 512, overlap: int = 0):
-        self.chunk_size = chunk_size
-        self.overlap = overlap
+    """Merges blank-line separated paragraphs into chunks of up to `chunk_size`; longer paragraphs stay whole."""
+
+    def __init__(self, chunk_size: int = 512, overlap: int = 0, length: Callable[[str], int] | None = None):
+        super().__init__(chunk_size, overlap, length)
 
-    def chunk(self, text: str, metadata: dict | None = None) -> list[Chunk]:
+    def iter_chunks(self, blocks: Iterable[str], metadata: dict | None = None) -> Iterator[Chunk]:
         meta = metadata or {}
-        if not text or not text.strip():
-            return []
-        raw_paras = [p.strip() for p in text.split("\n\n") if p.strip()]
-        if not raw_paras:
-            raw_paras = [text.strip()]
-        merged: list[str] = []
-        buf: list[str] = []
+        join = self.length("\n\n")
+        buf: deque[str] = deque()
+        sizes: deque[int] = deque()
+        offsets: deque[int] = deque()
         buf_len = 0
-        for p in raw_paras:
-            need = len(p) + (2 if buf else 0)
+        # Length of buf counting a separator for every paragraph, as the overlap is measured.
+        overlap_len = 0
+        index = 0
+        for offset, raw in split_blocks(blocks, _PARAGRAPH_BREAK):
+            p = raw.lstrip()
+            offset += len(raw) - len(p)
+            p = p.rstrip()
+            if not p:
+                continue
+            p_len = self.length(p)
+            need = p_len + (join if buf else 0)
             if buf_len + need > self.chunk_size and buf:
-                merged.append("\n\n".join(buf))
-                if self.overlap > 0 and buf:
-                    overlap_paras = []
-                    o_len = 0
-                    for x in reversed(buf):
-                        o_len += len(x) + 2
-                        if o_len > self.overlap:
-                            break
-                        overlap_paras.append(x)
-                    buf = list(reversed(overlap_paras))
-                    buf_len = sum(len(x) + 2 for x in buf)
+                yield {"text": "\n\n".join(buf), "metadata": {**meta, "chunk_index": index, "char_offset": offsets[0]}}
+                index += 1
+                if self.overlap > 0:
+                    while buf and overlap_len > self.overlap:
+                        buf.popleft()
+                        offsets.popleft()
+                        overlap_len -= sizes.popleft()
+                    buf_len = overlap_len
                 else:
-                    buf = []
-                    buf_len = 0
+                    buf.clear()
+                    sizes.clear()
+                    offsets.clear()
+                    buf_len = overlap_len = 0
             buf.append(p)
+            sizes.append(p_len + join)
+            offsets.append(offset)
             buf_len += need
+            overlap_len += p_len + join
         if buf:
-            merged.append("\n\n".join(buf))
-        out: list[Chunk] = []
-        for i, t in enumerate(merged):
-            out.append({"text": t, "metadata": {**meta, "chunk_index": i}})
-        return out
\ No newline at end of file
+            yield {"text": "\n\n".join(buf), "metadata": {**meta, "chunk_index": index, "char_offset": offsets[0]}}
@@ -1,61 +1,90 @@
 import re
-from .base import BaseChunker, Chunk
+from collections import deque
+from typing import Callable, Iterable, Iterator
+
+from .base import BaseChunker, Chunk, split_blocks
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\S+")
+
+
+def _join(segments: Iterable[str], offset: int, meta: dict, index: int) -> Chunk | None:
+    # Pieces of a cut-up sentence can start or end with spaces.
+    text = " ".join(segments)
+    stripped = text.lstrip()
+    offset += len(text) - len(stripped)
+    text = stripped.rstrip()
+    return {"text": text, "metadata": {**meta, "chunk_index": index, "char_offset": offset}} if text else None
 
 
 class SmartChunker(BaseChunker):
-    def __init__(self, chunk_size: int = 512, overlap: int = 50):
-        self.chunk_size = chunk_size
-        self.overlap = overlap
+    """Packs whole sentences into chunks of up to `chunk_size`, repeating up to `overlap` of them in the next chunk."""
 
-    def chunk(self, text: str, metadata: dict | None = None) -> list[Chunk]:
+    def __init__(self, chunk_size: int = 512, overlap: int = 50, length: Callable[[str], int] | None = None):
+        super().__init__(chunk_size, overlap, length)
+
+    def iter_chunks(self, blocks: Iterable[str], metadata: dict | None = None) -> Iterator[Chunk]:
         meta = metadata or {}
-        if not text or not text.strip():
-            return []
-        segments = self._split_sentences(text)
-        chunks: list[Chunk] = []
-        buffer: list[str] = []
+        space = self.length(" ")
+        chars = self.length is len
+        buffer: deque[str] = deque()
+        lengths: deque[int] = deque()
+        offsets: deque[int] = deque()
         current_len = 0
-        for seg in segments:
-            seg_len = len(seg) + 1
-            if current_len + seg_len > self.chunk_size and buffer:
-                chunk_text = " ".join(buffer).strip()
-                if chunk_text:
-                    chunks.append({"text": chunk_text, "metadata": {**meta}})
-                overlap_start = max(0, len(buffer) - self._count_overlap_segments(buffer))
-                buffer = buffer[overlap_start:]
-                current_len = sum(len(s) + 1 for s in buffer)
-            buffer.append(seg)
-            current_len += seg_len
-        if buffer:
-            chunk_text = " ".join(buffer).strip()
-            if chunk_text:
-                chunks.append({"text": chunk_text, "metadata": {**meta}})
-        for i, c in enumerate(chunks):
-            c["metadata"]["chunk_index"] = i
-        return chunks
-
-    def _split_sentences(self, text: str) -> list[str]:
-        text = text.replace("\n", " ").strip()
-        if not text:
-            return []
-        parts = re.split(r"(?<=[.!?])\s+", text)
-        out: list[str] = []
-        for p in parts:
-            if len(p) <= self.chunk_size:
-                out.append(p)
+        index = 0
+        for offset, sentence in split_blocks((b.replace("\n", " ") for b in blocks), _SENTENCE_END):
+            stripped = sentence.lstrip()
+            offset += len(sentence) - len(stripped)
+            sentence = stripped.rstrip()
+            if not sentence:
+                continue
+            # Most sentences fit as they are; skip the generator for them.
+            if chars and len(sentence) <= self.chunk_size:
+                segments = ((0, sentence),)
+            else:
+                segments = self._segments(sentence)
+            for seg_offset, seg in segments:
+                seg_len = self.length(seg) + space
+                if current_len + seg_len > self.chunk_size and buffer:
+                    chunk = _join(buffer, offsets[0], meta, index)
+                    if chunk:
+                        yield chunk
+                        index += 1
+                    # Keep the longest run of trailing sentences that fits in the overlap.
+                    while buffer and current_len > self.overlap:
+                        buffer.popleft()
+                        offsets.popleft()
+                        current_len -= lengths.popleft()
+                buffer.append(seg)
+                lengths.append(seg_len)
+                offsets.append(offset + seg_offset)
+                current_len += seg_len
+        chunk = _join(buffer, offsets[0], meta, index) if buffer else None
+        if chunk:
+            yield chunk
+
+    def _segments(self, sentence: str) -> Iterator[tuple[int, str]]:
+        """(offset in `sentence`, piece) for the pieces of a sentence, cut up if it is longer than a chunk."""
+        if self.length is len:
+            for i in range(0, len(sentence), self.chunk_size - self.overlap):
+                yield i, sentence[i : i + self.chunk_size]
+            return
+        if self.length(sentence) <= self.chunk_size:
+            yield 0, sentence
+            return
+        # Too long in tokens: cut between words instead of mid-token.
+        words: list[str] = []
+        start = size = 0
+        for match in _WORD.finditer(sentence):
+            word = match.group()
+            word_len = self.length(" " + word) if words else self.length(word)
+            if words and size + word_len > self.chunk_size:
+                yield start, " ".join(words)
+                words, size = [], self.length(word)
             else:
-                for i in range(0, len(p), self.chunk_size - self.overlap):
-                    out.append(p[i : i + self.chunk_size])
-        return out
-
-    def _count_overlap_segments(self, buffer: list[str]) -> int:
-        if self.overlap <= 0:
-            return 0
-        count = 0
-        total = 0
-        for s in reversed(buffer):
-            total += len(s) + 1
-            if total > self.overlap:
-                break
-            count += 1
-        return count
\ No newline at end of file
+                size += word_len
+            if not words:
+                start = match.start()
+            words.append(word)
+        if words:
+            yield start, " ".join(words)
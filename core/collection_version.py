@@ -0,0 +1,30 @@
+import os
+import time
+from pathlib import Path
+
+
+class CollectionVersion:
+    """A collection's write marker, shared by every process that uses the collection.
+
+    Writers call `bump()` after changing the collection; readers compare `current()` with
+    a value they saw before. The marker is a file replaced on every bump, so reading it
+    is a single `stat` and works across processes (the API and `scripts/ingest_folder.py`).
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def current(self) -> tuple[int, int] | None:
+        """An opaque token that changes on every bump; None before the first one."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # A bump replaces the file, so the inode changes even within the clock's resolution.
+        return stat.st_ino, stat.st_mtime_ns
+
+    def bump(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        tmp.write_text(str(time.time_ns()))
+        os.replace(tmp, self.path)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[list[str]], list[list[float]]]
+
+
+def _resolve(fut: asyncio.Future, result=None, exc: BaseException | None = None) -> None:
+    if fut.done():
+        return
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        fut.set_result(result)
+
+
+class MicroBatchEncoder:
+    """Runs a blocking encode function on a worker thread, coalescing concurrent calls.
+
+    Each `submit` enqueues its texts; the worker waits up to `max_wait_ms` after the
+    first request for more to arrive (until `max_batch_size` texts are pending), encodes
+    them in one call and hands each caller back its own slice. Callers on any event
+    loop can share one encoder.
+    """
+
+    def __init__(self, encode: EncodeFn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    async def submit(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._ensure_started()
+        self._queue.put((list(texts), loop, fut))
+        return await fut
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            pending = len(item[0])
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while pending < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                pending += len(item[0])
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: list) -> None:
+        batch = [b for b in batch if not b[2].cancelled()]
+        if not batch:
+            return
+        texts = [t for texts, _, _ in batch for t in texts]
+        try:
+            vectors = self.encode(texts)
+        except Exception as e:
+            logger.exception("embedding batch failed batch_size=%d", len(texts))
+            for _, loop, fut in batch:
+                self._deliver(loop, fut, exc=e)
+            return
+        start = 0
+        for texts_i, loop, fut in batch:
+            end = start + len(texts_i)
+            self._deliver(loop, fut, result=vectors[start:end])
+            start = end
+
+    @staticmethod
+    def _deliver(loop, fut, result=None, exc=None) -> None:
+        try:
+            loop.call_soon_threadsafe(_resolve, fut, result, exc)
+        except RuntimeError:
+            # The caller's loop has already been closed; nobody is waiting.
+            pass
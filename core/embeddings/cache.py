@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .base import BaseEmbedding
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def content_hash(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+class MemoryEmbeddingCache:
+    """Bounded LRU with per-entry TTL, keyed by (model name, normalized text)."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: tuple[str, str]) -> list[float] | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, vector = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return vector
+
+    def put(self, key: tuple[str, str], vector: list[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), vector)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class DiskEmbeddingCache:
+    """Persistent SQLite store of float32 vectors keyed by content hash.
+
+    Least recently used rows are evicted once the stored vectors exceed `max_bytes`.
+    """
+
+    _SQL_BATCH = 500
+
+    def __init__(self, path: str | Path, max_bytes: int = 1024 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, accessed REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings(accessed)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        self.size_bytes = int(row[0])
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, list[float]]:
+        found: dict[bytes, list[float]] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), self._SQL_BATCH):
+                part = keys[i : i + self._SQL_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: list[tuple[bytes, list[float]]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, accessed) VALUES (?, ?, ?)", rows
+            )
+            inserted = self._conn.total_changes - before
+            self._conn.commit()
+            if inserted:
+                self.size_bytes += inserted * len(rows[0][1])
+            if self.max_bytes > 0 and self.size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Drop the least recently used rows until we are back under 90% of the budget.
+        target = int(self.max_bytes * 0.9)
+        while self.size_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY accessed LIMIT ?",
+                (self._SQL_BATCH,),
+            ).fetchall()
+            if not rows:
+                self.size_bytes = 0
+                break
+            freed = 0
+            keys = []
+            for key, size in rows:
+                keys.append((key,))
+                freed += size
+                if self.size_bytes - freed <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", keys)
+            self.size_bytes -= freed
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.size_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Wraps an embedding with a memory tier (repeated queries) and a disk tier (re-ingestion)."""
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        model_name: str,
+        memory: MemoryEmbeddingCache | None = None,
+        disk: DiskEmbeddingCache | None = None,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.memory = memory
+        self.disk = disk
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        results: list[list[float] | None] = [None] * len(texts)
+        missing: list[int] = []
+        for i, text in enumerate(texts):
+            vector = self.memory.get((self.model_name, normalize_text(text))) if self.memory else None
+            if vector is None:
+                missing.append(i)
+            else:
+                results[i] = vector
+        self.stats["memory_hits"] += len(texts) - len(missing)
+
+        if missing and self.disk is not None:
+            hashes = {i: content_hash(self.model_name, texts[i]) for i in missing}
+            found = await asyncio.to_thread(self.disk.get_many, list(set(hashes.values())))
+            still_missing = []
+            for i in missing:
+                vector = found.get(hashes[i])
+                if vector is None:
+                    still_missing.append(i)
+                else:
+                    results[i] = vector
+                    self._remember(texts[i], vector)
+            self.stats["disk_hits"] += len(missing) - len(still_missing)
+            missing = still_missing
+
+        if missing:
+            # Embed each distinct text once, even if it repeats within the batch.
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            vectors = await self.inner.embed(unique)
+            by_text = dict(zip(unique, vectors))
+            for i in missing:
+                results[i] = by_text[texts[i]]
+            for text, vector in by_text.items():
+                self._remember(text, vector)
+            if self.disk is not None:
+                items = [(content_hash(self.model_name, t), v) for t, v in by_text.items()]
+                await asyncio.to_thread(self.disk.put_many, items)
+            self.stats["misses"] += len(missing)
+        return results
+
+    def _remember(self, text: str, vector: list[float]) -> None:
+        if self.memory is not None:
+            self.memory.put((self.model_name, normalize_text(text)), vector)
@@ -1,9 +1,36 @@
-from sentence_transformers import SentenceTransformer
+import threading
+
 from .base import BaseEmbedding
+from .batching import MicroBatchEncoder
 
 class LocalEmbedding(BaseEmbedding):
-    def __init__(self, model_name="BAAI/bge-small-en"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name="BAAI/bge-small-en", max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.model_name = model_name
+        # Loaded on first encode (or by warmup()); importing sentence-transformers alone takes seconds.
+        self._model = None
+        self._model_lock = threading.Lock()
+        # Inference runs on a worker thread; concurrent embed() calls are batched together.
+        self._encoder = MicroBatchEncoder(self._encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        return self.model.encode(texts, show_progress_bar=False).tolist()
+
+    def warmup(self) -> None:
+        """Load the model and run one encode so the first request does not pay for it."""
+        self._encode(["warmup"])
 
     async def embed(self, texts):
-        return self.model.encode(texts, show_progress_bar=False).tolist()
\ No newline at end of file
+        return await self._encoder.submit(texts)
+
+    def close(self) -> None:
+        self._encoder.close()
@@ -0,0 +1,128 @@
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .base import BaseEmbedding
+from .batching import MicroBatchEncoder
+
+# Written by scripts/export_onnx.py.
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+POOLING_FILE = "pooling.json"
+
+
+def pool(hidden: np.ndarray, mask: np.ndarray, mode: str = "cls", normalize: bool = True) -> np.ndarray:
+    """Sentence embeddings from token states `hidden` (batch, tokens, dim), as the sentence-transformers Pooling module."""
+    if mode == "cls":
+        out = hidden[:, 0]
+    elif mode == "mean":
+        weights = mask[..., None].astype(hidden.dtype)
+        out = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+    else:
+        raise ValueError(f"unsupported pooling mode {mode!r}")
+    if normalize:
+        out = out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+    return out.astype(np.float32)
+
+
+def exported_model_name(model_path: str | Path) -> str | None:
+    """The model an export was made from, as recorded in its pooling.json; None if not exported yet."""
+    try:
+        return json.loads((Path(model_path) / POOLING_FILE).read_text()).get("model_name")
+    except FileNotFoundError:
+        return None
+
+
+class OnnxEmbedding(BaseEmbedding):
+    """Runs an exported (optionally int8-quantized) ONNX model with ONNX Runtime on CPU.
+
+    Texts are tokenized with the model's fast tokenizer, sorted by length and run in
+    batches of `batch_size` padded only to the longest text in the batch, so short
+    queries do not pay for the model's full sequence length.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        quantized: bool = True,
+        batch_size: int = 32,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.model_path = Path(model_path)
+        self.quantized = quantized
+        self.batch_size = max(1, batch_size)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        # Loaded on first encode (or by warmup()), like LocalEmbedding.
+        self._session = None
+        self._tokenizer = None
+        self._config: dict = {}
+        self._load_lock = threading.Lock()
+        self._encoder = MicroBatchEncoder(self._encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def _load(self) -> None:
+        if self._session is not None:
+            return
+        with self._load_lock:
+            if self._session is not None:
+                return
+            model = self.model_path / (QUANTIZED_MODEL_FILE if self.quantized else MODEL_FILE)
+            if not model.exists():
+                raise FileNotFoundError(f"{model} not found; run scripts/export_onnx.py first")
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            config = json.loads((self.model_path / POOLING_FILE).read_text())
+            tokenizer = Tokenizer.from_file(str(self.model_path / TOKENIZER_FILE))
+            tokenizer.no_padding()
+            tokenizer.enable_truncation(config.get("max_length", 512))
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            # 0 lets ONNX Runtime use one thread per physical core.
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = self.inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            self._config = config
+            self._tokenizer = tokenizer
+            self._session = ort.InferenceSession(str(model), options, providers=["CPUExecutionProvider"])
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        self._load()
+        encodings = self._tokenizer.encode_batch(texts)
+        input_names = {i.name for i in self._session.get_inputs()}
+        out = np.empty((len(texts), 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            width = max(len(encodings[i].ids) for i in batch)
+            ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                n = len(encodings[i].ids)
+                ids[row, :n] = encodings[i].ids
+                mask[row, :n] = 1
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            hidden = self._session.run(None, feeds)[0]
+            vectors = pool(hidden, mask, self._config.get("pooling", "cls"), self._config.get("normalize", True))
+            if not out.shape[1]:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[batch] = vectors
+        return out.tolist()
+
+    def warmup(self) -> None:
+        """Load the session and run one encode so the first request does not pay for it."""
+        self._encode(["warmup"])
+
+    async def embed(self, texts):
+        return await self._encoder.submit(texts)
+
+    def close(self) -> None:
+        self._encoder.close()
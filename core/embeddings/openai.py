@@ -1,16 +1,43 @@
+import asyncio
+from weakref import WeakKeyDictionary
+
+from core.http_client import SharedHTTPClient
 from .base import BaseEmbedding
 
 
 class OpenAIEmbedding(BaseEmbedding):
-    def __init__(self, model: str = "text-embedding-3-small", api_key: str | None = None):
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        api_key: str | None = None,
+        http: SharedHTTPClient | None = None,
+    ):
         self.model = model
         self._api_key = api_key or ""
+        self._http = http
+        self._clients: WeakKeyDictionary = WeakKeyDictionary()
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
+    @property
+    def client(self):
         from openai import AsyncOpenAI
 
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            # Reuse the shared connection pool when one is provided; AsyncOpenAI
+            # otherwise keeps its own pooled client for the lifetime of this instance.
+            http_client = self._http.client if self._http is not None else None
+            client = AsyncOpenAI(api_key=self._api_key, http_client=http_client)
+            self._clients[loop] = client
+        return client
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
         if not texts:
             return []
-        client = AsyncOpenAI(api_key=self._api_key)
-        response = await client.embeddings.create(input=texts, model=self.model)
+        response = await self.client.embeddings.create(input=texts, model=self.model)
         return [item.embedding for item in response.data]
+
+    async def aclose(self) -> None:
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and self._http is None:
+            await client.close()
@@ -0,0 +1,60 @@
+import asyncio
+import importlib.util
+from weakref import WeakKeyDictionary
+
+import httpx
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class SharedHTTPClient:
+    """One pooled, keep-alive httpx.AsyncClient shared by every outbound caller.
+
+    Created lazily (or eagerly via `start()` at app startup) and closed once at shutdown.
+    httpx connections are bound to an event loop, so a background loop (e.g. an
+    ingestion worker) gets its own pooled client instead of sharing the API loop's.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and http2_available()
+        self._transport = transport
+        self._clients: WeakKeyDictionary = WeakKeyDictionary()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._clients[loop] = client
+        return client
+
+    def start(self) -> httpx.AsyncClient:
+        return self.client
+
+    async def aclose(self) -> None:
+        """Close the client bound to the running loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 class BaseLLM(ABC):
     @abstractmethod
     async def generate(self, prompt: str) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion as it is produced. Falls back to a single chunk."""
+        yield await self.generate(prompt)
@@ -1,22 +1,62 @@
-import httpx
+import json
+from typing import AsyncIterator
+
 from app.config import settings
+from core.http_client import SharedHTTPClient
 from .base import BaseLLM
 
 
 class OllamaLLM(BaseLLM):
-    def __init__(self, model: str = settings.ollama_model, base_url: str = settings.ollama_base_url, timeout: int = settings.ollama_timeout):
+    def __init__(
+        self,
+        model: str = settings.ollama_model,
+        base_url: str = settings.ollama_base_url,
+        timeout: int = settings.ollama_timeout,
+        http: SharedHTTPClient | None = None,
+    ):
         self.model = model
         self.url = f"{base_url.rstrip('/')}/api/generate"
         self.timeout = timeout
+        # Without a shared client we still keep one per instance so calls reuse connections.
+        self._owns_http = http is None
+        self.http = http or SharedHTTPClient(timeout=timeout)
 
     async def generate(self, prompt: str) -> str:
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                self.url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                }
-            )
-        return response.json()["response"]
\ No newline at end of file
+        response = await self.http.client.post(
+            self.url,
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": False
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["response"]
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self.http.client.stream(
+            "POST",
+            self.url,
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True
+            },
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line until "done" is true.
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                token = data.get("response")
+                if token:
+                    yield token
+                if data.get("done"):
+                    break
+
+    async def aclose(self) -> None:
+        if self._owns_http:
+            await self.http.aclose()
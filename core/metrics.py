@@ -0,0 +1,227 @@
+"""In-process metrics rendered in the Prometheus text format (served on /metrics).
+
+Recording is a dict lookup, a bisect and a few additions under a per-series lock;
+hot paths bind their labelled series once at import (`STAGE_SECONDS.labels("embed")`)
+so only the observation itself is paid per call.
+"""
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, "_Metric"] = {}
+
+    def register(self, metric: "_Metric") -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> "_Metric | None":
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), registry: Registry | None = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    @abstractmethod
+    def _child(self):
+        """A new series for one combination of label values."""
+
+    def _series(self) -> list[tuple[tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """Exposition lines for every series."""
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(c.value)}" for k, c in self._series()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "_HistogramValues"):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _HistogramValues:
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; cumulated when rendered.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: Registry | None = None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _child(self):
+        return _HistogramValues(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, h in self._series():
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# Application metrics.
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each query and ingestion stage.",
+    ("stage",),
+)
+RERANK_CANDIDATES = Histogram(
+    "rag_rerank_candidates",
+    "Candidates passed to the reranker per query.",
+    buckets=(5, 10, 20, 50, 100, 200, 500, 1000),
+)
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Prompt size in tokens per generated answer.",
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+ANSWER_CACHE_REQUESTS = Counter(
+    "rag_answer_cache_requests_total",
+    "Semantic answer cache lookups by result.",
+    ("result",),
+)
+INGEST_CHUNKS = Counter("rag_ingest_chunks_total", "Chunks embedded and upserted by ingestion.")
+INGEST_FILES = Counter("rag_ingest_files_total", "Files handled by ingestion by outcome.", ("outcome",))
+INGEST_CHUNKS_PER_SECOND = Gauge(
+    "rag_ingest_chunks_per_second", "Throughput of the most recently finished ingestion run."
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency by route and status.",
+    ("method", "route", "status"),
+)
@@ -0,0 +1,138 @@
+import logging
+import re
+from dataclasses import dataclass
+
+from core.retriever.tokens import tokenize
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Roughly what a BPE tokenizer does: words split into short pieces, punctuation on its own.
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or the this to was what when "
+    "where which who why with you your".split()
+)
+
+
+class TokenCounter:
+    """Counts tokens with a Hugging Face fast tokenizer when one is configured and installed.
+
+    Falls back to a regex approximation of BPE tokenization, which is close enough to
+    enforce a budget and much cheaper than loading a model-specific tokenizer.
+    """
+
+    def __init__(self, tokenizer_name: str = ""):
+        self._tokenizer = None
+        if tokenizer_name:
+            try:
+                from tokenizers import Tokenizer
+
+                self._tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+            except Exception:
+                logger.warning("tokenizer %r unavailable; using approximate token counts", tokenizer_name)
+
+    def count(self, text: str) -> int:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        return len(_APPROX_TOKEN_RE.findall(text))
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    tokens: int
+    raw_tokens: int
+    sentences_dropped: int = 0
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+
+class ContextBuilder:
+    """Turns retrieved chunks into a compact, token-budgeted context.
+
+    Chunks from the same source with consecutive `chunk_index` are merged into one
+    passage. Sentences already seen, whether from chunk overlap or from duplicate
+    documents, are dropped. With `select_sentences`, sentences sharing no content
+    word with the query are dropped too. Passages keep their best retrieval rank, and
+    sentences are added in that order until `max_tokens` (0 = unlimited) is reached.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter | None = None,
+        max_tokens: int = 0,
+        dedup: bool = True,
+        select_sentences: bool = False,
+    ):
+        self.counter = counter or TokenCounter()
+        self.max_tokens = max_tokens
+        self.dedup = dedup
+        self.select_sentences = select_sentences
+
+    def build(self, query: str, docs: list) -> BuiltContext:
+        texts = [doc.payload.get("text", "") for doc in docs]
+        raw_tokens = self.counter.count("\n\n".join(texts))
+        query_terms = {t for t in tokenize(query) if t not in _STOPWORDS}
+        seen: set[str] = set()
+        passages: list[str] = []
+        tokens = dropped = 0
+        for passage in self._passages(docs) if self.dedup else [[d] for d in docs]:
+            kept: list[str] = []
+            for doc in passage:
+                for sentence in self._sentences(doc.payload.get("text", "")):
+                    key = _normalize(sentence)
+                    if self.dedup and key in seen:
+                        dropped += 1
+                        continue
+                    seen.add(key)
+                    if self.select_sentences and query_terms and not query_terms & set(tokenize(sentence)):
+                        dropped += 1
+                        continue
+                    cost = self.counter.count(sentence) + 1
+                    if self.max_tokens and tokens + cost > self.max_tokens:
+                        dropped += 1
+                        continue
+                    tokens += cost
+                    kept.append(sentence)
+            if kept:
+                passages.append(" ".join(kept))
+        return BuiltContext(
+            text="\n\n".join(passages),
+            tokens=tokens,
+            raw_tokens=raw_tokens,
+            sentences_dropped=dropped,
+        )
+
+    @staticmethod
+    def _sentences(text: str) -> list[str]:
+        text = " ".join(text.split())
+        return [s for s in _SENTENCE_RE.split(text) if s] if text else []
+
+    @staticmethod
+    def _passages(docs: list) -> list[list]:
+        """Group docs into runs of consecutive chunks per source, ordered by best rank."""
+        by_source: dict[str, list[tuple[int, int, object]]] = {}
+        singles: list[tuple[int, list]] = []
+        for rank, doc in enumerate(docs):
+            source = doc.payload.get("source")
+            index = doc.payload.get("chunk_index")
+            if source is None or index is None:
+                singles.append((rank, [doc]))
+            else:
+                by_source.setdefault(source, []).append((index, rank, doc))
+        runs: list[tuple[int, list]] = list(singles)
+        for members in by_source.values():
+            members.sort(key=lambda m: (m[0], m[1]))
+            run = [members[0]]
+            for member in members[1:]:
+                if member[0] - run[-1][0] <= 1:
+                    run.append(member)
+                else:
+                    runs.append((min(m[1] for m in run), [m[2] for m in run]))
+                    run = [member]
+            runs.append((min(m[1] for m in run), [m[2] for m in run]))
+        runs.sort(key=lambda r: r[0])
+        return [docs for _, docs in runs]
@@ -1,20 +1,153 @@
+import asyncio
+import time
+from typing import AsyncIterator
+
+from core.metrics import PROMPT_TOKENS, STAGE_SECONDS
+from core.prompt.context import ContextBuilder
 from core.prompt.templates import format_answer_prompt
+from core.singleflight import SingleFlight, query_key
+
+_RETRIEVE = STAGE_SECONDS.labels("retrieve")
+_CONTEXT = STAGE_SECONDS.labels("context")
+_GENERATE = STAGE_SECONDS.labels("generate")
+_FIRST_TOKEN = STAGE_SECONDS.labels("first_token")
+_PROMPT_TOKENS = PROMPT_TOKENS.labels()
 
 
 class RAGService:
-    def __init__(self, retriever, llm, top_k: int = 5):
+    def __init__(
+        self,
+        retriever,
+        llm,
+        top_k: int = 5,
+        cache=None,
+        context_builder: ContextBuilder | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
         self.retriever = retriever
         self.llm = llm
         self.top_k = top_k
+        self.cache = cache
+        self.context_builder = context_builder or ContextBuilder()
+        # Identical concurrent queries share one retrieval + generation.
+        self.single_flight = single_flight
+
+    async def _prepare(self, query: str):
+        with _RETRIEVE.time():
+            docs = await self.retriever.retrieve(query, k=self.top_k)
+        prompt, usage = self._prompt(query, docs)
+        return docs, prompt, usage
+
+    def _prompt(self, query: str, docs: list) -> tuple[str, dict]:
+        """Prompt for `query` and its token usage: prompt, context, and context before dedup/budgeting."""
+        with _CONTEXT.time():
+            context = self.context_builder.build(query, docs)
+            prompt = format_answer_prompt(context.text, query)
+            usage = {
+                "prompt_tokens": self.context_builder.counter.count(prompt),
+                "context_tokens": context.tokens,
+                "raw_context_tokens": context.raw_tokens,
+            }
+        _PROMPT_TOKENS.observe(usage["prompt_tokens"])
+        return prompt, usage
 
     async def answer(self, query: str):
-        docs = await self.retriever.retrieve(query, k=self.top_k)
-        context = "\n\n".join(
-            [doc.payload.get("text", "") for doc in docs]
-        )
-        prompt = format_answer_prompt(context, query)
-        response = await self.llm.generate(prompt)
-        return {
+        if self.single_flight is None:
+            return await self._answer(query)
+        return await self.single_flight.do(query_key(query, "answer", self.top_k), lambda: self._answer(query))
+
+    async def _answer(self, query: str):
+        lookup = await self.cache.lookup(query) if self.cache is not None else None
+        if lookup is not None and lookup.result is not None:
+            return lookup.result
+        docs, prompt, usage = await self._prepare(query)
+        with _GENERATE.time():
+            response = await self.llm.generate(prompt)
+        result = {
             "answer": response,
-            "sources": docs
-        }
\ No newline at end of file
+            "sources": docs,
+            "usage": usage,
+        }
+        if lookup is not None:
+            self.cache.store(lookup, result)
+        return result
+
+    async def answer_stream(self, query: str) -> AsyncIterator[dict]:
+        """Yield a "sources" event as soon as retrieval finishes, then "token" events, then "done" (with "usage")."""
+        events = (
+            self._answer_stream(query)
+            if self.single_flight is None
+            else self.single_flight.stream(query_key(query, "stream", self.top_k), lambda: self._answer_stream(query))
+        )
+        async for event in events:
+            yield event
+
+    async def _answer_stream(self, query: str) -> AsyncIterator[dict]:
+        lookup = await self.cache.lookup(query) if self.cache is not None else None
+        if lookup is not None and lookup.result is not None:
+            yield {"type": "sources", "sources": lookup.result["sources"]}
+            yield {"type": "token", "token": lookup.result["answer"]}
+            yield {"type": "done", "usage": lookup.result.get("usage")}
+            return
+        docs, prompt, usage = await self._prepare(query)
+        yield {"type": "sources", "sources": docs}
+        tokens: list[str] = []
+        start = time.perf_counter()
+        async for token in self.llm.stream(prompt):
+            if not tokens:
+                _FIRST_TOKEN.observe(time.perf_counter() - start)
+            tokens.append(token)
+            yield {"type": "token", "token": token}
+        _GENERATE.observe(time.perf_counter() - start)
+        if lookup is not None:
+            self.cache.store(lookup, {"answer": "".join(tokens), "sources": docs, "usage": usage})
+        yield {"type": "done", "usage": usage}
+
+    async def answer_batch(
+        self, queries: list[str], concurrency: int = 4, retrieval_only: bool = False
+    ) -> AsyncIterator[dict]:
+        """Yield {"index", "query", "answer", "sources", "usage", "error"} for each query as it completes.
+
+        Cache lookups and retrieval each cover the whole batch at once (one embed call,
+        one batched store search); generation runs at most `concurrency` prompts at a
+        time. A failed generation is reported in that query's "error" and does not
+        stop the batch. With `retrieval_only`, "answer" is None and nothing is generated.
+        """
+        use_cache = self.cache is not None and not retrieval_only
+        lookups = await self.cache.lookup_many(queries) if use_cache and queries else None
+        for i, query in enumerate(queries):
+            if lookups is not None and lookups[i].result is not None:
+                yield {"index": i, "query": query, **lookups[i].result, "error": None}
+        pending = [i for i in range(len(queries)) if lookups is None or lookups[i].result is None]
+        if not pending:
+            return
+        with _RETRIEVE.time():
+            retrieved = await self.retriever.retrieve_batch([queries[i] for i in pending], k=self.top_k)
+        if retrieval_only:
+            for i, docs in zip(pending, retrieved):
+                yield {"index": i, "query": queries[i], "answer": None, "sources": docs, "usage": None, "error": None}
+            return
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def generate(i: int, docs: list) -> dict:
+            prompt, usage = self._prompt(queries[i], docs)
+            result = {"index": i, "query": queries[i], "answer": None, "sources": docs, "usage": usage, "error": None}
+            async with semaphore:
+                try:
+                    with _GENERATE.time():
+                        result["answer"] = await self.llm.generate(prompt)
+                except Exception as e:
+                    result["error"] = str(e)
+            if lookups is not None and result["error"] is None:
+                self.cache.store(lookups[i], {"answer": result["answer"], "sources": docs, "usage": usage})
+            return result
+
+        tasks = [asyncio.create_task(generate(i, docs)) for i, docs in zip(pending, retrieved)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer stopped early (e.g. client disconnected): drop the remaining generations.
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+
+class RateLimiter(ABC):
+    """GCRA (generic cell rate algorithm): a token bucket stored as one timestamp per key.
+
+    Each key keeps only its theoretical arrival time (TAT): when the bucket would be
+    full again. A request is allowed when the TAT is at most `burst - 1` emission
+    intervals ahead of now, and then pushes the TAT one interval further. Checks are
+    O(1) and a key whose TAT has passed carries no information, so it can be dropped.
+    """
+
+    def __init__(self, rate_per_minute: int, burst: int = 0):
+        self.interval = 60.0 / rate_per_minute
+        # Default burst = the per-minute rate, like the sliding window this replaces.
+        self.tolerance = self.interval * (max(1, burst or rate_per_minute) - 1)
+
+    @abstractmethod
+    def hit(self, key: str, now: float | None = None) -> float:
+        """Record a request for `key`; 0.0 if it is allowed, otherwise seconds until it would be."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process limiter. Keys are kept in last-hit order, so idle ones are evicted from the front."""
+
+    _EVICT_PER_HIT = 8
+
+    def __init__(self, rate_per_minute: int, burst: int = 0, max_keys: int = 1_000_000):
+        super().__init__(rate_per_minute, burst)
+        self.max_keys = max_keys
+        self._tat: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def hit(self, key: str, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+            if tat - now > self.tolerance:
+                return tat - now - self.tolerance
+            self._tat[key] = tat + self.interval
+            self._tat.move_to_end(key)
+            self._evict(now)
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        # A bounded number of idle keys per hit keeps the worst case O(1); expired keys
+        # still drain several times faster than new ones arrive.
+        tats = self._tat
+        for _ in range(self._EVICT_PER_HIT):
+            if not tats:
+                break
+            key, tat = next(iter(tats.items()))
+            if tat > now and len(tats) <= self.max_keys:
+                break
+            del tats[key]
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Limiter shared by every process on the host through one SQLite database in WAL mode.
+
+    A check is a single atomic upsert, so concurrent workers never exceed the limit
+    together. Expired rows are deleted in batches every `cleanup_every` checks. Uses
+    wall-clock time, since monotonic clocks are not comparable across processes.
+    """
+
+    _HIT_SQL = (
+        "INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval) "
+        "ON CONFLICT(key) DO UPDATE SET tat = MAX(tat, :now) + :interval "
+        "WHERE MAX(tat, :now) - :now <= :tolerance "
+        "RETURNING tat"
+    )
+
+    _CLEANUP_BATCH = 10000
+
+    def __init__(self, path: str | Path, rate_per_minute: int, burst: int = 0, cleanup_every: int = 1000):
+        super().__init__(rate_per_minute, burst)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cleanup_every = cleanup_every
+        self._hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Losing the last few updates on power loss only forgets some rate-limit state.
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_tat ON rate_limits(tat)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def hit(self, key: str, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        params = {"key": key, "now": now, "interval": self.interval, "tolerance": self.tolerance}
+        with self._lock:
+            allowed = self._conn.execute(self._HIT_SQL, params).fetchone() is not None
+            if not allowed:
+                row = self._conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            self._hits += 1
+            if self._hits % self.cleanup_every == 0:
+                self._conn.execute(
+                    "DELETE FROM rate_limits WHERE key IN (SELECT key FROM rate_limits WHERE tat <= ? LIMIT ?)",
+                    (now, self._CLEANUP_BATCH),
+                )
+        if allowed or row is None:
+            return 0.0
+        return max(0.0, row[0] - now - self.tolerance)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,7 +1,23 @@
+import asyncio
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from typing import List, Dict
 
+
+@dataclass
+class ScoredDoc:
+    """A retrieved chunk; same shape (id, score, payload) as Qdrant's ScoredPoint."""
+
+    id: str
+    score: float
+    payload: dict = field(default_factory=dict)
+
+
 class BaseRetriever(ABC):
     @abstractmethod
     async def retrieve(self, query: str, k: int = 5) -> List[Dict]:
-        pass
\ No newline at end of file
+        pass
+
+    async def retrieve_batch(self, queries: list[str], k: int = 5) -> list[list]:
+        """Results for each query, in order. Subclasses override this to batch embedding and search."""
+        return list(await asyncio.gather(*(self.retrieve(q, k=k) for q in queries)))
@@ -0,0 +1,66 @@
+import asyncio
+
+from .base import BaseRetriever, ScoredDoc
+from .reranker import RRF_K
+
+
+class HybridRetriever(BaseRetriever):
+    """Runs vector and BM25 search concurrently and fuses the two rankings with RRF.
+
+    The BM25 index keeps no chunk text, so payloads of docs only it found are fetched
+    from the vector store by ID after fusion.
+    """
+
+    def __init__(self, vector_retriever, sparse_index, candidate_k: int = 50):
+        self.vector_retriever = vector_retriever
+        self.sparse_index = sparse_index
+        self.candidate_k = candidate_k
+
+    async def retrieve(self, query: str, k: int = 5):
+        take = max(k, self.candidate_k)
+        vector_hits, sparse_hits = await asyncio.gather(
+            self.vector_retriever.retrieve(query, k=take),
+            asyncio.to_thread(self.sparse_index.search, query, take),
+        )
+        return (await self._resolve([self._fuse(vector_hits, sparse_hits, k)]))[0]
+
+    async def retrieve_batch(self, queries: list[str], k: int = 5):
+        take = max(k, self.candidate_k)
+        vector_hits, sparse_hits = await asyncio.gather(
+            self.vector_retriever.retrieve_batch(queries, k=take),
+            asyncio.to_thread(lambda: [self.sparse_index.search(q, take) for q in queries]),
+        )
+        return await self._resolve([self._fuse(v, s, k) for v, s in zip(vector_hits, sparse_hits)])
+
+    async def _resolve(self, batches: list[list]) -> list[list]:
+        """Fill in the payloads of sparse-only hits with one lookup for all queries."""
+        missing = {str(d.id) for docs in batches for d in docs if "text" not in d.payload}
+        if not missing:
+            return batches
+        payloads = await self.vector_retriever.vector_store.payloads(list(missing))
+        # A hit deleted from the vector store since BM25 saw it is dropped.
+        return [
+            [
+                d if "text" in d.payload else ScoredDoc(id=d.id, score=d.score, payload=payloads[str(d.id)])
+                for d in docs
+                if "text" in d.payload or str(d.id) in payloads
+            ]
+            for docs in batches
+        ]
+
+    @staticmethod
+    def _fuse(vector_hits: list, sparse_hits: list, k: int) -> list:
+        """RRF over the ranks each list actually has; a list that missed a doc adds nothing for it.
+
+        The returned docs carry the fused score, since the raw scores (cosine vs BM25) are not comparable.
+        """
+        docs: dict[str, object] = {}
+        fused: dict[str, float] = {}
+        for hits in (vector_hits, sparse_hits):
+            # Each list comes ranked best first; ranks are 0-based as in _rrf_merge.
+            for rank, doc in enumerate(hits):
+                key = str(doc.id)
+                docs.setdefault(key, doc)
+                fused[key] = fused.get(key, 0.0) + 1 / (RRF_K + rank)
+        ranked = sorted(fused, key=fused.__getitem__, reverse=True)[:k]
+        return [ScoredDoc(id=docs[i].id, score=fused[i], payload=docs[i].payload) for i in ranked]
@@ -1,6 +1,14 @@
-import re
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+from core.metrics import RERANK_CANDIDATES, STAGE_SECONDS
+
+from .tokens import CandidateTerms, query_terms
+
+_RERANK = STAGE_SECONDS.labels("rerank")
+_CANDIDATES = RERANK_CANDIDATES.labels()
+
 
 class BaseReranker(ABC):
     @abstractmethod
@@ -8,61 +16,71 @@ class BaseReranker(ABC):
         pass
 
 
-def _tokenize(text: str) -> set[str]:
-    return set(re.findall(r"\b\w+\b", text.lower()))
-
-
-def _tokenize_list(text: str) -> list[str]:
-    return re.findall(r"\b\w+\b", text.lower())
+RRF_K = 60
 
 
-def _get_payload_text(doc) -> str:
-    payload = getattr(doc, "payload", None) or (doc if isinstance(doc, dict) else {})
-    return payload.get("text", "") or ""
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """0-based rank of each score, highest first; ties keep input order."""
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores))
+    return ranks
 
 
-RRF_K = 60
+def _rrf_merge(docs: list, vector_scores, bm25_scores, top_k: int) -> list:
+    vector_scores = np.asarray(vector_scores, dtype=np.float64)
+    bm25_scores = np.asarray(bm25_scores, dtype=np.float64)
+    combined = 1 / (RRF_K + _ranks(vector_scores)) + 1 / (RRF_K + _ranks(bm25_scores))
+    return [docs[i] for i in np.argsort(-combined, kind="stable")[:top_k]]
 
 
-def _rrf_merge(docs: list, vector_scores: list[float], bm25_scores: list[float], top_k: int) -> list:
-    vec_rank = {i: r for r, i in enumerate(sorted(range(len(docs)), key=lambda i: -vector_scores[i]))}
-    bm25_rank = {i: r for r, i in enumerate(sorted(range(len(docs)), key=lambda i: -bm25_scores[i]))}
-    combined = [(1 / (RRF_K + vec_rank[i]) + 1 / (RRF_K + bm25_rank[i]), docs[i]) for i in range(len(docs))]
-    combined.sort(key=lambda x: -x[0])
-    return [doc for _, doc in combined[:top_k]]
+def _vector_scores(docs: list) -> np.ndarray:
+    return np.array([getattr(d, "score", 0.0) or 0.0 for d in docs], dtype=np.float64)
 
 
 class BM25Reranker(BaseReranker):
-    def rerank(self, query: str, docs: list, top_k: int) -> list:
-        from rank_bm25 import BM25Okapi
+    """Okapi BM25 over the candidate set (same scoring as rank_bm25.BM25Okapi), fused with vector scores via RRF."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+    def scores(self, query: str, docs: list) -> np.ndarray:
+        terms, query_counts = query_terms(query)
+        candidates = CandidateTerms(docs)
+        # Empty chunks count as one token, as a placeholder token did with rank_bm25.
+        lengths = np.maximum(candidates.lengths, 1.0)
+        n = len(docs)
+        vocab, df = candidates.document_frequencies()
+        idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+        floor = self.epsilon * idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = floor
+        pos = np.searchsorted(vocab, terms)
+        pos[pos == len(vocab)] = 0
+        term_idf = np.where(vocab[pos] == terms, idf[pos], 0.0) if len(vocab) else np.zeros(len(terms))
+        tf = candidates.term_frequencies(terms)
+        norm = self.k1 * (1 - self.b + self.b * lengths / lengths.mean())
+        return (tf * (self.k1 + 1) / (tf + norm[:, None])) @ (term_idf * query_counts)
 
+    def rerank(self, query: str, docs: list, top_k: int) -> list:
         if not docs:
             return []
-        texts = [_get_payload_text(d) for d in docs]
-        vector_scores = [getattr(d, "score", 0.0) or 0.0 for d in docs]
-        tokenized = [_tokenize_list(t) or ["_"] for t in texts]
-        bm25 = BM25Okapi(tokenized)
-        q_tokens = _tokenize_list(query)
-        bm25_scores = bm25.get_scores(q_tokens)
-        bm25_scores_list = bm25_scores.tolist() if hasattr(bm25_scores, "tolist") else list(bm25_scores)
-        return _rrf_merge(docs, vector_scores, bm25_scores_list, top_k)
+        return _rrf_merge(docs, _vector_scores(docs), self.scores(query, docs), top_k)
 
 
 class KeywordReranker(BaseReranker):
+    def scores(self, query: str, docs: list) -> np.ndarray:
+        terms, _ = query_terms(query)
+        if len(terms) == 0:
+            # No keywords to match: rank by the vector score alone.
+            return 0.7 * _vector_scores(docs)
+        overlap = (CandidateTerms(docs).term_frequencies(terms) > 0).sum(axis=1) / len(terms)
+        return 0.7 * _vector_scores(docs) + 0.3 * (overlap * 2.0)
+
     def rerank(self, query: str, docs: list, top_k: int) -> list:
         if not docs:
             return []
-        q_tokens = _tokenize(query)
-        scored: list[tuple[float, object]] = []
-        for doc in docs:
-            text = _get_payload_text(doc)
-            d_tokens = _tokenize(text)
-            overlap = len(q_tokens & d_tokens) / len(q_tokens) if q_tokens else 0
-            vector_score = getattr(doc, "score", 0.0) or 0.0
-            combined = 0.7 * vector_score + 0.3 * (overlap * 2.0)
-            scored.append((combined, doc))
-        scored.sort(key=lambda x: -x[0])
-        return [doc for _, doc in scored[:top_k]]
+        return [docs[i] for i in np.argsort(-self.scores(query, docs), kind="stable")[:top_k]]
 
 
 class RerankingRetriever:
@@ -75,4 +93,14 @@ class RerankingRetriever:
     async def retrieve(self, query: str, k: int | None = None):
         take = k if k is not None else self.top_k
         docs = await self.retriever.retrieve(query, k=self.initial_k)
-        return self.reranker.rerank(query, docs, top_k=take)
+        return self._rerank(query, docs, take)
+
+    async def retrieve_batch(self, queries: list[str], k: int | None = None):
+        take = k if k is not None else self.top_k
+        batches = await self.retriever.retrieve_batch(queries, k=self.initial_k)
+        return [self._rerank(q, docs, take) for q, docs in zip(queries, batches)]
+
+    def _rerank(self, query: str, docs: list, top_k: int) -> list:
+        _CANDIDATES.observe(len(docs))
+        with _RERANK.time():
+            return self.reranker.rerank(query, docs, top_k=top_k)
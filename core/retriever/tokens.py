@@ -0,0 +1,95 @@
+import base64
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\b\w+\b")
+
+# Payload keys written at ingestion time so rerankers never re-tokenize chunk text.
+TOKEN_IDS = "token_ids"
+TOKEN_COUNTS = "token_counts"
+TOKEN_LENGTH = "token_length"
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def token_id(token: str) -> int:
+    """Stable 32-bit ID for a token. A collision only matters if it lands on a query term within one candidate set."""
+    return zlib.crc32(token.encode())
+
+
+def _pack(values: list[int], dtype: str) -> str:
+    return base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+
+def _unpack(data: str, dtype: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype)
+
+
+def token_stats(text: str) -> dict:
+    """Sorted unique token IDs, their counts and the token length of `text`, ready to store in a payload.
+
+    IDs and counts are packed little-endian arrays in base64: a chunk's stats decode
+    with one `np.frombuffer` instead of converting hundreds of JSON integers per query.
+    """
+    counts = Counter(tokenize(text))
+    pairs = sorted((token_id(t), min(c, 0xFFFF)) for t, c in counts.items())
+    return {
+        TOKEN_IDS: _pack([i for i, _ in pairs], "<u4"),
+        TOKEN_COUNTS: _pack([c for _, c in pairs], "<u2"),
+        TOKEN_LENGTH: sum(counts.values()),
+    }
+
+
+def query_terms(query: str) -> tuple[np.ndarray, np.ndarray]:
+    """Unique query token IDs (sorted) and how many times each occurs in the query."""
+    ids = np.array([token_id(t) for t in tokenize(query)], dtype=np.uint32)
+    return np.unique(ids, return_counts=True)
+
+
+def _payload(doc) -> dict:
+    payload = getattr(doc, "payload", None)
+    if payload is None:
+        payload = doc if isinstance(doc, dict) else {}
+    return payload
+
+
+def doc_stats(doc) -> tuple[np.ndarray, np.ndarray, int]:
+    """Token stats stored on a document, computed from its text for chunks ingested before they existed."""
+    payload = _payload(doc)
+    if TOKEN_IDS not in payload:
+        payload = token_stats(payload.get("text", "") or "")
+    return _unpack(payload[TOKEN_IDS], "<u4"), _unpack(payload[TOKEN_COUNTS], "<u2"), payload[TOKEN_LENGTH]
+
+
+class CandidateTerms:
+    """Flattened (doc, token, count) arrays for a candidate set, scored with NumPy instead of per-doc loops."""
+
+    def __init__(self, docs: list):
+        stats = [doc_stats(d) for d in docs]
+        self.n_docs = len(docs)
+        self.lengths = np.array([s[2] for s in stats], dtype=np.float64)
+        sizes = [len(s[0]) for s in stats]
+        self.doc_index = np.repeat(np.arange(self.n_docs), sizes)
+        self.ids = np.concatenate([s[0] for s in stats]) if stats else np.zeros(0, dtype=np.uint32)
+        self.counts = np.concatenate([s[1] for s in stats]).astype(np.float64) if stats else np.zeros(0)
+
+    def term_frequencies(self, terms: np.ndarray) -> np.ndarray:
+        """(n_docs, len(terms)) matrix of counts for the sorted unique `terms`."""
+        tf = np.zeros((self.n_docs, len(terms)))
+        if len(terms) == 0 or len(self.ids) == 0:
+            return tf
+        pos = np.searchsorted(terms, self.ids)
+        pos[pos == len(terms)] = 0
+        hit = terms[pos] == self.ids
+        tf[self.doc_index[hit], pos[hit]] = self.counts[hit]
+        return tf
+
+    def document_frequencies(self) -> tuple[np.ndarray, np.ndarray]:
+        """Every distinct token in the candidate set and the number of candidates containing it."""
+        # Token IDs are unique per document, so a plain count is the document frequency.
+        return np.unique(self.ids, return_counts=True)
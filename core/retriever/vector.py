@@ -1,11 +1,33 @@
+from core.metrics import STAGE_SECONDS
+from core.singleflight import SingleFlight, query_key
+
 from .base import BaseRetriever
 
+_EMBED = STAGE_SECONDS.labels("embed")
+_SEARCH = STAGE_SECONDS.labels("search")
+
 class VectorRetriever(BaseRetriever):
-    def __init__(self, embedding_model, vector_store):
+    def __init__(self, embedding_model, vector_store, single_flight: SingleFlight | None = None):
         self.embedding_model = embedding_model
         self.vector_store = vector_store
+        self.single_flight = single_flight
 
     async def retrieve(self, query: str, k: int = 5):
-        query_vector = (await self.embedding_model.embed([query]))[0]
-        results = await self.vector_store.search(query_vector, k=k)
-        return results
\ No newline at end of file
+        if self.single_flight is None:
+            return await self._retrieve(query, k)
+        return await self.single_flight.do(query_key(query, "retrieve", k), lambda: self._retrieve(query, k))
+
+    async def _retrieve(self, query: str, k: int):
+        with _EMBED.time():
+            query_vector = (await self.embedding_model.embed([query]))[0]
+        with _SEARCH.time():
+            return await self.vector_store.search(query_vector, k=k)
+
+    async def retrieve_batch(self, queries: list[str], k: int = 5):
+        """One embed call and one batched store search for all queries."""
+        if not queries:
+            return []
+        with _EMBED.time():
+            query_vectors = await self.embedding_model.embed(queries)
+        with _SEARCH.time():
+            return await self.vector_store.search_batch(query_vectors, k=k)
\ No newline at end of file
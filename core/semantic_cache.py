@@ -0,0 +1,113 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.metrics import ANSWER_CACHE_REQUESTS
+
+_HITS = ANSWER_CACHE_REQUESTS.labels("hit")
+_MISSES = ANSWER_CACHE_REQUESTS.labels("miss")
+
+
+@dataclass
+class CacheLookup:
+    vector: np.ndarray
+    version: tuple
+    result: dict | None = None
+
+
+class SemanticCache:
+    """Answer cache keyed by query embedding.
+
+    A query whose cosine similarity to a cached query is at least `threshold` reuses the
+    stored answer and sources. Entries expire after `ttl_seconds`, the oldest is evicted
+    beyond `max_entries`, and the whole cache is dropped when the collection changes:
+    when the vector store's in-process `version` changes, or when `collection_version`
+    (a `CollectionVersion`) was bumped, which also catches ingestion run by another process.
+    """
+
+    def __init__(
+        self,
+        embedding,
+        vector_store=None,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1000,
+        collection_version=None,
+    ):
+        self.embedding = embedding
+        self.vector_store = vector_store
+        self.collection_version = collection_version
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._version = self._store_version()
+        self._vectors: list[np.ndarray] = []
+        self._results: list[dict] = []
+        self._created: list[float] = []
+        self._matrix: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _store_version(self) -> tuple:
+        marker = self.collection_version.current() if self.collection_version is not None else None
+        return getattr(self.vector_store, "version", 0), marker
+
+    def invalidate(self) -> None:
+        self._vectors, self._results, self._created = [], [], []
+        self._matrix = None
+
+    async def lookup(self, query: str) -> CacheLookup:
+        return (await self.lookup_many([query]))[0]
+
+    async def lookup_many(self, queries: list[str]) -> list[CacheLookup]:
+        """Look up several queries with a single embed call."""
+        vectors = np.asarray(await self.embedding.embed(queries), dtype=np.float32).reshape(len(queries), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)
+        version = self._store_version()
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+        self._expire()
+        lookups = [CacheLookup(vector=vector, version=version) for vector in vectors]
+        if self._results:
+            if self._matrix is None:
+                self._matrix = np.vstack(self._vectors)
+            sims = vectors @ self._matrix.T
+            for lookup, row in zip(lookups, sims):
+                best = int(np.argmax(row))
+                if row[best] >= self.threshold:
+                    lookup.result = self._results[best]
+        hits = sum(lookup.result is not None for lookup in lookups)
+        self.stats["hits"] += hits
+        self.stats["misses"] += len(lookups) - hits
+        _HITS.inc(hits)
+        _MISSES.inc(len(lookups) - hits)
+        return lookups
+
+    def store(self, lookup: CacheLookup, result: dict) -> None:
+        # Don't cache answers built from a collection that changed mid-request.
+        if self.max_entries <= 0 or lookup.version != self._store_version():
+            return
+        self._vectors.append(lookup.vector)
+        self._results.append(result)
+        self._created.append(time.monotonic())
+        overflow = len(self._results) - self.max_entries
+        if overflow > 0:
+            del self._vectors[:overflow], self._results[:overflow], self._created[:overflow]
+        self._matrix = None
+
+    def _expire(self) -> None:
+        if self.ttl_seconds <= 0 or not self._created:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        # Entries are appended in creation order, so expired ones form a prefix.
+        n = 0
+        while n < len(self._created) and self._created[n] < cutoff:
+            n += 1
+        if n:
+            del self._vectors[:n], self._results[:n], self._created[:n]
+            self._matrix = None
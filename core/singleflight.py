@@ -0,0 +1,121 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def query_key(query: str, *params) -> tuple:
+    """Coalescing key: case- and whitespace-insensitive query text plus the parameters that shape the result."""
+    return (" ".join(query.split()).casefold(), *params)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        # Streaming flights: items so far (replayed to late joiners) and one queue per subscriber.
+        self.items: list = []
+        self.queues: set[asyncio.Queue] = set()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls onto one shared task.
+
+    While work for a key is in flight, later callers await the same task instead of
+    starting their own. Each caller waits through `asyncio.shield`, so a caller that is
+    cancelled (e.g. its client disconnected) leaves the shared work running for the
+    others; the work is only cancelled once every caller has gone. Nothing is cached:
+    the key is released as soon as the work finishes, successfully or not.
+
+    Flights are tracked per event loop, so one instance can be shared by the API loop
+    and background worker loops.
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple, _Flight] = {}
+        self.stats = {"started": 0, "coalesced": 0}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _start(self, key: tuple, work: Awaitable) -> _Flight:
+        flight = _Flight(asyncio.get_running_loop().create_task(work))
+        self._flights[key] = flight
+        self.stats["started"] += 1
+
+        def release(task: asyncio.Task) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not task.cancelled():
+                task.exception()  # retrieved by the waiters; avoid "never retrieved" warnings
+
+        flight.task.add_done_callback(release)
+        return flight
+
+    def _abandon(self, key: tuple, flight: _Flight) -> None:
+        """Cancel work nobody waits for; new callers start a fresh flight."""
+        if not flight.task.done():
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.task.cancel()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        full_key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(full_key)
+        if flight is None:
+            flight = self._start(full_key, fn())
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                self._abandon(full_key, flight)
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Like `do` for async generators: every subscriber receives every item, late joiners get a replay."""
+        full_key = (asyncio.get_running_loop(), "stream", key)
+        flight = self._flights.get(full_key)
+        if flight is None:
+            flight = self._start(full_key, self._pump(full_key, fn))
+        else:
+            self.stats["coalesced"] += 1
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in flight.items:
+            queue.put_nowait(item)
+        flight.queues.add(queue)
+        try:
+            while (item := await queue.get()) is not _END:
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            flight.queues.discard(queue)
+            if not flight.queues:
+                self._abandon(full_key, flight)
+
+    async def _pump(self, full_key: tuple, fn: Callable[[], AsyncIterator]) -> None:
+        # Wait one tick so the flight is registered before the first item is broadcast.
+        await asyncio.sleep(0)
+        flight = self._flights[full_key]
+        end = _END
+        try:
+            async for item in fn():
+                flight.items.append(item)
+                for queue in flight.queues:
+                    queue.put_nowait(item)
+        except Exception as e:
+            end = _Failure(e)
+        # Late joiners replay `items`, then see the end marker.
+        flight.items.append(end)
+        for queue in flight.queues:
+            queue.put_nowait(end)
@@ -0,0 +1,261 @@
+import math
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from core.retriever.base import ScoredDoc
+from core.retriever.tokens import tokenize
+
+
+# SQLite's default limit on bound parameters per statement is 999.
+_MAX_PARAMS = 900
+
+
+class BM25Index:
+    """Corpus-wide BM25 inverted index persisted in SQLite.
+
+    Terms and documents are interned to integer IDs and postings are stored as
+    (term_id, doc_id, tf, length) in a WITHOUT ROWID table, so each posting costs a few
+    bytes and a term's posting list is one contiguous range scan with no join. Document
+    frequencies and corpus length statistics are maintained incrementally on add/delete.
+
+    Search is MaxScore-pruned: terms are scored rarest first, and once the terms left
+    cannot lift an unseen document into the top k, their (long) posting lists are not
+    scanned; only the candidates that can still make it are looked up in them. Searches
+    read through per-thread connections in WAL snapshots and never wait on writers.
+
+    Only what scoring needs is stored: the text and payload of a chunk live in the vector
+    store, and hits carry just their `source`; `HybridRetriever` fetches the rest by ID.
+    """
+
+    def __init__(self, path: str | Path, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, df INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE, source TEXT, length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_source ON docs(source);
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL, length INTEGER,
+                PRIMARY KEY (term_id, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);
+            CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO stats VALUES ('doc_count', 0), ('total_length', 0);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(postings)")}
+        if "length" not in columns:
+            # Indexes written before postings carried the document length.
+            self._conn.execute("ALTER TABLE postings ADD COLUMN length INTEGER")
+            self._conn.execute("UPDATE postings SET length = (SELECT length FROM docs WHERE docs.id = postings.doc_id)")
+        if "payload" in {row[1] for row in self._conn.execute("PRAGMA table_info(docs)")}:
+            # Indexes written before payloads were left to the vector store kept a copy of each chunk.
+            self._conn.executescript(
+                """
+                CREATE TABLE docs_compact (
+                    id INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE, source TEXT, length INTEGER NOT NULL
+                );
+                INSERT INTO docs_compact SELECT id, point_id, source, length FROM docs;
+                DROP TABLE docs;
+                ALTER TABLE docs_compact RENAME TO docs;
+                CREATE INDEX docs_source ON docs(source);
+                """
+            )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        self._conn.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @staticmethod
+    def _stat(conn: sqlite3.Connection, key: str) -> int:
+        return conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._stat(self._reader(), "doc_count")
+
+    def add(self, ids: list[str], payloads: list[dict]) -> None:
+        """Index documents; an existing point ID is replaced."""
+        # The last payload wins when a batch repeats an ID.
+        docs = dict(zip(ids, payloads))
+        with self._lock:
+            cur = self._conn.cursor()
+            for point_id in docs:
+                row = cur.execute("SELECT id FROM docs WHERE point_id = ?", (point_id,)).fetchone()
+                if row:
+                    self._remove_doc(cur, row[0])
+            postings: list[tuple[int, str, int, int]] = []
+            df: Counter = Counter()
+            total_length = 0
+            for point_id, payload in docs.items():
+                counts = Counter(tokenize(payload.get("text", "") or ""))
+                length = sum(counts.values())
+                total_length += length
+                cur.execute(
+                    "INSERT INTO docs (point_id, source, length) VALUES (?, ?, ?)",
+                    (point_id, payload.get("source"), length),
+                )
+                doc_id = cur.lastrowid
+                df.update(counts.keys())
+                postings.extend((doc_id, term, tf, length) for term, tf in counts.items())
+            cur.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                df.items(),
+            )
+            term_ids: dict[str, int] = {}
+            terms = list(df)
+            for i in range(0, len(terms), _MAX_PARAMS):
+                part = terms[i : i + _MAX_PARAMS]
+                term_ids.update(
+                    (term, term_id)
+                    for term_id, term in cur.execute(
+                        f"SELECT id, term FROM terms WHERE term IN ({','.join('?' * len(part))})", part
+                    )
+                )
+            cur.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                ((term_ids[term], doc_id, tf, length) for doc_id, term, tf, length in postings),
+            )
+            cur.execute("UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (len(docs),))
+            cur.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+            self._conn.commit()
+
+    def _remove_doc(self, cur: sqlite3.Cursor, doc_id: int) -> None:
+        length = cur.execute("SELECT length FROM docs WHERE id = ?", (doc_id,)).fetchone()[0]
+        cur.execute(
+            "UPDATE terms SET df = df - 1 WHERE id IN (SELECT term_id FROM postings WHERE doc_id = ?)",
+            (doc_id,),
+        )
+        cur.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        cur.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        cur.execute("UPDATE stats SET value = value - 1 WHERE key = 'doc_count'")
+        cur.execute("UPDATE stats SET value = value - ? WHERE key = 'total_length'", (length,))
+
+    def delete_by_source(self, source: str, keep_ids=None) -> None:
+        keep = set(keep_ids or ())
+        with self._lock:
+            cur = self._conn.cursor()
+            rows = cur.execute("SELECT id, point_id FROM docs WHERE source = ?", (source,)).fetchall()
+            for doc_id, point_id in rows:
+                if point_id not in keep:
+                    self._remove_doc(cur, doc_id)
+            self._conn.commit()
+
+    def search(self, query: str, k: int = 5) -> list[ScoredDoc]:
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        conn = self._reader()
+        # One snapshot for the statistics, postings and payloads of a search.
+        conn.execute("BEGIN")
+        try:
+            return self._search(conn, terms, k)
+        finally:
+            conn.execute("COMMIT")
+
+    def _search(self, conn: sqlite3.Connection, terms: set[str], k: int) -> list[ScoredDoc]:
+        n_docs = self._stat(conn, "doc_count")
+        if n_docs == 0:
+            return []
+        avg_len = self._stat(conn, "total_length") / n_docs or 1.0
+        marks = ",".join("?" * len(terms))
+        term_rows = conn.execute(f"SELECT id, df FROM terms WHERE term IN ({marks}) AND df > 0", list(terms)).fetchall()
+        if not term_rows:
+            return []
+        # Rarest (highest idf) first; tf * (k1 + 1) / (tf + norm) < k1 + 1 bounds each term's contribution.
+        weighted = sorted(
+            ((math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0), term_id) for term_id, df in term_rows), reverse=True
+        )
+        bounds = np.array([idf * (self.k1 + 1.0) for idf, _ in weighted])
+        remaining = np.cumsum(bounds[::-1])[::-1]  # bound on what terms i.. can still add
+        doc_ids = np.empty(0, dtype=np.int64)
+        scores = np.empty(0)
+
+        def contributions(idf: float, postings: list) -> tuple[np.ndarray, np.ndarray]:
+            data = np.array(postings, dtype=np.float64).reshape(-1, 3)
+            tf, length = data[:, 1], data[:, 2]
+            norm = self.k1 * (1.0 - self.b + self.b * length / avg_len)
+            return data[:, 0].astype(np.int64), idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        def kth() -> float:
+            return float(np.partition(scores, -k)[-k]) if len(scores) >= k else -math.inf
+
+        essential = len(weighted)
+        for i, (idf, term_id) in enumerate(weighted):
+            if remaining[i] <= kth():
+                # A document seen in none of the lists so far cannot reach the top k any more.
+                essential = i
+                break
+            ids, part = contributions(
+                idf, conn.execute("SELECT doc_id, tf, length FROM postings WHERE term_id = ?", (term_id,)).fetchall()
+            )
+            doc_ids, inverse = np.unique(np.concatenate([doc_ids, ids]), return_inverse=True)
+            merged = np.zeros(len(doc_ids))
+            np.add.at(merged, inverse, np.concatenate([scores, part]))
+            scores = merged
+        for i in range(essential, len(weighted)):
+            # Only candidates that could still reach the top k, by primary-key lookups.
+            keep = scores + remaining[i] >= kth()
+            doc_ids, scores = doc_ids[keep], scores[keep]
+            idf, term_id = weighted[i]
+            postings = []
+            candidates = doc_ids.tolist()
+            for j in range(0, len(candidates), _MAX_PARAMS):
+                part = candidates[j : j + _MAX_PARAMS]
+                postings += conn.execute(
+                    f"SELECT doc_id, tf, length FROM postings WHERE term_id = ? AND doc_id IN ({','.join('?' * len(part))})",
+                    [term_id, *part],
+                ).fetchall()
+            if postings:
+                ids, part_scores = contributions(idf, postings)
+                np.add.at(scores, np.searchsorted(doc_ids, ids), part_scores)
+        if not len(scores):
+            return []
+        top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        hits = [(int(doc_ids[i]), float(scores[i])) for i in top]
+        rows = {
+            r[0]: (r[1], r[2])
+            for r in conn.execute(
+                f"SELECT id, point_id, source FROM docs WHERE id IN ({','.join('?' * len(hits))})", [h[0] for h in hits]
+            )
+        }
+        return [ScoredDoc(id=rows[d][0], score=s, payload={"source": rows[d][1]}) for d, s in hits]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript(
+                "DELETE FROM postings; DELETE FROM docs; DELETE FROM terms; UPDATE stats SET value = 0;"
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._lock:
+            self._conn.close()
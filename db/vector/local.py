@@ -0,0 +1,472 @@
+import asyncio
+import json
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from core.chunking.base import chunk_id
+from core.retriever.base import ScoredDoc
+from db.vector.quantization import QuantizationConfig, approximate_scores, code_width, encode, normalize
+
+_META = "meta.json"
+_VECTORS = "vectors.bin"
+_CODES = "codes.bin"
+_SCALES = "scales.bin"
+_PAYLOADS = "payloads.sqlite"
+# Rows scored per matmul block; bounds the float32 temporary for float16 or paged-out matrices.
+_BLOCK_ROWS = 65536
+# Searches that find rows rewritten since they were scored run again, at most this often.
+_SEARCH_ATTEMPTS = 3
+
+
+class IVFIndex:
+    """Inverted-file approximate index: k-means centroids, one row list per centroid.
+
+    A query scores only the rows in its `nprobe` nearest lists. Rows added after
+    training are assigned to their nearest centroid; the owner retrains (on write,
+    never during a search) once the collection has grown well past the training size.
+    """
+
+    def __init__(self, centroids: np.ndarray, rows: np.ndarray, assignments: np.ndarray):
+        self.centroids = centroids
+        self.trained_rows = len(rows)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(centroids) + 1))
+        self.lists = [list(rows[order[bounds[i] : bounds[i + 1]]]) for i in range(len(centroids))]
+
+    @classmethod
+    def train(
+        cls, vectors: np.ndarray, rows: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0
+    ) -> "IVFIndex":
+        """Cluster `vectors` (normalized, one per entry of `rows`) into `n_lists` lists."""
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(n_lists):
+                members = sample[labels == i]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[i] = centroid / (np.linalg.norm(centroid) or 1.0)
+        assignments = np.concatenate(
+            [np.argmax(vectors[s : s + _BLOCK_ROWS] @ centroids.T, axis=1) for s in range(0, len(vectors), _BLOCK_ROWS)]
+        )
+        return cls(centroids, rows, assignments)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        for row, label in zip(rows, np.argmax(vectors @ self.centroids.T, axis=1)):
+            self.lists[label].append(int(row))
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.unique(np.fromiter((r for i in probe for r in self.lists[i]), dtype=np.int64))
+
+
+class LocalVectorStore:
+    """In-process vector store: a memory-mapped matrix plus a SQLite payload table.
+
+    Same surface as `QdrantVectorStore` (cosine distance). Vectors are L2-normalized on
+    write, so exact search is a blocked matrix multiply over the memmap. Deleted rows
+    are tombstoned and reused by later inserts. With `ann_min_points` > 0, collections
+    at least that large are searched through an `IVFIndex` kept in memory, trained when
+    the collection is opened or grows, outside the lock searches take.
+
+    Every row records the store version that last wrote it. A search scores a snapshot
+    without holding the lock, then drops (and retries) any hit whose row was rewritten
+    in the meantime, so a score is never paired with another point's ID or payload.
+
+    With quantization, int8 or binary codes are kept in their own memmap and scanned
+    instead of the originals; the originals are only read to rescore the oversampled
+    candidates. Codes are rebuilt from the originals when the configured mode changes.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        path: str | Path = ".rag_data/vectors",
+        dtype: str = "float32",
+        ann_min_points: int = 0,
+        ann_nprobe: int = 8,
+        quantization: QuantizationConfig | None = None,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"unsupported dtype: {dtype}")
+        self.collection_name = collection_name
+        self.root = Path(path) / collection_name
+        self.dtype = np.dtype(dtype)
+        self.ann_min_points = ann_min_points
+        self.ann_nprobe = ann_nprobe
+        self.quantization = quantization or QuantizationConfig()
+        self.version = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._matrix: np.ndarray | None = None
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._dim = 0
+        self._capacity = 0
+        self._rows = 0
+        self._ids: list[str | None] = []
+        self._row_of: dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_version = np.zeros(0, dtype=np.int64)
+        self._free: list[int] = []
+        self._ivf: IVFIndex | None = None
+        self._train_lock = threading.Lock()
+        if (self.root / _META).exists():
+            self._open()
+
+    # -- collection management -------------------------------------------------
+
+    def exists(self) -> bool:
+        return self._conn is not None
+
+    def create_collection(self, vector_size: int) -> None:
+        with self._lock:
+            self._close_files()
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root.mkdir(parents=True)
+            meta = {"dim": self.quantization.stored_dim(vector_size), "dtype": self.dtype.name}
+            (self.root / _META).write_text(json.dumps({**meta, "quantization": self.quantization.mode}))
+            self._open_locked()
+            self.version += 1
+
+    def ensure_collection(self, vector_size: int) -> None:
+        if not self.exists():
+            self.create_collection(vector_size)
+        elif self._dim != self.quantization.stored_dim(vector_size):
+            raise ValueError(
+                f"collection {self.collection_name!r} has dimension {self._dim}, "
+                f"expected {self.quantization.stored_dim(vector_size)}; rebuild the index"
+            )
+
+    def _open(self) -> None:
+        with self._lock:
+            self._open_locked()
+        self._maybe_train()
+
+    def _open_locked(self) -> None:
+        meta = json.loads((self.root / _META).read_text())
+        self._dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        self._conn = sqlite3.connect(str(self.root / _PAYLOADS), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "row INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE, source TEXT, payload TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS points_source ON points(source)")
+        self._conn.commit()
+        vectors = self.root / _VECTORS
+        vectors.touch()
+        self._capacity = vectors.stat().st_size // (self._dim * self.dtype.itemsize)
+        # Codes written under another mode (or never) are stale: drop them and rebuild below.
+        mode_changed = meta.get("quantization", "none") != self.quantization.mode
+        rebuild_codes = self.quantization.enabled and (mode_changed or not (self.root / _CODES).exists())
+        if mode_changed or rebuild_codes:
+            for name in (_CODES, _SCALES):
+                (self.root / name).unlink(missing_ok=True)
+        self._map()
+        rows = self._conn.execute("SELECT row, point_id FROM points").fetchall()
+        self._rows = max((r for r, _ in rows), default=-1) + 1
+        self._ids = [None] * self._rows
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._row_version = np.zeros(self._capacity, dtype=np.int64)
+        for row, point_id in rows:
+            self._ids[row] = point_id
+            self._row_of[point_id] = row
+            self._alive[row] = True
+        self._free = [r for r in range(self._rows) if not self._alive[r]]
+        self._ivf = None
+        if rebuild_codes:
+            for start in range(0, self._rows, _BLOCK_ROWS):
+                end = min(self._rows, start + _BLOCK_ROWS)
+                self._write_codes(np.arange(start, end), np.asarray(self._matrix[start:end], dtype=np.float32))
+        if mode_changed:
+            (self.root / _META).write_text(json.dumps({**meta, "quantization": self.quantization.mode}))
+
+    def _map_file(self, name: str, dtype, width: int | None) -> np.ndarray:
+        path = self.root / name
+        shape = (self._capacity,) if width is None else (self._capacity, width)
+        if not self._capacity:
+            return np.zeros(shape, dtype=dtype)
+        size = self._capacity * (width or 1) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _map(self) -> None:
+        self._matrix = self._map_file(_VECTORS, self.dtype, self._dim)
+        if self.quantization.enabled:
+            mode = self.quantization.mode
+            self._codes = self._map_file(_CODES, np.int8 if mode == "int8" else np.uint8, code_width(mode, self._dim))
+            self._scales = self._map_file(_SCALES, np.float32, None)
+
+    def _write_codes(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if self.quantization.enabled:
+            self._codes[rows], self._scales[rows] = encode(self.quantization.mode, vectors)
+
+    def memory_bytes(self) -> dict[str, int]:
+        """Bytes scanned by an exact search (the RAM working set) and total bytes on disk."""
+        n = self._rows
+        originals = n * self._dim * self.dtype.itemsize
+        if not self.quantization.enabled:
+            return {"search_bytes": originals, "disk_bytes": originals}
+        codes = n * (code_width(self.quantization.mode, self._dim) + 4)
+        return {"search_bytes": codes, "disk_bytes": originals + codes}
+
+    def _grow(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(1024, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        for mapped in (self._matrix, self._codes, self._scales):
+            if isinstance(mapped, np.memmap):
+                mapped.flush()
+        self._capacity = capacity
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._row_version = np.concatenate(
+            [self._row_version, np.zeros(capacity - len(self._row_version), dtype=np.int64)]
+        )
+        self._map()
+
+    def _require(self) -> None:
+        if self._conn is None:
+            raise RuntimeError(f"collection {self.collection_name!r} does not exist; call create_collection first")
+
+    # -- writes ----------------------------------------------------------------
+
+    async def upsert(self, vectors, payloads, ids=None):
+        if ids is None:
+            ids = [chunk_id(p.get("source", ""), p.get("text", "")) for p in payloads]
+        await asyncio.to_thread(self._upsert, [str(i) for i in ids], vectors, payloads)
+
+    def _upsert(self, ids: list[str], vectors, payloads: list[dict]) -> None:
+        matrix = normalize(self.quantization.truncate(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)))
+        with self._lock:
+            self._require()
+            if matrix.shape[1] != self._dim:
+                raise ValueError(f"expected vectors of dimension {self._dim}, got {matrix.shape[1]}")
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, point_id in enumerate(ids):
+                row = self._row_of.get(point_id)
+                if row is None:
+                    row = self._free.pop() if self._free else self._append_row()
+                    self._row_of[point_id] = row
+                    self._ids[row] = point_id
+                rows[i] = row
+            self._grow(self._rows)
+            self.version += 1
+            self._matrix[rows] = matrix.astype(self.dtype)
+            self._write_codes(rows, matrix)
+            self._alive[rows] = True
+            self._row_version[rows] = self.version
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points (row, point_id, source, payload) VALUES (?, ?, ?, ?)",
+                [(int(r), i, p.get("source"), json.dumps(p)) for r, i, p in zip(rows, ids, payloads)],
+            )
+            self._conn.commit()
+            if self._ivf is not None:
+                self._ivf.add(rows, matrix)
+        self._maybe_train()
+
+    def _maybe_train(self) -> None:
+        """Train the IVF index once the collection reaches `ann_min_points`, and again each time it doubles."""
+        if not self.ann_min_points:
+            return
+        with self._train_lock:
+            with self._lock:
+                live = len(self._row_of)
+                if live < self.ann_min_points or (self._ivf is not None and live <= 2 * self._ivf.trained_rows):
+                    return
+                conn, version = self._conn, self.version
+                rows = np.flatnonzero(self._alive[: self._rows])
+                vectors = np.asarray(self._matrix[rows], dtype=np.float32)
+            # The slow part runs unlocked: searches and writes go on with the previous index.
+            ivf = IVFIndex.train(vectors, rows, n_lists=max(1, int(np.sqrt(live))))
+            with self._lock:
+                if self._conn is not conn:  # collection recreated meanwhile
+                    return
+                written = np.flatnonzero((self._row_version[: self._rows] > version) & self._alive[: self._rows])
+                if len(written):
+                    ivf.add(written, np.asarray(self._matrix[written], dtype=np.float32))
+                self._ivf = ivf
+
+    def _append_row(self) -> int:
+        self._rows += 1
+        self._ids.append(None)
+        return self._rows - 1
+
+    async def delete_by_source(self, source: str, keep_ids=None) -> None:
+        """Delete every point from `source` except those in `keep_ids`."""
+        await asyncio.to_thread(self._delete_by_source, source, set(map(str, keep_ids or ())))
+
+    def _delete_by_source(self, source: str, keep: set[str]) -> None:
+        with self._lock:
+            self._require()
+            rows = [
+                (row, point_id)
+                for row, point_id in self._conn.execute(
+                    "SELECT row, point_id FROM points WHERE source = ?", (source,)
+                ).fetchall()
+                if point_id not in keep
+            ]
+            self._conn.executemany("DELETE FROM points WHERE row = ?", [(r,) for r, _ in rows])
+            self._conn.commit()
+            self.version += 1
+            for row, point_id in rows:
+                self._alive[row] = False
+                self._row_version[row] = self.version
+                self._ids[row] = None
+                del self._row_of[point_id]
+                self._free.append(row)
+
+    # -- search ----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    async def search(self, query_vector, k=5):
+        return (await self.search_batch([query_vector], k=k))[0]
+
+    async def search_batch(self, query_vectors, k=5) -> list[list[ScoredDoc]]:
+        # Always off the event loop: the lock it takes is also held by writes.
+        return await asyncio.to_thread(self.search_batch_sync, query_vectors, k)
+
+    def search_batch_sync(self, query_vectors, k: int = 5) -> list[list[ScoredDoc]]:
+        queries = normalize(self.quantization.truncate(query_vectors).reshape(len(query_vectors), -1))
+        for _ in range(_SEARCH_ATTEMPTS):
+            results, complete = self._search_once(queries, k)
+            if complete:
+                break
+        return results
+
+    def _search_once(self, queries: np.ndarray, k: int) -> tuple[list[list[ScoredDoc]], bool]:
+        with self._lock:
+            self._require()
+            # Snapshot under the lock; rows written later are not seen, or dropped by _fetch.
+            matrix, codes, scales = self._matrix, self._codes, self._scales
+            alive, n = self._alive[: self._rows].copy(), self._rows
+            version = self.version
+            use_ivf = self.ann_min_points and len(self._row_of) >= self.ann_min_points
+            ivf = self._ivf if use_ivf else None
+        if n == 0 or k <= 0 or not alive.any():
+            return [[] for _ in range(len(queries))], True
+        quantized = self.quantization.enabled
+        take = self.quantization.candidates(k)
+        if ivf is None:
+            scores = np.empty((len(queries), n), dtype=np.float32)
+            for start in range(0, n, _BLOCK_ROWS):
+                end = min(n, start + _BLOCK_ROWS)
+                scores[:, start:end] = (
+                    approximate_scores(self.quantization.mode, queries, codes[start:end], scales[start:end], self._dim)
+                    if quantized
+                    else queries @ np.asarray(matrix[start:end], dtype=np.float32).T
+                )
+            scores[:, ~alive] = -np.inf
+            hits = [self._top_k(np.arange(n), row, take) for row in scores]
+        else:
+            hits = []
+            for query in queries:
+                rows = ivf.candidates(query, self.ann_nprobe)
+                rows = rows[(rows < n) & alive[np.minimum(rows, n - 1)]]
+                approx = (
+                    approximate_scores(self.quantization.mode, query[None], codes[rows], scales[rows], self._dim)[0]
+                    if quantized
+                    else np.asarray(matrix[rows], dtype=np.float32) @ query
+                )
+                hits.append(self._top_k(rows, approx, take))
+        if quantized and self.quantization.rescore:
+            hits = [self._rescore(matrix, query, query_hits, k) for query, query_hits in zip(queries, hits)]
+        else:
+            hits = [query_hits[:k] for query_hits in hits]
+        return self._fetch(hits, version)
+
+    def _rescore(self, matrix: np.ndarray, query: np.ndarray, hits: list[tuple[int, float]], k: int):
+        rows = np.array(sorted(r for r, _ in hits), dtype=np.int64)
+        if not len(rows):
+            return []
+        return self._top_k(rows, np.asarray(matrix[rows], dtype=np.float32) @ query, k)
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+        valid = np.isfinite(scores)
+        rows, scores = rows[valid], scores[valid]
+        if len(scores) > k:
+            part = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def _fetch(self, hits: list[list[tuple[int, float]]], version: int) -> tuple[list[list[ScoredDoc]], bool]:
+        """IDs and payloads for the hits, leaving out rows written after `version`; False if any were."""
+        rows = sorted({r for query_hits in hits for r, _ in query_hits})
+        if not rows:
+            return [[] for _ in hits], True
+        with self._lock:
+            current = [r for r in rows if self._row_version[r] <= version]
+            complete = len(current) == len(rows)
+            rows = current
+            marks = ",".join("?" * len(rows))
+            found = {
+                row: (point_id, payload)
+                for row, point_id, payload in self._conn.execute(
+                    f"SELECT row, point_id, payload FROM points WHERE row IN ({marks})", rows
+                ).fetchall()
+            }
+        results = [
+            [
+                ScoredDoc(id=found[r][0], score=s, payload=json.loads(found[r][1]))
+                for r, s in query_hits
+                if r in found
+            ]
+            for query_hits in hits
+        ]
+        return results, complete
+
+    async def payloads(self, ids) -> dict[str, dict]:
+        """Payloads of the given point IDs; IDs not in the collection are left out."""
+        return await asyncio.to_thread(self._payloads, [str(i) for i in ids])
+
+    def _payloads(self, ids: list[str]) -> dict[str, dict]:
+        if not ids:
+            return {}
+        with self._lock:
+            self._require()
+            rows = self._conn.execute(
+                f"SELECT point_id, payload FROM points WHERE point_id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {point_id: json.loads(payload) for point_id, payload in rows}
+
+    # -- lifecycle -------------------------------------------------------------
+
+    async def ping(self) -> None:
+        self._require()
+
+    async def aclose(self) -> None:
+        pass
+
+    def _close_files(self) -> None:
+        for mapped in (self._matrix, self._codes, self._scales):
+            if isinstance(mapped, np.memmap):
+                mapped.flush()
+        self._matrix = self._codes = self._scales = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._rows = self._capacity = 0
+        self._ids, self._row_of, self._free = [], {}, []
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_version = np.zeros(0, dtype=np.int64)
+        self._ivf = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
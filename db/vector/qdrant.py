@@ -1,41 +1,185 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-import uuid
+import asyncio
+from weakref import WeakKeyDictionary
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
+    VectorParams,
+)
+
+from core.chunking.base import chunk_id
+from db.vector.quantization import QuantizationConfig
 
 class QdrantVectorStore:
-    def __init__(self, collection_name: str, host="localhost", port=6333):
-        self.client = QdrantClient(host=host, port=port)
+    def __init__(
+        self,
+        collection_name: str,
+        host="localhost",
+        port=6333,
+        grpc_port: int = 6334,
+        prefer_grpc: bool = False,
+        timeout: int | None = None,
+        quantization: QuantizationConfig | None = None,
+    ):
+        self._client_kwargs = dict(
+            host=host,
+            port=port,
+            grpc_port=grpc_port,
+            prefer_grpc=prefer_grpc,
+            timeout=timeout,
+        )
+        # Sync client for admin/CLI paths (collection management); data path uses aclient.
+        self.client = QdrantClient(**self._client_kwargs)
         self.collection_name = collection_name
+        self.quantization = quantization or QuantizationConfig()
+        # Async clients hold loop-bound connections, so keep one per event loop
+        # (e.g. the API loop and a background ingestion loop) and reuse it.
+        self._async_clients: WeakKeyDictionary = WeakKeyDictionary()
+        # Bumped on every write so caches keyed on collection contents can invalidate.
+        self.version = 0
+
+    @property
+    def aclient(self) -> AsyncQdrantClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncQdrantClient(**self._client_kwargs)
+            self._async_clients[loop] = client
+        return client
 
     def create_collection(self, vector_size: int):
+        self.version += 1
         self.client.recreate_collection(
             collection_name=self.collection_name,
             vectors_config=VectorParams(
-                size=vector_size,
+                size=self.quantization.stored_dim(vector_size),
                 distance=Distance.COSINE,
+                on_disk=self.quantization.on_disk or None,
+                quantization_config=self._quantization_config(),
             ),
         )
+        # Stale-chunk deletion filters on source, so index it.
+        self.client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="source",
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
 
-    async def upsert(self, vectors, payloads):
+    def _quantization_config(self):
+        # Compressed codes stay in RAM; originals follow on_disk and are only read to rescore.
+        if self.quantization.mode == "int8":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization.mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _prepare(self, vector):
+        return self.quantization.truncate(vector).tolist() if self.quantization.truncate_dim else vector
+
+    def ensure_collection(self, vector_size: int):
+        # Not get_collection: a missing collection raises UnexpectedResponse over REST but
+        # grpc.RpcError (NOT_FOUND) with prefer_grpc, while collection_exists works over both.
+        if not self.client.collection_exists(self.collection_name):
+            self.create_collection(vector_size)
+
+    async def upsert(self, vectors, payloads, ids=None):
+        if ids is None:
+            ids = [chunk_id(p.get("source", ""), p.get("text", "")) for p in payloads]
         points = [
             PointStruct(
-                id=str(uuid.uuid4()),
-                vector=vector,
+                id=point_id,
+                vector=self._prepare(vector),
                 payload=payload
             )
-            for vector, payload in zip(vectors, payloads)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
         ]
 
-        self.client.upsert(
+        await self.aclient.upsert(
             collection_name=self.collection_name,
             points=points
         )
+        self.version += 1
+
+    def _search_params(self) -> SearchParams | None:
+        if not self.quantization.enabled:
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=self.quantization.rescore,
+                oversampling=self.quantization.oversampling,
+            )
+        )
 
     async def search(self, query_vector, k=5):
-        results = self.client.search(
+        results = await self.aclient.search(
             collection_name=self.collection_name,
-            query_vector=query_vector,
-            limit=k
+            query_vector=self._prepare(query_vector),
+            limit=k,
+            search_params=self._search_params(),
         )
 
-        return results
\ No newline at end of file
+        return results
+
+    async def search_batch(self, query_vectors, k=5):
+        """One round trip for several queries; results are in query order."""
+        requests = [
+            SearchRequest(
+                vector=[float(x) for x in self._prepare(vector)],
+                limit=k,
+                params=self._search_params(),
+                with_payload=True,
+            )
+            for vector in query_vectors
+        ]
+        return await self.aclient.search_batch(collection_name=self.collection_name, requests=requests)
+
+    async def payloads(self, ids) -> dict[str, dict]:
+        """Payloads of the given point IDs; IDs not in the collection are left out."""
+        if not ids:
+            return {}
+        records = await self.aclient.retrieve(
+            collection_name=self.collection_name, ids=list(ids), with_payload=True, with_vectors=False
+        )
+        return {str(r.id): r.payload for r in records}
+
+    async def delete_by_source(self, source: str, keep_ids=None) -> None:
+        """Delete every point from `source` except those in `keep_ids`."""
+        await self.aclient.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[FieldCondition(key="source", match=MatchValue(value=source))],
+                    must_not=[HasIdCondition(has_id=list(keep_ids))] if keep_ids else None,
+                )
+            ),
+        )
+        self.version += 1
+
+    async def ping(self) -> None:
+        await self.aclient.get_collections()
+
+    async def aclose(self) -> None:
+        """Close the async client bound to the running loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def close(self) -> None:
+        self.client.close()
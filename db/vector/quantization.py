@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+MODES = ("none", "int8", "binary")
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class QuantizationConfig:
+    """Compression settings shared by the vector store backends.
+
+    `mode` picks the in-memory search representation (full precision, scalar int8 or
+    1-bit binary). With compression, search takes `oversampling` × k candidates from
+    the compressed codes and, if `rescore`, reorders them with the full-precision
+    vectors, which `on_disk` keeps out of RAM. `truncate_dim` > 0 keeps only the
+    leading dimensions of each embedding (Matryoshka-trained models only).
+    """
+
+    mode: str = "none"
+    truncate_dim: int = 0
+    on_disk: bool = False
+    oversampling: float = 2.0
+    rescore: bool = True
+
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"unknown quantization mode {self.mode!r}; expected one of {MODES}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "none"
+
+    @property
+    def label(self) -> str:
+        parts = [self.mode]
+        if self.truncate_dim:
+            parts.append(f"dim{self.truncate_dim}")
+        if self.enabled and not self.rescore:
+            parts.append("norescore")
+        return "-".join(parts)
+
+    def stored_dim(self, vector_size: int) -> int:
+        if self.truncate_dim > vector_size:
+            raise ValueError(f"truncate_dim {self.truncate_dim} exceeds embedding dimension {vector_size}")
+        return self.truncate_dim or vector_size
+
+    def truncate(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors[..., : self.truncate_dim] if self.truncate_dim else vectors
+
+    def candidates(self, k: int) -> int:
+        return max(k, int(np.ceil(k * self.oversampling))) if self.enabled else k
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def code_width(mode: str, dim: int) -> int:
+    """Bytes per vector in the compressed representation."""
+    return dim if mode == "int8" else (dim + 7) // 8
+
+
+def encode(mode: str, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Codes and per-row scales (int8 only; ones for binary) for normalized `vectors`."""
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return np.packbits(vectors > 0, axis=1), np.ones(len(vectors), dtype=np.float32)
+
+
+def approximate_scores(mode: str, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray, dim: int) -> np.ndarray:
+    """Approximate cosine similarity of normalized `queries` against a block of codes."""
+    if mode == "int8":
+        return (queries @ codes.T.astype(np.float32)) * scales
+    query_bits = np.packbits(queries > 0, axis=1)
+    hamming = np.stack([_POPCOUNT[codes ^ q].sum(axis=1, dtype=np.int32) for q in query_bits])
+    return 1.0 - 2.0 * hamming / dim
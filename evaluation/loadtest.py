@@ -0,0 +1,310 @@
+"""Concurrent load tests of the query API against deterministic local stand-ins.
+
+The FastAPI app is driven in-process (ASGI transport), through a uvicorn server
+started in the same process, or at an external URL. Embedding, vector search and
+generation are replaced by deterministic stand-ins with configurable latency, so runs
+are reproducible and differences between them come from our own code
+(`RAGService`, `VectorRetriever`, rerankers, routing) rather than from a model or
+Ollama. Results are plain dicts, ready to be written as JSON and compared.
+"""
+import asyncio
+import platform
+import random
+import tempfile
+import time
+import zlib
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from core.embeddings.base import BaseEmbedding
+from core.llm.base import BaseLLM
+from core.rag_service import RAGService
+from core.retriever.reranker import BM25Reranker, KeywordReranker, RerankingRetriever
+from core.retriever.tokens import token_stats
+from core.retriever.vector import VectorRetriever
+from db.vector.local import LocalVectorStore
+from evaluation.metrics import latency_percentiles
+
+_VOCABULARY = (
+    "vector database chunk embedding query answer context retrieval generation index search rerank "
+    "token prompt model latency cache source document page section paragraph sentence score cluster "
+    "quantization memory disk network server client batch stream worker queue pipeline ingest"
+).split()
+
+ENDPOINTS = ("/query/", "/query/stream")
+MODES = ("asgi", "uvicorn", "url")
+
+
+@dataclass
+class LoadTestConfig:
+    requests: int = 200
+    concurrency: int = 16
+    # Open loop at this many requests/s (latency then includes queueing); 0 = closed loop.
+    rate: float = 0.0
+    endpoint: str = "/query/"
+    mode: str = "asgi"
+    url: str = ""
+    embed_latency_ms: float = 5.0
+    search_latency_ms: float = 2.0
+    llm_latency_ms: float = 50.0
+    token_latency_ms: float = 2.0
+    corpus_size: int = 2000
+    dim: int = 64
+    top_k: int = 5
+    reranker: str = "none"
+    rerank_initial_k: int = 50
+    warmup_requests: int = 10
+    seed: int = 0
+
+
+class StandInEmbedding(BaseEmbedding):
+    """Bag-of-words embedding: the sum of fixed pseudo-random word vectors."""
+
+    def __init__(self, dim: int = 64, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency = latency_ms / 1000
+        self._words: dict[str, np.ndarray] = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            vector = np.random.default_rng(zlib.crc32(word.encode())).normal(size=self.dim)
+            self._words[word] = vector
+        return vector
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        return [
+            sum((self._word(w) for w in text.lower().split()), np.zeros(self.dim)).tolist() for text in texts
+        ]
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.encode(texts)
+
+
+class StandInVectorStore(LocalVectorStore):
+    """The embedded store with a fixed delay added to every search, standing in for a network hop."""
+
+    def __init__(self, *args, latency_ms: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency_ms / 1000
+
+    async def search(self, query_vector, k: int = 5):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await super().search(query_vector, k=k)
+
+    async def search_batch(self, query_vectors, k: int = 5):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await super().search_batch(query_vectors, k=k)
+
+
+class StandInLLM(BaseLLM):
+    """Answers derived from the prompt; `latency_ms` before the first token, `token_latency_ms` per token."""
+
+    def __init__(self, latency_ms: float = 0.0, token_latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.token_latency = token_latency_ms / 1000
+
+    def _tokens(self, prompt: str) -> list[str]:
+        return f"Stand-in answer {zlib.crc32(prompt.encode()):08x} for a {len(prompt)}-char prompt.".split(" ")
+
+    async def generate(self, prompt: str) -> str:
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(self.latency + self.token_latency * len(tokens))
+        return " ".join(tokens)
+
+    async def stream(self, prompt: str):
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(self._tokens(prompt)):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield token if i == 0 else " " + token
+
+
+def synthetic_corpus(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(_VOCABULARY, k=rng.randint(20, 60))) + "." for _ in range(size)]
+
+
+def synthetic_queries(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed + 1)
+    return [" ".join(rng.sample(_VOCABULARY, rng.randint(2, 5))) + "?" for _ in range(count)]
+
+
+@asynccontextmanager
+async def stand_in_service(config: LoadTestConfig):
+    """A RAGService over a synthetic corpus indexed in a temporary embedded store."""
+    embedding = StandInEmbedding(config.dim, config.embed_latency_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StandInVectorStore("loadtest", path=tmp, latency_ms=config.search_latency_ms)
+        store.create_collection(vector_size=config.dim)
+        texts = synthetic_corpus(config.corpus_size, config.seed)
+        payloads = [
+            {"text": t, "source": f"doc{i // 10}.txt", "chunk_index": i % 10, **token_stats(t)}
+            for i, t in enumerate(texts)
+        ]
+        await store.upsert(embedding.encode(texts), payloads, ids=[str(i) for i in range(len(texts))])
+        retriever = VectorRetriever(embedding, store)
+        if config.reranker != "none":
+            reranker = BM25Reranker() if config.reranker == "bm25" else KeywordReranker()
+            retriever = RerankingRetriever(retriever, reranker, initial_k=config.rerank_initial_k, top_k=config.top_k)
+        try:
+            yield RAGService(retriever, StandInLLM(config.llm_latency_ms, config.token_latency_ms), top_k=config.top_k)
+        finally:
+            store.close()
+
+
+async def _monitor_lag(samples: list[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """How late the loop wakes up from a short sleep, in ms: time the app spent blocking it."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (loop.time() - start - interval) * 1000))
+
+
+@asynccontextmanager
+async def _client(config: LoadTestConfig, service: RAGService | None):
+    import httpx
+
+    if config.mode == "url":
+        async with httpx.AsyncClient(base_url=config.url, timeout=60.0) as client:
+            yield client
+        return
+    from app import auth
+    from app.dependencies import container
+    from app.main import app
+
+    # Install the stand-in as the app's built RAG service rather than through
+    # dependency_overrides, which FastAPI re-analyzes on every request.
+    previous = container.__dict__.get("rag_service")
+    container.__dict__["rag_service"] = service
+    # Likewise switch off API_KEY and RATE_LIMIT_PER_MINUTE for the run, so an environment
+    # that sets them still measures latency rather than 401s and 429s.
+    api_key, rate_limiter = auth.settings.api_key, auth.rate_limiter
+    auth.settings.api_key, auth.rate_limiter = "", None
+    try:
+        if config.mode == "asgi":
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60.0
+            ) as client:
+                yield client
+            return
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0) as client:
+                yield client
+        finally:
+            server.should_exit = True
+            await serving
+    finally:
+        auth.settings.api_key, auth.rate_limiter = api_key, rate_limiter
+        if previous is None:
+            container.__dict__.pop("rag_service", None)
+        else:
+            container.__dict__["rag_service"] = previous
+
+
+async def _send(client, endpoint: str, query: str) -> int:
+    if endpoint == "/query/stream":
+        async with client.stream("POST", endpoint, json={"query": query}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event: error"):
+                    return 599
+            return response.status_code
+    response = await client.post(endpoint, json={"query": query})
+    return response.status_code
+
+
+async def run_load_test(config: LoadTestConfig) -> dict:
+    if config.endpoint not in ENDPOINTS:
+        raise ValueError(f"endpoint must be one of {ENDPOINTS}")
+    if config.mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    queries = synthetic_queries(max(1, min(config.requests, 500)), config.seed)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+
+    async with stand_in_service(config) if config.mode != "url" else nullcontext() as service:
+        async with _client(config, service) as client:
+            for i in range(config.warmup_requests):
+                await _send(client, config.endpoint, queries[i % len(queries)])
+
+            async def one(i: int, scheduled: float) -> None:
+                try:
+                    status = str(await _send(client, config.endpoint, queries[i % len(queries)]))
+                except Exception as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - scheduled) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+            lag: list[float] = []
+            stop = asyncio.Event()
+            monitor = asyncio.create_task(_monitor_lag(lag, stop))
+            start = time.perf_counter()
+            if config.rate > 0:
+                # Open loop: request i is due at start + i / rate whether or not earlier ones finished.
+                semaphore = asyncio.Semaphore(max(1, config.concurrency))
+
+                async def scheduled(i: int) -> None:
+                    due = start + i / config.rate
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                    async with semaphore:
+                        await one(i, due)
+
+                await asyncio.gather(*(scheduled(i) for i in range(config.requests)))
+            else:
+                counter = iter(range(config.requests))
+
+                async def worker() -> None:
+                    for i in counter:
+                        await one(i, time.perf_counter())
+
+                await asyncio.gather(*(worker() for _ in range(max(1, config.concurrency))))
+            duration = time.perf_counter() - start
+            stop.set()
+            await monitor
+
+    errors = sum(n for status, n in statuses.items() if status != "200")
+    lag_summary = latency_percentiles(lag, (50, 99))
+    return {
+        "config": asdict(config),
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / max(1, len(latencies)),
+        "status_counts": statuses,
+        "duration_s": duration,
+        "throughput_rps": len(latencies) / duration if duration > 0 else 0.0,
+        **latency_percentiles(latencies, (50, 95, 99)),
+        "max_ms": max(latencies, default=0.0),
+        "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+        "loop_lag": {**lag_summary, "max_ms": max(lag, default=0.0)},
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+    }
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.2) -> list[str]:
+    """Regressions of `current` against `baseline`: latency or error rate up, or throughput down, beyond `tolerance`."""
+    regressions = []
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if baseline.get(key) and current[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {baseline[key]:.1f} -> {current[key]:.1f}")
+    if baseline.get("throughput_rps") and current["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput_rps: {baseline['throughput_rps']:.1f} -> {current['throughput_rps']:.1f}")
+    if current["error_rate"] > baseline.get("error_rate", 0.0) + 0.01:
+        regressions.append(f"error_rate: {baseline.get('error_rate', 0.0):.3f} -> {current['error_rate']:.3f}")
+    return regressions
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 def is_hit(
     payload: dict,
@@ -31,18 +33,13 @@ def recall_at_k(
     return False
 
 
-def latency_percentiles(latencies_ms: list[float]) -> dict[str, float]:
-    """Return p50 and p95 in ms. Empty list returns 0.0 for both."""
+def latency_percentiles(latencies_ms: list[float], percentiles: tuple[int, ...] = (50, 95)) -> dict[str, float]:
+    """Return {"p50_ms": ..., "p95_ms": ...} (one key per percentile). Empty list returns 0.0 for each."""
     if not latencies_ms:
-        return {"p50_ms": 0.0, "p95_ms": 0.0}
+        return {f"p{p}_ms": 0.0 for p in percentiles}
     sorted_ms = sorted(latencies_ms)
     n = len(sorted_ms)
-    p50_idx = min(int(0.50 * n), n - 1)
-    p95_idx = min(int(0.95 * n), n - 1)
-    return {
-        "p50_ms": sorted_ms[p50_idx],
-        "p95_ms": sorted_ms[p95_idx],
-    }
+    return {f"p{p}_ms": sorted_ms[min(int(p / 100 * n), n - 1)] for p in percentiles}
 
 
 def rank_of_first_hit(
@@ -95,4 +92,29 @@ def ndcg_at_k(
     idcg = sum(rel / (math.log2(i + 2) or 1.0) for i, rel in enumerate(ideal))
     if idcg <= 0:
         return 0.0
-    return dcg / idcg
\ No newline at end of file
+    return dcg / idcg
+
+
+def relevance_matrix(results: list[list], cases: list, k: int) -> np.ndarray:
+    """Boolean (queries, k) matrix: is the document at each rank a hit for that query's case."""
+    relevance = np.zeros((len(cases), k), dtype=bool)
+    for row, (retrieved, case) in enumerate(zip(results, cases)):
+        for rank, point in enumerate(retrieved[:k]):
+            payload = getattr(point, "payload", point) if not isinstance(point, dict) else point
+            relevance[row, rank] = is_hit(payload, case.expected_source_substr, case.expected_phrase_in_text)
+    return relevance
+
+
+def ranking_metrics(relevance: np.ndarray) -> dict[str, float]:
+    """Mean recall@k, MRR@k and NDCG@k over a relevance matrix; per query they equal the functions above."""
+    if not len(relevance):
+        return {"recall_at_k": 0.0, "mrr_at_k": 0.0, "ndcg_at_k": 0.0}
+    hit = relevance.any(axis=1)
+    first = relevance.argmax(axis=1)
+    discounts = 1.0 / np.log2(np.arange(relevance.shape[1]) + 2)
+    return {
+        "recall_at_k": float(hit.mean()),
+        "mrr_at_k": float(np.where(hit, 1.0 / (first + 1), 0.0).mean()),
+        # The ideal DCG of a single relevant document at rank 1 is 1, as in ndcg_at_k.
+        "ndcg_at_k": float((relevance * discounts).sum(axis=1).mean()),
+    }
@@ -0,0 +1,98 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from db.vector.local import LocalVectorStore
+from db.vector.quantization import QuantizationConfig
+from evaluation.metrics import latency_percentiles, recall_at_k
+from ingestion.pipeline import IngestionPipeline
+
+
+class _Collector:
+    """Stand-in vector store that keeps what the ingestion pipeline would upsert."""
+
+    def __init__(self):
+        self.vectors: list = []
+        self.payloads: list[dict] = []
+
+    async def upsert(self, vectors, payloads, ids=None):
+        self.vectors.extend(vectors)
+        self.payloads.extend(payloads)
+
+
+async def embed_corpus(embedding, source: Path) -> tuple[np.ndarray, list[dict]]:
+    """Chunk and embed `source` once through the ingestion pipeline; every mode reuses the result."""
+    collector = _Collector()
+    await IngestionPipeline(embedding, collector).run(source)
+    return np.asarray(collector.vectors, dtype=np.float32), collector.payloads
+
+
+def default_configs(
+    truncate_dims: list[int] | None = None, oversampling: float = 2.0
+) -> list[QuantizationConfig]:
+    configs = [QuantizationConfig()]
+    for dim in [0, *(truncate_dims or [])]:
+        if dim:
+            configs.append(QuantizationConfig(truncate_dim=dim))
+        for mode in ("int8", "binary"):
+            for rescore in (True, False):
+                configs.append(
+                    QuantizationConfig(mode=mode, truncate_dim=dim, oversampling=oversampling, rescore=rescore)
+                )
+    return configs
+
+
+async def compare_quantization(
+    vectors: np.ndarray,
+    payloads: list[dict],
+    query_vectors: np.ndarray,
+    configs: list[QuantizationConfig],
+    k: int = 5,
+    cases: list | None = None,
+    repeats: int = 3,
+    workdir: str | Path | None = None,
+) -> list[dict]:
+    """Recall, latency and memory of each compression config.
+
+    `recall_vs_exact` is the mean overlap of each query's top-k with the top-k of the
+    first config (uncompressed in `default_configs`). When `cases` is given, its test
+    cases correspond to the first queries and `case_recall` is the fraction of them
+    with a relevant hit in the top k.
+    """
+    ids = [str(i) for i in range(len(payloads))]
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        exact = None
+        rows = []
+        for config in configs:
+            store = LocalVectorStore(config.label, path=tmp, quantization=config)
+            store.create_collection(vector_size=vectors.shape[1])
+            for start in range(0, len(ids), 1024):
+                end = start + 1024
+                await store.upsert(vectors[start:end], payloads[start:end], ids=ids[start:end])
+            results = await store.search_batch(query_vectors, k=k)
+            latencies = []
+            for _ in range(repeats):
+                for query in query_vectors:
+                    t0 = time.perf_counter()
+                    await store.search(query, k=k)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+            if exact is None:
+                exact = [{h.id for h in hits} for hits in results]
+            overlap = [len(want & {h.id for h in hits}) / max(1, len(want)) for want, hits in zip(exact, results)]
+            row = {
+                "mode": config.label,
+                "recall_vs_exact": float(np.mean(overlap)) if overlap else 0.0,
+                **latency_percentiles(latencies),
+                **store.memory_bytes(),
+            }
+            if cases:
+                hits = [
+                    recall_at_k(r, c.expected_source_substr, c.expected_phrase_in_text, k=k)
+                    for c, r in zip(cases, results)
+                ]
+                row["case_recall"] = sum(hits) / len(hits)
+            rows.append(row)
+            store.close()
+    return rows
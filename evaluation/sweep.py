@@ -0,0 +1,248 @@
+"""Evaluate a grid of chunking and reranking settings in one run.
+
+Documents are loaded once. Each distinct chunking (chunker, size, overlap) is built
+into its own temporary embedded index, and every unique chunk text across all variants
+is embedded exactly once, so variants that produce identical chunks share their
+vectors (pass a `CachedEmbedding` with a disk cache to also reuse them across runs).
+Reranking settings reuse the index of their chunking. Queries are embedded once,
+retrieved in concurrent batches and scored with the vectorized metrics; latency is
+timed afterwards, one variant and one query at a time, once every concurrent pass has
+finished, so that contention does not skew it.
+"""
+import asyncio
+import itertools
+import json
+import tempfile
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+from core.chunking.paragraph_chunker import ParagraphChunker
+from core.chunking.smart_chunker import SmartChunker
+from core.retriever.reranker import BM25Reranker, KeywordReranker, RerankingRetriever
+from core.retriever.tokens import token_stats
+from core.retriever.vector import VectorRetriever
+from db.vector.local import LocalVectorStore
+from evaluation.metrics import latency_percentiles, ranking_metrics, relevance_matrix
+from evaluation.test_queries import TestCase
+from ingestion.loaders import LoadedDoc, iter_files, load_file
+
+_EMBED_BATCH = 256
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    chunker_type: str = "smart"
+    chunk_size: int = 512
+    chunk_overlap: int = 50
+    reranker_type: str = "none"
+    rerank_initial_k: int = 20
+
+    @property
+    def index_key(self) -> tuple[str, int, int]:
+        return self.chunker_type, self.chunk_size, self.chunk_overlap
+
+    @property
+    def label(self) -> str:
+        label = f"{self.chunker_type}/{self.chunk_size}/{self.chunk_overlap}"
+        if self.reranker_type != "none":
+            label += f" {self.reranker_type}@{self.rerank_initial_k}"
+        return label
+
+    def chunker(self):
+        if self.chunker_type == "paragraph":
+            return ParagraphChunker(chunk_size=self.chunk_size, overlap=self.chunk_overlap)
+        return SmartChunker(chunk_size=self.chunk_size, overlap=self.chunk_overlap)
+
+
+def config_grid(base: SweepConfig | None = None, **axes: list) -> list[SweepConfig]:
+    """Cartesian product of `axes` (SweepConfig field -> values) over `base`; duplicates dropped."""
+    base = base or SweepConfig()
+    names = [f.name for f in fields(SweepConfig)]
+    unknown = set(axes) - set(names)
+    if unknown:
+        raise ValueError(f"unknown sweep axes: {sorted(unknown)}")
+    configs: list[SweepConfig] = []
+    for values in itertools.product(*(axes.get(n, [getattr(base, n)]) for n in names)):
+        config = SweepConfig(**dict(zip(names, values)))
+        if config.reranker_type == "none":
+            # rerank_initial_k means nothing without a reranker.
+            config = SweepConfig(**{**asdict(config), "rerank_initial_k": base.rerank_initial_k})
+        if config.chunk_overlap < config.chunk_size and config not in configs:
+            configs.append(config)
+    return configs
+
+
+def load_cases(path: str | Path) -> list[TestCase]:
+    """One JSON object per line with "query", "expected_source_substr" and optionally "expected_phrase_in_text"."""
+    cases = []
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            row = json.loads(line)
+            cases.append(TestCase(row["query"], row["expected_source_substr"], row.get("expected_phrase_in_text")))
+    return cases
+
+
+async def _load_documents(source: Path) -> list[LoadedDoc]:
+    paths = [source] if source.is_file() else list(iter_files(source))
+    docs = await asyncio.gather(*(asyncio.to_thread(load_file, p) for p in paths))
+    return [d for d in docs if d is not None]
+
+
+def _chunk(config: SweepConfig, docs: list[LoadedDoc]) -> list[dict]:
+    chunker = config.chunker()
+    payloads = []
+    for doc in docs:
+        for chunk in chunker.chunk(doc.content, metadata={"source": doc.path}):
+            payloads.append({"text": chunk["text"], **chunk["metadata"], **token_stats(chunk["text"])})
+    return payloads
+
+
+async def _embed_unique(embedding, texts: list[str]) -> dict[str, list[float]]:
+    unique = list(dict.fromkeys(texts))
+    vectors: dict[str, list[float]] = {}
+    for start in range(0, len(unique), _EMBED_BATCH):
+        batch = unique[start : start + _EMBED_BATCH]
+        vectors.update(zip(batch, await embedding.embed(batch)))
+    return vectors
+
+
+def _retriever(config: SweepConfig, embedding, store, k: int):
+    retriever = VectorRetriever(embedding, store)
+    if config.reranker_type == "none":
+        return retriever
+    reranker = BM25Reranker() if config.reranker_type == "bm25" else KeywordReranker()
+    return RerankingRetriever(retriever, reranker, initial_k=max(k, config.rerank_initial_k), top_k=k)
+
+
+async def _evaluate(retriever, queries: list[str], k: int, concurrency: int) -> list[list]:
+    batch = max(1, -(-len(queries) // max(1, concurrency)))
+    parts = await asyncio.gather(
+        *(retriever.retrieve_batch(queries[i : i + batch], k=k) for i in range(0, len(queries), batch))
+    )
+    return [hits for part in parts for hits in part]
+
+
+async def _latencies(retriever, queries: list[str], k: int) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await retriever.retrieve(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run_sweep(
+    embedding,
+    source: str | Path,
+    configs: list[SweepConfig],
+    cases: list[TestCase],
+    k: int = 5,
+    concurrency: int = 4,
+    latency_queries: int = 50,
+    workdir: str | Path | None = None,
+) -> list[dict]:
+    """One row per config: quality (recall/MRR/NDCG@k), retrieval latency, index size and build cost."""
+    docs = await _load_documents(Path(source))
+    groups: dict[tuple, list[SweepConfig]] = {}
+    for config in configs:
+        groups.setdefault(config.index_key, []).append(config)
+    chunked = await asyncio.gather(*(asyncio.to_thread(_chunk, members[0], docs) for members in groups.values()))
+    all_texts = [p["text"] for payloads in chunked for p in payloads]
+    embed_start = time.perf_counter()
+    vectors = await _embed_unique(embedding, all_texts + [c.query for c in cases])
+    embed_seconds = time.perf_counter() - embed_start
+    queries = [c.query for c in cases]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    rows: list[dict] = []
+    # (row, retriever) of each evaluated variant, timed once all quality passes are done.
+    timed: list[tuple[dict, object]] = []
+    stores: list[LocalVectorStore] = []
+
+    class _Lookup:
+        """Serves the already computed vectors, so retrieval time excludes embedding."""
+
+        async def embed(self, texts):
+            return [vectors[t] for t in texts]
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+
+        async def run_group(i: int, members: list[SweepConfig], payloads: list[dict]) -> None:
+            async with semaphore:
+                store = LocalVectorStore(f"sweep{i}", path=tmp)
+                stores.append(store)
+                if payloads:
+                    store.create_collection(vector_size=len(vectors[payloads[0]["text"]]))
+                    build_start = time.perf_counter()
+                    await store.upsert(
+                        [vectors[p["text"]] for p in payloads], payloads, ids=[str(n) for n in range(len(payloads))]
+                    )
+                    build_seconds = time.perf_counter() - build_start
+                for config in members:
+                    if not payloads:
+                        rows.append({**asdict(config), "label": config.label, "chunks": 0})
+                        continue
+                    retriever = _retriever(config, _Lookup(), store, k)
+                    results = await _evaluate(retriever, queries, k, concurrency)
+                    memory = store.memory_bytes()
+                    row = {
+                        **asdict(config),
+                        "label": config.label,
+                        "chunks": len(payloads),
+                        "unique_chunks": len({p["text"] for p in payloads}),
+                        **ranking_metrics(relevance_matrix(results, cases, k)),
+                        "index_bytes": memory["search_bytes"],
+                        "disk_bytes": memory["disk_bytes"],
+                        "build_seconds": build_seconds,
+                    }
+                    rows.append(row)
+                    timed.append((row, retriever))
+
+        try:
+            await asyncio.gather(*(run_group(i, m, p) for i, (m, p) in enumerate(zip(groups.values(), chunked))))
+            for row, retriever in timed:
+                row.update(latency_percentiles(await _latencies(retriever, queries[:latency_queries], k)))
+        finally:
+            for store in stores:
+                store.close()
+
+    order = {config: i for i, config in enumerate(configs)}
+    rows.sort(key=lambda r: order[SweepConfig(**{f.name: r[f.name] for f in fields(SweepConfig)})])
+    for row in rows:
+        row["embedded_texts"] = len(vectors)
+        row["embed_seconds"] = embed_seconds
+    mark_pareto(rows)
+    return rows
+
+
+def mark_pareto(
+    rows: list[dict], quality: str = "ndcg_at_k", costs: tuple[str, ...] = ("p95_ms", "index_bytes")
+) -> list[dict]:
+    """Set row["pareto"]: no other row is at least as good on quality and every cost, and better on one."""
+    scored = [r for r in rows if quality in r]
+    for row in rows:
+        row["pareto"] = row in scored and not any(
+            other is not row
+            and other[quality] >= row[quality]
+            and all(other[c] <= row[c] for c in costs)
+            and (other[quality] > row[quality] or any(other[c] < row[c] for c in costs))
+            for other in scored
+        )
+    return rows
+
+
+def format_table(rows: list[dict]) -> str:
+    header = (
+        f"{'config':<32} {'chunks':>7} {'recall':>7} {'MRR':>6} {'NDCG':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'index MB':>9}  pareto"
+    )
+    lines = [header]
+    for r in rows:
+        if "recall_at_k" not in r:
+            lines.append(f"{r['label']:<32} {0:>7}  (no chunks)")
+            continue
+        lines.append(
+            f"{r['label']:<32} {r['chunks']:>7} {r['recall_at_k']:>7.3f} {r['mrr_at_k']:>6.3f} {r['ndcg_at_k']:>6.3f} "
+            f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['index_bytes'] / 1e6:>9.2f}  {'*' if r['pareto'] else ''}"
+        )
+    return "\n".join(lines)
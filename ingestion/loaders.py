@@ -1,11 +1,38 @@
+import codecs
+import mmap
+import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Protocol
+from typing import Callable, Iterator, Protocol
+
+# Bytes decoded per block when streaming plain text.
+TEXT_BLOCK_SIZE = 1 << 20
+
+
+@dataclass
+class TextBlock:
+    """A consecutive piece of a document's text; `page` is the 1-based page it belongs to, if paged."""
+
+    text: str
+    page: int | None = None
 
 
 class LoadedDoc:
-    def __init__(self, content: str, path: str):
+    def __init__(self, content: str, path: str, pages: list[tuple[int, int]] | None = None):
         self.content = content
         self.path = path
+        # For paged documents, (offset in content, 1-based page number) where each page with text starts.
+        self.pages = pages
+
+    def blocks(self) -> Iterator[TextBlock]:
+        """The content as `TextBlock`s: one per page, or slices of unpaged text."""
+        if not self.pages:
+            for i in range(0, len(self.content), TEXT_BLOCK_SIZE):
+                yield TextBlock(self.content[i : i + TEXT_BLOCK_SIZE])
+            return
+        ends = [start for start, _ in self.pages[1:]] + [len(self.content)]
+        for (start, number), end in zip(self.pages, ends):
+            yield TextBlock(self.content[start:end], page=number)
 
 
 class BaseLoader(Protocol):
@@ -13,10 +40,90 @@ class BaseLoader(Protocol):
         ...
 
 
+StreamLoader = Callable[[Path], Iterator[TextBlock]]
+
+
+def stream_text(path: Path, block_size: int | None = None) -> Iterator[TextBlock]:
+    """The file decoded as UTF-8 in blocks, through a read-only memory map.
+
+    Gives the same text as `read_text(errors="replace")`, newline translation included,
+    while only one block is decoded at a time; the pages of the map are the OS's to evict.
+    """
+    block_size = block_size or TEXT_BLOCK_SIZE
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            pending_cr = False
+            for start in range(0, size + 1, block_size):
+                final = start + block_size > size
+                text = decoder.decode(mapped[start : start + block_size], final=final)
+                if pending_cr:
+                    text = "\r" + text
+                # A "\r" at the end may be the first half of "\r\n".
+                pending_cr = not final and text.endswith("\r")
+                if pending_cr:
+                    text = text[:-1]
+                if text:
+                    yield TextBlock(text.replace("\r\n", "\n").replace("\r", "\n"))
+                if final:
+                    break
+
+
+def stream_pdf(path: Path) -> Iterator[TextBlock]:
+    """One block per page with text, pages separated by a blank line, extracted as they are read."""
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        # A file object (not a path) so pypdf reads from disk instead of loading the whole file.
+        reader = PdfReader(f)
+        first = True
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text()
+            if text:
+                yield TextBlock(text if first else "\n\n" + text, page=number)
+                first = False
+
+
+def stream_html(path: Path) -> Iterator[TextBlock]:
+    import html2text
+
+    raw = path.read_text(encoding="utf-8", errors="replace")
+    converter = html2text.HTML2Text()
+    converter.ignore_links = False
+    converter.ignore_images = True
+    text = converter.handle(raw)
+    if text:
+        yield TextBlock(text)
+
+
+def _collect(blocks: Iterator[TextBlock], path: Path, strip: bool) -> LoadedDoc | None:
+    parts: list[str] = []
+    pages: list[tuple[int, int]] = []
+    offset = 0
+    for block in blocks:
+        if block.page is not None:
+            pages.append((offset, block.page))
+        parts.append(block.text)
+        offset += len(block.text)
+    content = "".join(parts)
+    if strip:
+        stripped = content.lstrip()
+        lead = len(content) - len(stripped)
+        content = stripped.rstrip()
+        if not content:
+            return None
+        pages = [(max(0, start - lead), number) for start, number in pages]
+    return LoadedDoc(content, str(path), pages or None)
+
+
 def load_text(path: Path) -> LoadedDoc | None:
     try:
-        text = path.read_text(encoding="utf-8", errors="replace")
-        return LoadedDoc(text, str(path))
+        return _collect(stream_text(path), path, strip=False)
     except Exception:
         return None
 
@@ -27,30 +134,14 @@ def load_markdown(path: Path) -> LoadedDoc | None:
 
 def load_pdf(path: Path) -> LoadedDoc | None:
     try:
-        from pypdf import PdfReader
-
-        reader = PdfReader(str(path))
-        parts = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                parts.append(text)
-        content = "\n\n".join(parts).strip()
-        return LoadedDoc(content, str(path)) if content else None
+        return _collect(stream_pdf(path), path, strip=True)
     except Exception:
         return None
 
 
 def load_html(path: Path) -> LoadedDoc | None:
     try:
-        import html2text
-
-        raw = path.read_text(encoding="utf-8", errors="replace")
-        converter = html2text.HTML2Text()
-        converter.ignore_links = False
-        converter.ignore_images = True
-        text = converter.handle(raw).strip()
-        return LoadedDoc(text, str(path)) if text else None
+        return _collect(stream_html(path), path, strip=True)
     except Exception:
         return None
 
@@ -64,8 +155,18 @@ EXTENSION_LOADERS: dict[str, BaseLoader] = {
     ".htm": load_html,
 }
 
+STREAM_LOADERS: dict[str, StreamLoader] = {
+    ".txt": stream_text,
+    ".md": stream_text,
+    ".markdown": stream_text,
+    ".pdf": stream_pdf,
+    ".html": stream_html,
+    ".htm": stream_html,
+}
+
 
 def load_file(path: Path) -> LoadedDoc | None:
+    """The whole document at once; `stream_file` yields it block by block instead."""
     suffix = path.suffix.lower()
     loader = EXTENSION_LOADERS.get(suffix)
     if loader is None:
@@ -73,6 +174,16 @@ def load_file(path: Path) -> LoadedDoc | None:
     return loader(path)
 
 
-def discover_files(root: Path, extensions: set[str] | None = None) -> list[Path]:
+def stream_file(path: Path) -> Iterator[TextBlock] | None:
+    """Text blocks of `path` as they are read, or None for an unsupported type. Read errors raise while iterating."""
+    loader = STREAM_LOADERS.get(path.suffix.lower())
+    return None if loader is None else loader(path)
+
+
+def iter_files(root: Path, extensions: set[str] | None = None) -> Iterator[Path]:
     exts = extensions or set(EXTENSION_LOADERS.keys())
-    return [p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in exts]
\ No newline at end of file
+    return (p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in exts)
+
+
+def discover_files(root: Path, extensions: set[str] | None = None) -> list[Path]:
+    return list(iter_files(root, extensions))
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class ManifestEntry:
+    source: str
+    mtime_ns: int
+    size: int
+    content_hash: str
+    chunk_count: int = 0
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FileManifest:
+    """Persisted source path -> (mtime, size, content hash) for incremental ingestion.
+
+    `namespace` keeps entries for different collections apart in one database file.
+    """
+
+    def __init__(self, path: str | Path, namespace: str = "default"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "namespace TEXT NOT NULL, source TEXT NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, content_hash TEXT NOT NULL, chunk_count INTEGER NOT NULL, "
+            "PRIMARY KEY (namespace, source)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get(self, source: str) -> ManifestEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, mtime_ns, size, content_hash, chunk_count FROM files "
+                "WHERE namespace = ? AND source = ?",
+                (self.namespace, source),
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def put(self, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, entry.source, entry.mtime_ns, entry.size, entry.content_hash, entry.chunk_count),
+            )
+            self._conn.commit()
+
+    def remove(self, source: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE namespace = ? AND source = ?", (self.namespace, source))
+            self._conn.commit()
+
+    def sources_under(self, root: str) -> list[str]:
+        prefix = root.rstrip("/\\")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source FROM files WHERE namespace = ? AND (source = ? OR source LIKE ? ESCAPE '!')",
+                (self.namespace, prefix, _like_prefix(prefix) + "%"),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _like_prefix(root: str) -> str:
+    escaped = root.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return escaped + os.sep
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable
+
+from ingestion.loaders import LoadedDoc, load_file
+
+logger = logging.getLogger(__name__)
+
+# Parsers that are pure-Python and GIL-bound; everything else is cheap enough for a thread.
+CPU_BOUND_SUFFIXES = {".pdf", ".html", ".htm"}
+
+# spawn: the parent may already run threads (embedding batcher, asyncio executors)
+# and forking a threaded process is unsafe.
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _serve(conn: Connection) -> None:
+    """Worker process: load one file per message, announcing when it starts on it."""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        load_fn, path = job
+        conn.send(("started", None))
+        try:
+            result = ("ok", load_fn(path))
+        except Exception as exc:
+            result = ("error", exc)
+        try:
+            conn.send(result)
+        except Exception as exc:  # unpicklable result or exception
+            conn.send(("error", RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+
+class _Worker:
+    def __init__(self):
+        self.conn, child = _CONTEXT.Pipe()
+        self.process = _CONTEXT.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class _WorkerDied(Exception):
+    pass
+
+
+class ParallelLoader:
+    """Runs `load_file` for PDF/HTML in up to `workers` worker processes.
+
+    Each worker parses one file at a time and at most `workers` files are in flight, so
+    `timeout` only counts time spent parsing, from the moment a worker picks the file up.
+    A file that exceeds it is abandoned (returns None) and only its worker is killed and
+    replaced; other files keep parsing. A file whose worker crashes is retried once.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        timeout: float | None = 60.0,
+        load_fn: Callable[[Path], LoadedDoc | None] = load_file,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.load_fn = load_fn
+        self._idle: list[_Worker] = []
+        self._busy: set[_Worker] = set()
+        self._slots: asyncio.Semaphore | None = None
+
+    def start(self) -> None:
+        """Spawn all workers now instead of on first use."""
+        while len(self._idle) + len(self._busy) < self.workers:
+            self._idle.append(_Worker())
+
+    async def load(self, path: Path) -> LoadedDoc | None:
+        if path.suffix.lower() not in CPU_BOUND_SUFFIXES:
+            return await asyncio.to_thread(self.load_fn, path)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            for _ in range(2):
+                try:
+                    return await self._run(path)
+                except _WorkerDied:
+                    logger.warning("loader worker died path=%s; retrying", path)
+        logger.warning("load failed after worker restart path=%s", path)
+        return None
+
+    async def _run(self, path: Path) -> LoadedDoc | None:
+        worker = self._idle.pop() if self._idle else await asyncio.to_thread(_Worker)
+        self._busy.add(worker)
+        healthy = False
+        try:
+            try:
+                worker.conn.send((self.load_fn, path))
+            except OSError as exc:
+                raise _WorkerDied from exc
+            # Waits out the worker's startup (spawn, imports) before the clock starts.
+            await self._receive(worker, None)
+            status, value = await self._receive(worker, self.timeout)
+            healthy = True
+        except asyncio.TimeoutError:
+            logger.warning("load timed out path=%s timeout_s=%s", path, self.timeout)
+            return None
+        finally:
+            self._busy.discard(worker)
+            if healthy:
+                self._idle.append(worker)
+            else:
+                # Hung, crashed or cancelled mid-parse: this worker alone is replaced.
+                await asyncio.to_thread(worker.kill)
+        if status == "error":
+            raise value
+        return value
+
+    @staticmethod
+    async def _receive(worker: _Worker, timeout: float | None):
+        if not await asyncio.to_thread(worker.conn.poll, timeout):
+            raise asyncio.TimeoutError
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError) as exc:
+            raise _WorkerDied from exc
+
+    async def iter_load(self, paths: Iterable[Path]) -> AsyncIterator[tuple[Path, LoadedDoc | None]]:
+        """Yield (path, doc) as each load completes, keeping at most `workers` in flight."""
+        pending: dict[asyncio.Task, Path] = {}
+        it = iter(paths)
+        try:
+            while True:
+                while len(pending) < self.workers:
+                    path = next(it, None)
+                    if path is None:
+                        break
+                    pending[asyncio.ensure_future(self.load(path))] = path
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield pending.pop(task), task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self) -> None:
+        for worker in self._idle:
+            worker.stop()
+        for worker in list(self._busy):
+            worker.kill()
+        self._idle.clear()
+        self._busy.clear()
@@ -1,59 +1,428 @@
+import asyncio
 import logging
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from app.config import settings
+from core.chunking.base import chunk_id
 from core.chunking.paragraph_chunker import ParagraphChunker
 from core.chunking.smart_chunker import SmartChunker
-from ingestion.loaders import discover_files, load_file
+from core.metrics import INGEST_CHUNKS, INGEST_CHUNKS_PER_SECOND, INGEST_FILES, STAGE_SECONDS
+from core.prompt.context import TokenCounter
+from core.retriever.tokens import token_stats
+from ingestion.loaders import TextBlock, iter_files, stream_file
+from ingestion.manifest import FileManifest, ManifestEntry, file_hash
+from ingestion.parallel import CPU_BOUND_SUFFIXES, ParallelLoader
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a stage's input; each consumer of a queue receives one.
+_DONE = object()
+
+_LOAD = STAGE_SECONDS.labels("ingest_load")
+_EMBED = STAGE_SECONDS.labels("ingest_embed")
+_UPSERT = STAGE_SECONDS.labels("ingest_upsert")
+_CHUNKS = INGEST_CHUNKS.labels()
+_FILES_DONE = INGEST_FILES.labels("done")
+_FILES_SKIPPED = INGEST_FILES.labels("skipped")
+
+
+@dataclass
+class IngestProgress:
+    files_discovered: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    chunks: int = 0
+    batches: int = 0
+
+
+@dataclass
+class _FileChunks:
+    """Chunks of one file on their way to the index."""
+
+    entry: ManifestEntry | None
+    queued: int = 0  # queued and not yet upserted or dropped
+    upserted: int = 0
+    read: bool = False  # the whole file has been chunked
+    failed: bool = False
+
+
+class _GroupReader:
+    """Steps a chunk generator in worker threads and closes it (and the file under it) even
+    when the reading task is cancelled while a step is still running in its thread."""
+
+    def __init__(self, groups: Iterator[list[tuple[str, dict]]]):
+        self._groups = groups
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def _step(self):
+        with self._lock:
+            group = next(self._groups, None)
+        if self._closed.is_set():
+            self._close_now()
+        return group
+
+    async def next(self) -> list[tuple[str, dict]] | None:
+        return await asyncio.to_thread(self._step)
+
+    def close(self) -> None:
+        # A step still running in its thread closes the generator when it finishes.
+        self._closed.set()
+        self._close_now()
+
+    def _close_now(self) -> None:
+        if self._lock.acquire(blocking=False):
+            try:
+                self._groups.close()
+            finally:
+                self._lock.release()
+
 
 def _get_chunker():
+    length = TokenCounter(settings.chunk_tokenizer).count if settings.chunk_size_unit == "tokens" else None
     if settings.chunker_type == "paragraph":
         return ParagraphChunker(
             chunk_size=settings.chunk_size,
             overlap=settings.chunk_overlap,
+            length=length,
         )
     return SmartChunker(
         chunk_size=settings.chunk_size,
         overlap=settings.chunk_overlap,
+        length=length,
     )
 
 
 class IngestionPipeline:
-    def __init__(self, embedding, vector_store):
+    """discover -> load+chunk -> batch -> embed -> upsert, connected by bounded queues.
+
+    Each stage runs as its own task(s), so embedding batch N+1 overlaps the upsert of
+    batch N, and the bounded queues keep memory flat regardless of corpus size.
+
+    With a `manifest`, ingestion is incremental: unchanged files are skipped, stale
+    chunks of modified files are deleted, and files that disappeared from a re-ingested
+    folder are removed from the index.
+    """
+
+    def __init__(
+        self,
+        embedding,
+        vector_store,
+        batch_size: int | None = None,
+        queue_size: int | None = None,
+        load_concurrency: int | None = None,
+        embed_concurrency: int | None = None,
+        upsert_concurrency: int | None = None,
+        loader: ParallelLoader | None = None,
+        manifest: FileManifest | None = None,
+        sparse_index=None,
+        collection_version=None,
+    ):
         self.embedding = embedding
         self.vector_store = vector_store
         self.chunker = _get_chunker()
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.queue_size = queue_size or settings.ingest_queue_size
+        self.load_concurrency = load_concurrency or settings.ingest_load_concurrency
+        self.embed_concurrency = embed_concurrency or settings.ingest_embed_concurrency
+        self.upsert_concurrency = upsert_concurrency or settings.ingest_upsert_concurrency
+        self.loader = loader
+        self.manifest = manifest
+        # Optional BM25Index kept in sync with the vector store for hybrid retrieval.
+        self.sparse_index = sparse_index
+        # Optional CollectionVersion, bumped after every write so answer caches in other processes are dropped.
+        self.collection_version = collection_version
+        self.progress = IngestProgress()
 
     async def run(self, source: Path) -> int:
         if not source.exists():
             raise FileNotFoundError(f"Source does not exist: {source}")
-        paths = [source] if source.is_file() else discover_files(source)
-        logger.info("source=%s paths_count=%d", source, len(paths))
-        all_chunks: list[tuple[str, dict]] = []
+        paths = [source] if source.is_file() else iter_files(source)
+        logger.info("source=%s", source)
+        path_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        chunk_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        batch_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        vector_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.progress = progress = IngestProgress()
+        started = time.perf_counter()
+        self._seen: set[str] = set()
+        # Files with chunks still in the queues; their chunks are dropped once they fail.
+        self._pending: dict[str, _FileChunks] = {}
+        self._failed: set[str] = set()
+        owns_loader = self.loader is None and settings.ingest_parallel_loading
+        if owns_loader:
+            self.loader = ParallelLoader(
+                workers=settings.ingest_loader_workers or None,
+                timeout=settings.ingest_loader_timeout or None,
+            )
+        load_concurrency = max(self.load_concurrency, self.loader.workers if self.loader else 0)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._discover(paths, path_q, load_concurrency))
+                loaders = [tg.create_task(self._load(path_q, chunk_q)) for _ in range(load_concurrency)]
+                tg.create_task(self._finish(loaders, chunk_q, 1))
+                tg.create_task(self._batch(chunk_q, batch_q))
+                embedders = [tg.create_task(self._embed(batch_q, vector_q)) for _ in range(self.embed_concurrency)]
+                tg.create_task(self._finish(embedders, vector_q, self.upsert_concurrency))
+                for _ in range(self.upsert_concurrency):
+                    tg.create_task(self._upsert(vector_q))
+        except ExceptionGroup as eg:
+            # A failing stage cancels the others; surface the first real error to callers.
+            raise eg.exceptions[0]
+        finally:
+            if owns_loader:
+                await asyncio.to_thread(self.loader.close)
+                self.loader = None
+        if self.manifest is not None and source.is_dir():
+            await self._remove_missing(source)
+        _FILES_DONE.inc(progress.files_done)
+        _FILES_SKIPPED.inc(progress.files_skipped)
+        if progress.chunks:
+            INGEST_CHUNKS_PER_SECOND.set(progress.chunks / max(time.perf_counter() - started, 1e-9))
+        if progress.files_skipped:
+            logger.info("skipped unchanged files=%d", progress.files_skipped)
+        if not progress.chunks:
+            logger.warning("no chunks produced")
+            return 0
+        logger.info("finished total_chunks=%d", progress.chunks)
+        return progress.chunks
+
+    async def _discover(self, paths, out: asyncio.Queue, consumers: int) -> None:
         for path in paths:
-            doc = load_file(path)
-            if doc is None:
+            self.progress.files_discovered += 1
+            if self.manifest is not None:
+                self._seen.add(str(path))
+                entry = self.manifest.get(str(path))
+                stat = path.stat()
+                if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                    self.progress.files_skipped += 1
+                    continue
+            await out.put(path)
+        logger.info("discovered paths_count=%d", self.progress.files_discovered)
+        for _ in range(consumers):
+            await out.put(_DONE)
+
+    @staticmethod
+    async def _finish(tasks: list[asyncio.Task], out: asyncio.Queue, consumers: int) -> None:
+        await asyncio.wait(tasks)
+        for _ in range(consumers):
+            await out.put(_DONE)
+
+    def _chunk_blocks(self, source: str, blocks: Iterable[TextBlock]) -> Iterator[list[tuple[str, dict]]]:
+        """Chunks of one document in groups of up to `batch_size`, produced as its blocks are read."""
+        page_starts: list[int] = []
+        page_numbers: list[int] = []
+
+        def texts():
+            offset = 0
+            for block in blocks:
+                if block.page is not None:
+                    page_starts.append(offset)
+                    page_numbers.append(block.page)
+                offset += len(block.text)
+                yield block.text
+
+        group: list[tuple[str, dict]] = []
+        try:
+            for chunk in self.chunker.iter_chunks(texts(), metadata={"source": source}):
+                meta = chunk["metadata"]
+                if page_numbers:
+                    # The page the chunk starts on; its blocks have been read by now.
+                    meta["page"] = page_numbers[bisect_right(page_starts, meta["char_offset"]) - 1]
+                # Token stats are stored with each chunk so query-time reranking never re-tokenizes it.
+                group.append((chunk["text"], {**meta, **token_stats(chunk["text"])}))
+                if len(group) >= self.batch_size:
+                    yield group
+                    group = []
+            if group:
+                yield group
+        finally:
+            # Releases the file (and its memory map) when abandoned mid-read.
+            if hasattr(blocks, "close"):
+                blocks.close()
+
+    async def _load(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        while (path := await inp.get()) is not _DONE:
+            entry = previous = None
+            if self.manifest is not None:
+                entry = await asyncio.to_thread(self._fingerprint, path)
+                previous = self.manifest.get(entry.source)
+                if previous and previous.content_hash == entry.content_hash:
+                    # Touched but not changed: remember the new mtime and move on.
+                    entry.chunk_count = previous.chunk_count
+                    self.manifest.put(entry)
+                    self.progress.files_skipped += 1
+                    continue
+            load_seconds = 0.0
+            if self.loader is not None and path.suffix.lower() in CPU_BOUND_SUFFIXES:
+                # Parsed whole in a worker process, then chunked page by page like a stream.
+                start = time.perf_counter()
+                doc = await self.loader.load(path)
+                load_seconds = time.perf_counter() - start
+                blocks = None if doc is None else doc.blocks()
+            else:
+                blocks = stream_file(path)
+            if blocks is None:
                 logger.debug("skip unsupported or unreadable path=%s", path)
                 continue
-            chunks = self.chunker.chunk(doc.content, metadata={"source": doc.path})
-            for c in chunks:
-                all_chunks.append((c["text"], {**c["metadata"]}))
-            logger.info("loaded path=%s chunks=%d", path, len(chunks))
-        if not all_chunks:
-            logger.warning("no chunks produced")
-            return 0
-        batch_size = settings.ingest_batch_size
-        total = 0
-        for i in range(0, len(all_chunks), batch_size):
-            batch = all_chunks[i : i + batch_size]
+            await self._stream(path, blocks, out, entry, previous is not None, load_seconds)
+
+    async def _stream(
+        self,
+        path: Path,
+        blocks: Iterable[TextBlock],
+        out: asyncio.Queue,
+        entry: ManifestEntry | None,
+        track_ids: bool,
+        seconds: float = 0.0,
+    ) -> None:
+        """Read, chunk and queue one file a group of chunks at a time, so memory stays bounded by the queues.
+
+        If reading fails part way, the file's chunks still in the queues are dropped and the
+        ones already upserted are deleted, so the index never holds part of a file.
+        """
+        source = str(path)
+        reader = _GroupReader(self._chunk_blocks(source, blocks))
+        # IDs of the new chunks, to delete the ones a previous version of the file left behind.
+        keep_ids: set[str] | None = set() if track_ids else None
+        state = self._pending[source] = _FileChunks(entry)
+        count = 0
+        try:
+            while True:
+                # Parsing and chunking are CPU-bound; keep them off the event loop.
+                start = time.perf_counter()
+                group = await reader.next()
+                seconds += time.perf_counter() - start
+                if group is None:
+                    break
+                count += len(group)
+                if keep_ids is not None:
+                    keep_ids.update(chunk_id(source, text) for text, _ in group)
+                state.queued += len(group)
+                await out.put(group)
+        except Exception:
+            logger.warning("skip unreadable path=%s", path, exc_info=True)
+            state.failed = True
+            self._failed.add(source)
+            if state.queued == 0:
+                await self._discard(source, state)
+            return
+        finally:
+            reader.close()
+            _LOAD.observe(seconds)
+        logger.info("loaded path=%s chunks=%d", path, count)
+        self.progress.files_done += 1
+        if keep_ids is not None:
+            # IDs are deterministic, so unchanged chunks were overwritten in place and only
+            # chunks that no longer exist in the file need deleting.
+            await self._delete_source(source, keep_ids)
+        if entry is not None:
+            entry.chunk_count = count
+        state.read = True
+        if state.queued == 0:
+            self._complete(source, state)
+
+    async def _batch(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        batch: list[tuple[str, dict]] = []
+        while (chunks := await inp.get()) is not _DONE:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    await out.put(batch)
+                    batch = []
+        if batch:
+            await out.put(batch)
+        for _ in range(self.embed_concurrency):
+            await out.put(_DONE)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        while (batch := await inp.get()) is not _DONE:
             texts = [t for t, _ in batch]
             payloads = [{"text": t, **m} for t, m in batch]
-            vectors = await self.embedding.embed(texts)
-            await self.vector_store.upsert(vectors, payloads)
-            total += len(batch)
-            logger.info("upserted batch batch_index=%d batch_size=%d total_so_far=%d", i // batch_size, len(batch), total)
-        logger.info("finished total_chunks=%d", total)
-        return total
\ No newline at end of file
+            with _EMBED.time():
+                vectors = await self.embedding.embed(texts)
+            await out.put((vectors, payloads))
+
+    async def _upsert(self, inp: asyncio.Queue) -> None:
+        while (item := await inp.get()) is not _DONE:
+            vectors, payloads = batch = item
+            if self._failed:
+                kept = [i for i, p in enumerate(payloads) if p.get("source") not in self._failed]
+                vectors, payloads = [vectors[i] for i in kept], [payloads[i] for i in kept]
+            if payloads:
+                with _UPSERT.time():
+                    await self.vector_store.upsert(vectors, payloads)
+                    if self.sparse_index is not None:
+                        ids = [chunk_id(p["source"], p["text"]) for p in payloads]
+                        await asyncio.to_thread(self.sparse_index.add, ids, payloads)
+                self._bump_version()
+                progress = self.progress
+                progress.chunks += len(payloads)
+                progress.batches += 1
+                _CHUNKS.inc(len(payloads))
+                logger.info("upserted batch batch_index=%d batch_size=%d total_so_far=%d", progress.batches - 1, len(payloads), progress.chunks)
+            await self._settle(batch[1], payloads)
+
+
+    @staticmethod
+    def _fingerprint(path: Path) -> ManifestEntry:
+        stat = path.stat()
+        return ManifestEntry(str(path), stat.st_mtime_ns, stat.st_size, file_hash(path))
+
+    async def _settle(self, queued: list[dict], upserted: list[dict]) -> None:
+        """Account for a batch that left the queues, `upserted` being the part that was written."""
+        for payload in upserted:
+            if (state := self._pending.get(payload.get("source"))) is not None:
+                state.upserted += 1
+        for payload in queued:
+            if (state := self._pending.get(payload.get("source"))) is not None:
+                state.queued -= 1
+        for source in {p.get("source") for p in queued}:
+            state = self._pending.get(source)
+            if state is None or state.queued:
+                continue
+            if state.failed:
+                await self._discard(source, state)
+            elif state.read:
+                self._complete(source, state)
+
+    def _complete(self, source: str, state: _FileChunks) -> None:
+        # Record the file only once all of its chunks are in the index.
+        del self._pending[source]
+        if state.entry is not None:
+            self.manifest.put(state.entry)
+
+    async def _discard(self, source: str, state: _FileChunks) -> None:
+        """Remove what a file that failed part way left in the index; the next run reads it again."""
+        del self._pending[source]
+        self._failed.discard(source)
+        if not state.upserted:
+            return
+        await self._delete_source(source)
+        if self.manifest is not None:
+            self.manifest.remove(source)
+        self.progress.chunks -= state.upserted
+        logger.warning("removed partially ingested path=%s chunks=%d", source, state.upserted)
+
+    async def _remove_missing(self, root: Path) -> None:
+        for source in self.manifest.sources_under(str(root)):
+            if source in self._seen:
+                continue
+            await self._delete_source(source)
+            self.manifest.remove(source)
+            logger.info("removed deleted path=%s", source)
+
+    async def _delete_source(self, source: str, keep_ids: set[str] | None = None) -> None:
+        await self.vector_store.delete_by_source(source, keep_ids=keep_ids)
+        if self.sparse_index is not None:
+            await asyncio.to_thread(self.sparse_index.delete_by_source, source, keep_ids)
+        self._bump_version()
+
+    def _bump_version(self) -> None:
+        if self.collection_version is not None:
+            self.collection_version.bump()
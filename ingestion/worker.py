@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+
+@dataclass
+class IngestJob:
+    id: str
+    path: str
+    status: str = QUEUED
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    files_discovered: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    chunks: int = 0
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        data["elapsed_s"] = round(elapsed, 3)
+        data["chunks_per_sec"] = round(self.chunks / elapsed, 2) if elapsed > 0 else 0.0
+        return data
+
+
+_COLUMNS = [f for f in IngestJob.__dataclass_fields__]
+
+
+class JobStore:
+    """SQLite-backed job table so queued/running jobs survive an API restart."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, path TEXT NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, files_discovered INTEGER NOT NULL DEFAULT 0, "
+            "files_done INTEGER NOT NULL DEFAULT 0, files_skipped INTEGER NOT NULL DEFAULT 0, "
+            "chunks INTEGER NOT NULL DEFAULT 0, error TEXT)"
+        )
+        self._conn.commit()
+
+    def create(self, path: str) -> IngestJob:
+        job = IngestJob(id=uuid.uuid4().hex, path=path, created_at=time.time())
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [getattr(job, c) for c in _COLUMNS],
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return IngestJob(*row) if row else None
+
+    def recent(self, limit: int = 50) -> list[IngestJob]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [IngestJob(*r) for r in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+            self._conn.commit()
+
+    def pending_ids(self) -> list[str]:
+        """Requeue jobs interrupted by a shutdown and return every queued job, oldest first."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class IngestionJobManager:
+    """Runs ingestion jobs on worker threads, each with its own event loop.
+
+    The API loop only enqueues jobs and reads their state, so a large ingest never
+    competes with query handling on the request event loop. `pipeline_factory` builds
+    a fresh `IngestionPipeline` per job.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline_factory: Callable[[], object],
+        workers: int = 1,
+        progress_interval: float = 1.0,
+        loop_closers: list[Callable[[], Awaitable[None]]] | None = None,
+    ):
+        self.store = store
+        self.pipeline_factory = pipeline_factory
+        # Called on each worker loop before it closes, e.g. to close loop-bound clients.
+        self.loop_closers = loop_closers or []
+        self.workers = max(1, workers)
+        self.progress_interval = progress_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._running: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+        self._cancel_requested: set[str] = set()
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping = False
+        for job_id in self.store.pending_ids():
+            self._queue.put(job_id)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop workers; jobs interrupted here stay queued and resume on next start."""
+        self._stopping = True
+        with self._lock:
+            for loop, task in self._running.values():
+                loop.call_soon_threadsafe(task.cancel)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, path: str) -> IngestJob:
+        job = self.store.create(path)
+        self._queue.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self.store.get(job_id)
+
+    def recent(self, limit: int = 50) -> list[IngestJob]:
+        return self.store.recent(limit)
+
+    def cancel(self, job_id: str) -> IngestJob | None:
+        job = self.store.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        with self._lock:
+            self._cancel_requested.add(job_id)
+            running = self._running.get(job_id)
+            if running is None:
+                # Not picked up yet; the worker will skip it.
+                self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            else:
+                loop, task = running
+                loop.call_soon_threadsafe(task.cancel)
+        return self.store.get(job_id)
+
+    def _worker(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while (job_id := self._queue.get()) is not None:
+                job = self.store.get(job_id)
+                if job is None or job.status != QUEUED:
+                    # Cancelled before it was picked up; nothing will run it now.
+                    with self._lock:
+                        self._cancel_requested.discard(job_id)
+                    continue
+                loop.run_until_complete(self._run_job(job))
+        finally:
+            for close in self.loop_closers:
+                try:
+                    loop.run_until_complete(close())
+                except Exception:
+                    logger.exception("worker loop cleanup failed")
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def _run_job(self, job: IngestJob) -> None:
+        pipeline = self.pipeline_factory()
+        started = time.time()
+        self.store.update(job.id, status=RUNNING, started_at=started, error=None)
+        task = asyncio.current_task()
+        with self._lock:
+            if job.id in self._cancel_requested:
+                task.cancel()
+            self._running[job.id] = (asyncio.get_running_loop(), task)
+        reporter = asyncio.create_task(self._report(job.id, pipeline))
+        logger.info("job started job_id=%s path=%s", job.id, job.path)
+        status, error = COMPLETED, None
+        try:
+            await pipeline.run(Path(job.path))
+        except asyncio.CancelledError:
+            status = QUEUED if self._stopping and job.id not in self._cancel_requested else CANCELLED
+        except Exception as e:
+            logger.exception("job failed job_id=%s", job.id)
+            status, error = FAILED, str(e)
+        finally:
+            reporter.cancel()
+            with self._lock:
+                self._running.pop(job.id, None)
+                self._cancel_requested.discard(job.id)
+        fields = self._progress_fields(pipeline)
+        if status != QUEUED:
+            fields["finished_at"] = time.time()
+        self.store.update(job.id, status=status, error=error, **fields)
+        logger.info("job finished job_id=%s status=%s chunks=%d", job.id, status, fields.get("chunks", 0))
+
+    async def _report(self, job_id: str, pipeline) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self.store.update(job_id, **self._progress_fields(pipeline))
+
+    @staticmethod
+    def _progress_fields(pipeline) -> dict:
+        progress = getattr(pipeline, "progress", None)
+        if progress is None:
+            return {}
+        return {
+            "files_discovered": progress.files_discovered,
+            "files_done": progress.files_done,
+            "files_skipped": progress.files_skipped,
+            "chunks": progress.chunks,
+        }
@@ -0,0 +1,164 @@
+"""Benchmark the streaming chunkers against the previous whole-string implementations.
+
+    python scripts/bench_chunking.py --mb 50
+    python scripts/bench_chunking.py --mb 5 --chunk-size 2000 --overlap 1500 --tokens
+
+Chunks a synthetic document of --mb megabytes three ways: the previous implementations
+(kept below for comparison), `chunk()` on the whole string and `iter_chunks()` over
+64 KB blocks, and reports time and peak traced memory for each. Outputs are checked to
+be identical, except in --tokens mode, where the old code does not apply.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.chunking.paragraph_chunker import ParagraphChunker
+from core.chunking.smart_chunker import SmartChunker
+from core.prompt.context import TokenCounter
+
+_WORDS = "vector database chunk embedding query answer context retrieval generation index search rerank".split()
+
+
+class _PreviousSmartChunker:
+    def __init__(self, chunk_size: int, overlap: int):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk(self, text: str, metadata: dict | None = None) -> list[dict]:
+        meta = metadata or {}
+        if not text or not text.strip():
+            return []
+        text = text.replace("\n", " ").strip()
+        segments = []
+        for p in re.split(r"(?<=[.!?])\s+", text):
+            if len(p) <= self.chunk_size:
+                segments.append(p)
+            else:
+                segments.extend(p[i : i + self.chunk_size] for i in range(0, len(p), self.chunk_size - self.overlap))
+        chunks, buffer, current_len = [], [], 0
+        for seg in segments:
+            seg_len = len(seg) + 1
+            if current_len + seg_len > self.chunk_size and buffer:
+                chunks.append({"text": " ".join(buffer).strip(), "metadata": {**meta}})
+                count, total = 0, 0
+                for s in reversed(buffer):
+                    total += len(s) + 1
+                    if total > self.overlap:
+                        break
+                    count += 1
+                buffer = buffer[len(buffer) - count :] if self.overlap > 0 else []
+                current_len = sum(len(s) + 1 for s in buffer)
+            buffer.append(seg)
+            current_len += seg_len
+        if buffer:
+            chunks.append({"text": " ".join(buffer).strip(), "metadata": {**meta}})
+        for i, c in enumerate(chunks):
+            c["metadata"]["chunk_index"] = i
+        return chunks
+
+
+class _PreviousParagraphChunker:
+    def __init__(self, chunk_size: int, overlap: int):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk(self, text: str, metadata: dict | None = None) -> list[dict]:
+        meta = metadata or {}
+        if not text or not text.strip():
+            return []
+        raw_paras = [p.strip() for p in text.split("\n\n") if p.strip()]
+        merged, buf, buf_len = [], [], 0
+        for p in raw_paras:
+            need = len(p) + (2 if buf else 0)
+            if buf_len + need > self.chunk_size and buf:
+                merged.append("\n\n".join(buf))
+                if self.overlap > 0:
+                    kept, o_len = [], 0
+                    for x in reversed(buf):
+                        o_len += len(x) + 2
+                        if o_len > self.overlap:
+                            break
+                        kept.append(x)
+                    buf = list(reversed(kept))
+                    buf_len = sum(len(x) + 2 for x in buf)
+                else:
+                    buf, buf_len = [], 0
+            buf.append(p)
+            buf_len += need
+        if buf:
+            merged.append("\n\n".join(buf))
+        return [{"text": t, "metadata": {**meta, "chunk_index": i}} for i, t in enumerate(merged)]
+
+
+def synthetic_text(megabytes: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < megabytes * 1_000_000:
+        sentence = " ".join(rng.choices(_WORDS, k=rng.randint(4, 30))).capitalize() + rng.choice(".!?")
+        parts.append(sentence + ("\n\n" if rng.random() < 0.2 else " "))
+        size += len(parts[-1])
+    return "".join(parts)
+
+
+def _blocks(text: str, size: int = 65536):
+    for i in range(0, len(text), size):
+        yield text[i : i + size]
+
+
+def _measure(fn) -> tuple[float, float, list]:
+    """Seconds for an untraced run (tracing slows allocation-heavy code), then the peak memory of a traced one."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=20.0)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--tokens", action="store_true", help="measure sizes in (approximate) tokens")
+    args = parser.parse_args()
+    text = synthetic_text(args.mb)
+    length = TokenCounter().count if args.tokens else None
+    print(f"{len(text) / 1e6:.1f} MB, chunk_size={args.chunk_size} overlap={args.overlap} "
+          f"unit={'tokens' if args.tokens else 'chars'}")
+
+    for name, previous, current in (
+        ("smart", _PreviousSmartChunker, SmartChunker),
+        ("paragraph", _PreviousParagraphChunker, ParagraphChunker),
+    ):
+        chunker = current(args.chunk_size, args.overlap, length=length)
+        runs = [
+            ("chunk()", lambda: chunker.chunk(text)),
+            # Only count chunks, as a consumer writing them out would not keep them.
+            ("iter_chunks()", lambda: sum(1 for _ in chunker.iter_chunks(_blocks(text)))),
+        ]
+        if not args.tokens:
+            runs.insert(0, ("previous", lambda: previous(args.chunk_size, args.overlap).chunk(text)))
+        results = {}
+        for label, fn in runs:
+            seconds, peak, result = _measure(fn)
+            results[label] = result
+            chunks = result if isinstance(result, int) else len(result)
+            print(f"{name:<10} {label:<14} {seconds:8.2f} s {len(text) / 1e6 / seconds:8.1f} MB/s "
+                  f"peak {peak / 1e6:8.1f} MB  {chunks} chunks")
+        if "previous" in results and [(c["text"], c["metadata"]["chunk_index"]) for c in results["previous"]] != [
+            (c["text"], c["metadata"]["chunk_index"]) for c in results["chunk()"]
+        ]:
+            sys.exit(f"{name}: output differs from the previous implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare the ONNX Runtime embedding backend with sentence-transformers: accuracy and throughput.
+
+    python scripts/export_onnx.py
+    python scripts/bench_embeddings.py --model-path .rag_data/onnx/bge-small-en --texts 2000
+
+Embeds the same texts (short queries and chunk-sized passages) with the PyTorch model
+and with the exported ONNX models (fp32 and int8, whichever exist), and reports texts
+per second for query-sized batches (1 text) and ingestion batches, plus the cosine
+similarity of each ONNX embedding to the PyTorch one. Exits non-zero when the lowest
+similarity is below --min-cosine.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.embeddings.local import LocalEmbedding
+from core.embeddings.onnx import MODEL_FILE, POOLING_FILE, QUANTIZED_MODEL_FILE, OnnxEmbedding
+
+_WORDS = (
+    "vector database chunk embedding query answer context retrieval generation index search rerank "
+    "latency throughput error timeout cache memory disk upload release deploy config token model"
+).split()
+
+
+def synthetic_texts(n: int, seed: int = 0) -> list[str]:
+    """Half query-length (4-12 words), half chunk-length (60-120 words) texts."""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        k = rng.randint(4, 12) if i % 2 else rng.randint(60, 120)
+        texts.append(" ".join(rng.choices(_WORDS, k=k)).capitalize() + ("?" if i % 2 else "."))
+    return texts
+
+
+def throughput(encode, texts: list[str], batch_size: int) -> float:
+    encode(texts[:batch_size])  # warm up
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        encode(texts[i : i + batch_size])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-path", type=Path, default=Path(".rag_data/onnx/bge-small-en"))
+    parser.add_argument("--model-name", default="", help="PyTorch model (default: the one the export came from)")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32, help="ingestion batch size")
+    parser.add_argument("--queries", type=int, default=200, help="single-text encodes for the query-latency run")
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=1)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    config = json.loads((args.model_path / POOLING_FILE).read_text())
+    texts = synthetic_texts(args.texts)
+    queries = [t for t in texts if t.endswith("?")][: args.queries]
+    backends = {"pytorch": LocalEmbedding(args.model_name or config["model_name"])._encode}
+    for label, quantized, file in (("onnx", False, MODEL_FILE), ("onnx-int8", True, QUANTIZED_MODEL_FILE)):
+        if (args.model_path / file).exists():
+            backends[label] = OnnxEmbedding(
+                str(args.model_path),
+                quantized=quantized,
+                batch_size=args.batch_size,
+                intra_op_threads=args.intra_op_threads,
+                inter_op_threads=args.inter_op_threads,
+            )._encode
+    print(f"{len(texts)} texts, {len(queries)} queries, batch_size={args.batch_size}, cpus={os.cpu_count()}")
+
+    reference = np.asarray(backends["pytorch"](texts), dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    worst = 1.0
+    for label, encode in backends.items():
+        line = (
+            f"{label:<10} queries {throughput(encode, queries, 1):8.1f}/s  "
+            f"batches {throughput(encode, texts, args.batch_size):8.1f}/s"
+        )
+        if label != "pytorch":
+            vectors = np.asarray(encode(texts), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            cosine = (vectors * reference).sum(axis=1)
+            worst = min(worst, float(cosine.min()))
+            line += f"  cosine mean {cosine.mean():.5f} min {cosine.min():.5f}"
+        print(line)
+    if worst < args.min_cosine:
+        sys.exit(f"lowest cosine similarity {worst:.5f} is below {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare a fresh httpx.AsyncClient per request against the shared pooled client.
+
+Runs against a local keep-alive stub server, so no Ollama is needed:
+
+    python scripts/bench_http_clients.py --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from core.http_client import SharedHTTPClient
+from evaluation.metrics import latency_percentiles
+
+_BODY = b'{"response": "ok", "done": true}'
+_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(_BODY)).encode() + b"\r\n"
+    b"Connection: keep-alive\r\n\r\n" + _BODY
+)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(_RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run(name: str, url: str, n: int, concurrency: int, send) -> None:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await send(url)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    p = latency_percentiles(latencies)
+    print(f"{name:<22} {n / elapsed:>9.0f} req/s  p50={p['p50_ms']:.2f} ms  p95={p['p95_ms']:.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api/generate"
+    payload = {"model": "stub", "prompt": "hi", "stream": False}
+
+    async def per_request(u: str) -> None:
+        # Previous behavior: new client (and TCP connection) for every call.
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            (await client.post(u, json=payload)).json()
+
+    shared = SharedHTTPClient(timeout=10.0, max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async def pooled(u: str) -> None:
+        (await shared.client.post(u, json=payload)).json()
+
+    async with server:
+        await _run("client per request", url, args.requests, args.concurrency, per_request)
+        await _run("shared pooled client", url, args.requests, args.concurrency, pooled)
+        await shared.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
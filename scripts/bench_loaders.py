@@ -0,0 +1,126 @@
+"""Benchmark sequential vs process-pool document parsing on a synthetic PDF/HTML corpus.
+
+    python scripts/bench_loaders.py --files 64 --pages 20
+    python scripts/bench_loaders.py --memory --text-mb 200 --pages 2000
+
+With --memory, compares loading one large text file and one long PDF whole
+(`load_file` + `chunk`) with streaming them (`stream_file` + `iter_chunks`):
+time and peak traced memory of each.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.chunking.smart_chunker import SmartChunker
+from ingestion.loaders import load_file, stream_file
+from ingestion.parallel import ParallelLoader
+from tests.documents import WORDS, make_pdf
+
+
+def make_html(path: Path, sections: int) -> None:
+    body = "".join(
+        f"<h2>Section {i}</h2><p>{' '.join(WORDS * 8)}</p><ul>"
+        + "".join(f"<li><a href='/doc/{i}/{j}'>item {j}</a></li>" for j in range(10))
+        + "</ul>"
+        for i in range(sections)
+    )
+    path.write_text(f"<html><body>{body}</body></html>")
+
+
+async def _parallel(paths: list[Path], workers: int) -> int:
+    loader = ParallelLoader(workers=workers, timeout=120)
+    loader.start()  # exclude worker spawn time
+    n = 0
+    try:
+        async for _, doc in loader.iter_load(paths):
+            n += doc is not None
+    finally:
+        loader.close()
+    return n
+
+
+def make_text(path: Path, megabytes: float) -> None:
+    line = " ".join(WORDS) + ". Request served in 12 ms.\n"
+    with open(path, "w") as f:
+        for _ in range(int(megabytes * 1_000_000 / len(line))):
+            f.write(line)
+
+
+def _whole(path: Path) -> int:
+    doc = load_file(path)
+    return len(SmartChunker().chunk(doc.content, metadata={"source": doc.path}))
+
+
+def _streamed(path: Path) -> int:
+    blocks = (b.text for b in stream_file(path))
+    return sum(1 for _ in SmartChunker().iter_chunks(blocks, metadata={"source": str(path)}))
+
+
+def memory(text_mb: float, pages: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        text, pdf = Path(tmp) / "export.txt", Path(tmp) / "long.pdf"
+        make_text(text, text_mb)
+        make_pdf(pdf, pages)
+        for path in (text, pdf):
+            size = path.stat().st_size / 1e6
+            for label, fn in (("load_file", _whole), ("stream_file", _streamed)):
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                chunks = fn(path)
+                elapsed = time.perf_counter() - t0
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(
+                    f"{path.name:<11} {size:8.1f} MB  {label:<11} {chunks:>8} chunks  "
+                    f"{elapsed:7.2f} s  peak {peak / 1e6:8.1f} MB"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=20, help="pages per PDF (and sections per HTML file)")
+    parser.add_argument("--memory", action="store_true", help="compare whole-file and streaming loading instead")
+    parser.add_argument("--text-mb", type=float, default=100.0, help="size of the text file for --memory")
+    args = parser.parse_args()
+    if args.memory:
+        memory(args.text_mb, args.pages)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = []
+        for i in range(args.files):
+            p = root / (f"doc{i}.pdf" if i % 2 == 0 else f"doc{i}.html")
+            make_pdf(p, args.pages) if p.suffix == ".pdf" else make_html(p, args.pages)
+            paths.append(p)
+
+        t0 = time.perf_counter()
+        loaded = sum(load_file(p) is not None for p in paths)
+        base = time.perf_counter() - t0
+        print(f"{'sequential':<12} {loaded:>4} files  {base:7.2f} s  {len(paths) / base:7.1f} files/s")
+
+        cores = os.cpu_count() or 1
+        workers = 1
+        while True:
+            t0 = time.perf_counter()
+            loaded = asyncio.run(_parallel(paths, workers))
+            elapsed = time.perf_counter() - t0
+            print(
+                f"{f'workers={workers}':<12} {loaded:>4} files  {elapsed:7.2f} s  "
+                f"{len(paths) / elapsed:7.1f} files/s  speedup={base / elapsed:.2f}x"
+            )
+            if workers >= cores:
+                break
+            workers = min(workers * 2, cores)
+
+
+if __name__ == "__main__":
+    main()
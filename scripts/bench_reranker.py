@@ -0,0 +1,45 @@
+"""Benchmark per-query reranking against the previous per-chunk tokenizing implementations.
+
+    python scripts/bench_reranker.py --candidates 20 100 500
+
+Reranks synthetic ~2 KB candidates with the keyword and BM25 rerankers (which read the
+token stats stored at ingestion) and with the previous implementations (which
+tokenized every candidate per query, with rank_bm25 for BM25), and reports
+milliseconds per query for each.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.retriever.reranker import BM25Reranker, KeywordReranker
+from tests.test_reranker import QUERY, corpus, legacy_bm25, legacy_keyword
+
+
+def per_query_ms(fn, candidates: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(QUERY, candidates, 10)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    for k in args.candidates:
+        docs, raw = corpus(k), corpus(k, precomputed=False)
+        results = {
+            "keyword_legacy": per_query_ms(legacy_keyword, raw, args.rounds),
+            "keyword": per_query_ms(KeywordReranker().rerank, docs, args.rounds),
+            "bm25_legacy": per_query_ms(legacy_bm25, raw, args.rounds),
+            "bm25": per_query_ms(BM25Reranker().rerank, docs, args.rounds),
+        }
+        print(f"k={k:<5} per-query rerank ms: " + ", ".join(f"{name}={ms:.2f}" for name, ms in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure import time and API startup: time until requests are accepted and until warmup is ready.
+
+    python scripts/bench_startup.py --repeats 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+_STARTUP = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app, lifespan
+from app.dependencies import container
+imported = time.perf_counter()
+
+async def main():
+    async with lifespan(app):
+        accepting = time.perf_counter()
+        while not container.readiness or "pending" in container.readiness.values():
+            await asyncio.sleep(0.01)
+        print(json.dumps({
+            "import_s": imported - t0,
+            "accepting_s": accepting - t0,
+            "ready_s": time.perf_counter() - t0,
+            "readiness": container.readiness,
+        }))
+
+asyncio.run(main())
+"""
+
+
+def _run(code: str) -> str:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "failed")
+    return out.stdout.strip().splitlines()[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--modules",
+        default="app.dependencies,app.main,scripts.run_evaluation",
+        help="comma-separated modules to time, each in a fresh interpreter",
+    )
+    parser.add_argument("--no-startup", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+
+    for module in args.modules.split(","):
+        times = [float(_run(_IMPORT.format(module=module))) for _ in range(args.repeats)]
+        print(f"import {module}: median {statistics.median(times) * 1000:.0f} ms")
+    if args.no_startup:
+        return
+    # Uses the configured .env (vector store, embedding model); warmup steps that fail are reported.
+    report = json.loads(_run(_STARTUP))
+    print(
+        f"startup: accepting requests after {report['accepting_s']:.2f} s, "
+        f"ready after {report['ready_s']:.2f} s ({report['readiness']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Export a sentence-transformers model to ONNX for EMBEDDING_PROVIDER=onnx.
+
+    python scripts/export_onnx.py --model BAAI/bge-small-en --output .rag_data/onnx/bge-small-en
+
+Writes model.onnx, an int8 dynamic-quantized model.int8.onnx (unless --no-quantize),
+the fast tokenizer (tokenizer.json) and the pooling settings (pooling.json). Needs
+sentence-transformers, torch and onnxruntime; the API itself only needs onnxruntime
+and tokenizers. Check the result with scripts/bench_embeddings.py.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.embeddings.onnx import MODEL_FILE, POOLING_FILE, QUANTIZED_MODEL_FILE, TOKENIZER_FILE
+
+
+def export(model_name: str, output: Path, quantize: bool = True, opset: int = 14) -> None:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0]
+    pooling = next(m for m in st if isinstance(m, Pooling))
+    mode = pooling.get_pooling_mode_str()
+    if mode not in ("cls", "mean"):
+        sys.exit(f"unsupported pooling mode {mode!r}")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in transformer.tokenizer.model_input_names]
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(names, inputs)))[0]
+
+    output.mkdir(parents=True, exist_ok=True)
+    sample = transformer.tokenizer(["an example sentence", "another"], padding=True, return_tensors="pt")
+    axes = {n: {0: "batch", 1: "tokens"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(transformer.auto_model.eval()),
+            tuple(sample[n] for n in names),
+            str(output / MODEL_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=opset,
+        )
+    transformer.tokenizer.backend_tokenizer.save(str(output / TOKENIZER_FILE))
+    config = {
+        "model_name": model_name,
+        "pooling": mode,
+        "normalize": any(isinstance(m, Normalize) for m in st),
+        "max_length": st.max_seq_length,
+    }
+    (output / POOLING_FILE).write_text(json.dumps(config, indent=2))
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Weights to int8 ahead of time, activations quantized per batch at run time.
+        quantize_dynamic(str(output / MODEL_FILE), str(output / QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="BAAI/bge-small-en")
+    parser.add_argument("--output", type=Path, default=Path(".rag_data/onnx/bge-small-en"))
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.model, args.output, quantize=not args.no_quantize, opset=args.opset)
+    for f in sorted(args.output.iterdir()):
+        print(f"{f}  {f.stat().st_size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,7 @@ logging.basicConfig(
     datefmt="%H:%M:%S",
 )
 
-from app.dependencies import embedding, vector_store
-from ingestion.pipeline import IngestionPipeline
+from app.dependencies import container
 
 
 def main() -> None:
@@ -21,8 +20,7 @@ def main() -> None:
         sys.exit(1)
     source = Path(sys.argv[1]).resolve()
     logging.getLogger(__name__).info("ingest source=%s", source)
-    pipeline = IngestionPipeline(embedding, vector_store)
-    n = asyncio.run(pipeline.run(source))
+    n = asyncio.run(container.ingestion_pipeline().run(source))
     print(f"Indexed {n} chunks.")
 
 
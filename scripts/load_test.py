@@ -0,0 +1,80 @@
+"""Load-test the query API with deterministic stand-ins for the model, vector store and LLM.
+
+    python scripts/load_test.py --requests 500 --concurrency 1,8,32 --output load.json
+    python scripts/load_test.py --rate 100 --reranker bm25 --compare load.json
+    python scripts/load_test.py --mode url --url http://127.0.0.1:8000 --endpoint /query/stream
+
+Each concurrency level is one run. Results (throughput, p50/p95/p99/max latency, error
+rate, event-loop lag) are printed and, with --output, written as JSON. With --compare,
+runs are checked against a previous output file and the script exits 1 on a regression.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from dataclasses import fields
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from evaluation.loadtest import ENDPOINTS, MODES, LoadTestConfig, compare_results, run_load_test
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = LoadTestConfig()
+    parser.add_argument("--concurrency", default=str(defaults.concurrency), help="comma-separated levels, one run each")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default=defaults.endpoint)
+    parser.add_argument("--mode", choices=MODES, default=defaults.mode)
+    parser.add_argument("--reranker", choices=("none", "keyword", "bm25"), default=defaults.reranker)
+    for field in fields(LoadTestConfig):
+        if field.name in ("concurrency", "endpoint", "mode", "reranker"):
+            continue
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default), default=field.default)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="previous --output file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before a regression")
+    return parser.parse_args()
+
+
+def _print(result: dict) -> None:
+    c = result["config"]
+    lag = result["loop_lag"]
+    print(
+        f"concurrency={c['concurrency']} rate={c['rate'] or 'closed'} {c['endpoint']} reranker={c['reranker']}: "
+        f"{result['throughput_rps']:.1f} req/s, p50={result['p50_ms']:.1f} p95={result['p95_ms']:.1f} "
+        f"p99={result['p99_ms']:.1f} max={result['max_ms']:.1f} ms, errors={result['error_rate']:.2%}, "
+        f"loop lag p99={lag['p99_ms']:.1f} max={lag['max_ms']:.1f} ms"
+    )
+
+
+async def main() -> int:
+    args = _parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    options = {f.name: getattr(args, f.name) for f in fields(LoadTestConfig) if f.name != "concurrency"}
+    results = []
+    for level in (int(c) for c in args.concurrency.split(",")):
+        result = await run_load_test(LoadTestConfig(concurrency=level, **options))
+        _print(result)
+        results.append(result)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = {r["config"]["concurrency"]: r for r in json.loads(args.compare.read_text())}
+        regressed = False
+        for result in results:
+            previous = baseline.get(result["config"]["concurrency"])
+            if previous is None:
+                continue
+            for line in compare_results(previous, result, args.tolerance):
+                regressed = True
+                print(f"REGRESSION concurrency={result['config']['concurrency']} {line}")
+        if not regressed:
+            print("no regressions")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
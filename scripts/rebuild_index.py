@@ -5,18 +5,22 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.config import settings
-from app.dependencies import embedding, vector_store
-from ingestion.pipeline import IngestionPipeline
+from app.dependencies import container
 
 
 def main() -> None:
     if len(sys.argv) < 2:
         print("Usage: python scripts/rebuild_index.py <path>", file=sys.stderr)
         sys.exit(1)
-    vector_store.create_collection(vector_size=settings.embedding_dim)
+    container.vector_store.create_collection(vector_size=settings.embedding_dim)
+    if container.ingest_manifest is not None:
+        container.ingest_manifest.clear()
+    if container.sparse_index is not None:
+        container.sparse_index.clear()
+    if container.collection_version is not None:
+        container.collection_version.bump()
     source = Path(sys.argv[1]).resolve()
-    pipeline = IngestionPipeline(embedding, vector_store)
-    n = asyncio.run(pipeline.run(source))
+    n = asyncio.run(container.ingestion_pipeline().run(source))
     print(f"Recreated collection and indexed {n} chunks.")
 
 
@@ -1,9 +1,13 @@
+import argparse
 import asyncio
+import json
 import logging
 import sys
 import time
 from pathlib import Path
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 logging.basicConfig(
@@ -13,10 +17,14 @@ logging.basicConfig(
 )
 
 from app.config import settings
-from app.dependencies import retriever
+from app.dependencies import container
 from evaluation.metrics import latency_percentiles, mrr_at_k, ndcg_at_k, recall_at_k
+from evaluation.quantization import compare_quantization, default_configs, embed_corpus
+from evaluation.sweep import SweepConfig, config_grid, format_table, load_cases, run_sweep
 from evaluation.test_queries import TEST_CASES
 
+_GRID_TYPES = {"chunk_size": int, "chunk_overlap": int, "rerank_initial_k": int}
+
 
 async def main() -> None:
     k = settings.retrieval_top_k
@@ -26,7 +34,7 @@ async def main() -> None:
     latencies_ms: list[float] = []
     for i, case in enumerate(TEST_CASES):
         t0 = time.perf_counter()
-        retrieved = await retriever.retrieve(case.query, k=k)
+        retrieved = await container.retriever.retrieve(case.query, k=k)
         elapsed_ms = (time.perf_counter() - t0) * 1000
         latencies_ms.append(elapsed_ms)
         hit = recall_at_k(
@@ -53,5 +61,89 @@ async def main() -> None:
         print(f"Retrieval latency: p50={percentiles['p50_ms']:.1f} ms, p95={percentiles['p95_ms']:.1f} ms")
 
 
+async def quantization_report(source: Path, truncate_dims: list[int], oversampling: float, sample_queries: int, output: str | None) -> None:
+    k = settings.retrieval_top_k
+    vectors, payloads = await embed_corpus(container.embedding, source)
+    if not len(vectors):
+        print(f"No chunks found under {source}", file=sys.stderr)
+        sys.exit(1)
+    # Test-case queries first (scored for case recall), then chunk vectors as extra neighbour queries.
+    query_vectors = np.asarray(await container.embedding.embed([c.query for c in TEST_CASES]), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    sampled = vectors[rng.choice(len(vectors), size=min(sample_queries, len(vectors)), replace=False)]
+    rows = await compare_quantization(
+        vectors,
+        payloads,
+        np.vstack([query_vectors, sampled]),
+        default_configs(truncate_dims, oversampling),
+        k=k,
+        cases=TEST_CASES,
+    )
+    print(f"{len(vectors)} chunks, dim={vectors.shape[1]}, k={k}, oversampling={oversampling}")
+    print(f"{'mode':<24} {'recall':>7} {'cases':>6} {'p50 ms':>8} {'p95 ms':>8} {'search MB':>10} {'disk MB':>9}")
+    for row in rows:
+        print(
+            f"{row['mode']:<24} {row['recall_vs_exact']:>7.3f} {row['case_recall']:>6.2f} "
+            f"{row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+            f"{row['search_bytes'] / 1e6:>10.2f} {row['disk_bytes'] / 1e6:>9.2f}"
+        )
+    if output:
+        Path(output).write_text(json.dumps(rows, indent=2))
+
+
+async def sweep_report(source: Path, grid: list[str], cases_path: str | None, concurrency: int, output: str | None) -> None:
+    axes = {}
+    for spec in grid:
+        name, _, values = spec.partition("=")
+        axes[name] = [_GRID_TYPES.get(name, str)(v) for v in values.split(",") if v.strip()]
+    base = SweepConfig(
+        chunker_type=settings.chunker_type,
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        rerank_initial_k=settings.rerank_initial_k,
+    )
+    configs = config_grid(base, **axes)
+    cases = load_cases(cases_path) if cases_path else TEST_CASES
+    k = settings.retrieval_top_k
+    rows = await run_sweep(container.embedding, source, configs, cases, k=k, concurrency=concurrency)
+    print(f"{len(configs)} configs, {len(cases)} queries, k={k}; * = Pareto-optimal on NDCG, p95 latency and index size")
+    print(format_table(rows))
+    if output:
+        Path(output).write_text(json.dumps(rows, indent=2))
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency.")
+    parser.add_argument(
+        "--compare-quantization",
+        metavar="PATH",
+        help="Embed the documents under PATH once and report recall, latency and memory per compression mode",
+    )
+    parser.add_argument("--truncate-dims", default="", help="Comma-separated Matryoshka dimensions to add, e.g. 256,128")
+    parser.add_argument("--oversampling", type=float, default=settings.vector_oversampling)
+    parser.add_argument("--sample-queries", type=int, default=100, help="Chunk vectors reused as extra queries")
+    parser.add_argument(
+        "--sweep",
+        metavar="PATH",
+        help="Evaluate every combination of the --grid settings over the documents under PATH",
+    )
+    parser.add_argument(
+        "--grid",
+        nargs="*",
+        default=[],
+        metavar="AXIS=V1,V2",
+        help="Sweep axis: chunker_type, chunk_size, chunk_overlap, reranker_type (none|keyword|bm25) or rerank_initial_k",
+    )
+    parser.add_argument("--cases", help="JSONL query set for --sweep (default: the built-in test cases)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Variants evaluated at once in --sweep")
+    parser.add_argument("--output", help="Write the per-mode or per-config report as JSON")
+    args = parser.parse_args()
+    if args.sweep:
+        asyncio.run(sweep_report(Path(args.sweep), args.grid, args.cases, args.concurrency, args.output))
+    elif args.compare_quantization:
+        dims = [int(d) for d in args.truncate_dims.split(",") if d.strip()]
+        asyncio.run(
+            quantization_report(Path(args.compare_quantization), dims, args.oversampling, args.sample_queries, args.output)
+        )
+    else:
+        asyncio.run(main())
@@ -0,0 +1,40 @@
+"""Synthetic documents for loader and pipeline tests (also used by scripts/bench_loaders.py)."""
+from pathlib import Path
+
+WORDS = "retrieval augmented generation vector database chunk embedding query answer context".split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: Path, pages: int, lines_per_page: int = 40) -> None:
+    """Write a minimal multi-page PDF with real text content streams."""
+    objects: list[bytes] = []
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for p in range(pages):
+        lines = []
+        for i in range(lines_per_page):
+            words = " ".join(WORDS[(p + i + j) % len(WORDS)] for j in range(10))
+            lines.append(f"({_escape(f'Page {p} line {i}: {words}.')}) Tj 0 -14 Td")
+        stream = ("BT /F1 10 Tf 40 800 Td " + " ".join(lines) + " ET").encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[p] + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
@@ -1,5 +1,8 @@
+import re
+
 import pytest
 
+from core.chunking.base import split_blocks
 from core.chunking.paragraph_chunker import ParagraphChunker
 from core.chunking.smart_chunker import SmartChunker
 
@@ -70,3 +73,54 @@ class TestParagraphChunker:
         chunks = chunker.chunk("Hello.", metadata={"source": "y"})
         assert chunks[0]["metadata"]["source"] == "y"
         assert "chunk_index" in chunks[0]["metadata"]
+
+
+_DOC = (
+    "Qdrant is a vector database.  It stores embeddings!\nWhy chunk?\n\n"
+    "Chunking splits long texts into pieces. " + "x" * 150 + ". Short one.\n\n\n"
+    "Last paragraph here. Done."
+)
+
+
+@pytest.mark.parametrize("chunker", [SmartChunker(chunk_size=60, overlap=20), ParagraphChunker(chunk_size=60, overlap=30)])
+@pytest.mark.parametrize("block_size", [1, 7, 64])
+def test_iter_chunks_over_blocks_matches_whole_text(chunker, block_size):
+    blocks = (_DOC[i : i + block_size] for i in range(0, len(_DOC), block_size))
+    streamed = list(chunker.iter_chunks(blocks, metadata={"source": "d.md"}))
+    assert streamed == chunker.chunk(_DOC, metadata={"source": "d.md"})
+    assert [c["metadata"]["chunk_index"] for c in streamed] == list(range(len(streamed)))
+
+
+def test_iter_chunks_is_lazy():
+    def blocks():
+        yield "First sentence here. Second sentence here. Thi"
+        raise AssertionError("read past the first chunk")
+
+    chunks = SmartChunker(chunk_size=25, overlap=0).iter_chunks(blocks())
+    assert next(chunks)["text"] == "First sentence here."
+
+
+def test_split_blocks_handles_separators_across_blocks():
+    pieces = list(split_blocks(["One.", "  ", " Two.", " Three"], re.compile(r"(?<=[.!?])\s+")))
+    assert pieces == [(0, "One."), (7, "Two."), (12, "Three")]
+    assert list(split_blocks(["a\n", "\nb\n\n", "c"], re.compile(r"\n\n"))) == [(0, "a"), (3, "b"), (6, "c")]
+
+
+@pytest.mark.parametrize("chunker", [SmartChunker(chunk_size=60, overlap=20), ParagraphChunker(chunk_size=60, overlap=30)])
+def test_char_offset_points_at_chunk_start(chunker):
+    for c in chunker.chunk(_DOC):
+        start = c["metadata"]["char_offset"]
+        assert _DOC[start:].replace("\n", " ").startswith(c["text"].replace("\n", " ")[:10])
+
+
+def test_sizes_in_tokens():
+    words = lambda text: len(text.split())  # noqa: E731
+    chunker = SmartChunker(chunk_size=6, overlap=2, length=words)
+    chunks = chunker.chunk("One two three. Four five. Six seven eight nine. Ten.")
+    assert [c["text"] for c in chunks] == ["One two three. Four five.", "Four five. Six seven eight nine.", "Ten."]
+    # A sentence longer than the budget is cut between words.
+    long = chunker.chunk(" ".join(f"w{i}" for i in range(14)) + ".")
+    assert all(words(c["text"]) <= 6 for c in long)
+    assert " ".join(c["text"] for c in long).split() == [f"w{i}" for i in range(13)] + ["w13."]
+    paragraphs = ParagraphChunker(chunk_size=4, length=words).chunk("a b\n\nc d\n\ne f g")
+    assert [c["text"] for c in paragraphs] == ["a b\n\nc d", "e f g"]
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from core.chunking.smart_chunker import SmartChunker
+from core.prompt.context import ContextBuilder, TokenCounter
+from core.rag_service import RAGService
+
+TEXT = (
+    "Qdrant is a vector database. It stores embeddings with payloads. "
+    "Collections group points of the same dimension. Search returns the nearest points. "
+    "Payload indexes speed up filtering. Snapshots back up a collection."
+)
+
+
+def _docs(chunks: list[dict], order: list[int] | None = None) -> list:
+    docs = [SimpleNamespace(id=str(i), score=1.0, payload={"text": c["text"], **c["metadata"]}) for i, c in enumerate(chunks)]
+    return [docs[i] for i in order] if order is not None else docs
+
+
+def test_adjacent_overlapping_chunks_merge_without_repeats():
+    chunks = SmartChunker(chunk_size=80, overlap=40).chunk(TEXT, metadata={"source": "qdrant.md"})
+    assert len(chunks) > 2
+    docs = _docs(chunks, order=list(reversed(range(len(chunks)))))
+    context = ContextBuilder().build("what is qdrant", docs)
+    # One passage, every sentence once, in document order.
+    assert context.text == TEXT
+    assert context.tokens < context.raw_tokens
+    assert context.sentences_dropped > 0
+
+
+def test_duplicate_documents_and_passage_order():
+    a = {"text": "Alpha one. Alpha two.", "metadata": {"source": "a.md", "chunk_index": 0}}
+    b = {"text": "Beta one.", "metadata": {"source": "b.md", "chunk_index": 3}}
+    dup = {"text": "alpha  ONE. Alpha three.", "metadata": {"source": "copy-of-a.md", "chunk_index": 0}}
+    context = ContextBuilder().build("q", _docs([b, a, dup]))
+    assert context.text.split("\n\n") == ["Beta one.", "Alpha one. Alpha two.", "Alpha three."]
+
+
+def test_sentence_selection_and_token_budget():
+    chunks = [{"text": TEXT, "metadata": {"source": "qdrant.md", "chunk_index": 0}}]
+    selected = ContextBuilder(select_sentences=True).build("How do payload indexes work?", _docs(chunks))
+    assert selected.text == "Payload indexes speed up filtering."
+    counter = TokenCounter()
+    budgeted = ContextBuilder(counter, max_tokens=20).build("q", _docs(chunks))
+    assert 0 < budgeted.tokens <= 20
+    assert budgeted.text.startswith("Qdrant is a vector database.")
+    assert counter.count(budgeted.text) <= 20
+
+
+def test_token_counter_falls_back_to_approximation():
+    counter = TokenCounter("no-such/tokenizer")
+    assert counter.count("Hello, world") == 5
+    assert counter.count("internationalization") == 5
+
+
+async def test_rag_service_reports_prompt_tokens():
+    class EchoLLM:
+        async def generate(self, prompt):
+            self.prompt = prompt
+            return "ok"
+
+    chunks = SmartChunker(chunk_size=80, overlap=40).chunk(TEXT, metadata={"source": "qdrant.md"})
+    retriever = SimpleNamespace()
+
+    async def retrieve(query, k):
+        return _docs(chunks)
+
+    retriever.retrieve = retrieve
+    llm = EchoLLM()
+    result = await RAGService(retriever, llm, top_k=5).answer("What is Qdrant?")
+    counter = TokenCounter()
+    raw_tokens = sum(counter.count(c["text"]) for c in chunks)
+    context = ContextBuilder().build("What is Qdrant?", _docs(chunks))
+    assert result["usage"] == {
+        "prompt_tokens": counter.count(llm.prompt),
+        "context_tokens": context.tokens,
+        "raw_context_tokens": raw_tokens,
+    }
+    # The overlapping chunks merge into one passage, so the prompt carries fewer tokens than they hold.
+    assert (context.tokens, raw_tokens) == (70, 85)
+    assert llm.prompt.count("Qdrant is a vector database.") == 1
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.embeddings.batching import MicroBatchEncoder
+from core.embeddings.cache import CachedEmbedding, DiskEmbeddingCache, MemoryEmbeddingCache, content_hash
+from core.embeddings.onnx import OnnxEmbedding, pool
+
+
+class RecordingEncoder:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches: list[list[str]] = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(t))] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_batched():
+    encode = RecordingEncoder()
+    encoder = MicroBatchEncoder(encode, max_batch_size=64, max_wait_ms=50)
+    queries = [f"query {'x' * i}" for i in range(10)]
+    results = await asyncio.gather(*(encoder.submit([q]) for q in queries))
+    assert results == [[[float(len(q))]] for q in queries]
+    assert len(encode.batches) == 1
+    assert len(encode.batches[0]) == 10
+    encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    encode = RecordingEncoder()
+    encoder = MicroBatchEncoder(encode, max_batch_size=4, max_wait_ms=50)
+    await asyncio.gather(*(encoder.submit([str(i)]) for i in range(10)))
+    assert all(len(b) <= 4 for b in encode.batches)
+    assert sum(len(b) for b in encode.batches) == 10
+    encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_encode():
+    encoder = MicroBatchEncoder(RecordingEncoder(delay=0.2), max_wait_ms=0)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await encoder.submit(["slow"])
+    task.cancel()
+    assert ticks >= 5
+    encoder.close()
+
+
+@pytest.mark.asyncio
+async def test_encode_error_propagates_to_callers():
+    def broken(texts):
+        raise ValueError("boom")
+
+    encoder = MicroBatchEncoder(broken, max_wait_ms=10)
+    with pytest.raises(ValueError, match="boom"):
+        await encoder.submit(["a"])
+    assert await MicroBatchEncoder(broken).submit([]) == []
+    encoder.close()
+
+
+class CountingEmbedding:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_hits_normalized_queries():
+    inner = CountingEmbedding()
+    cached = CachedEmbedding(inner, "m", memory=MemoryEmbeddingCache(max_entries=10))
+    first = await cached.embed(["What is  Qdrant?"])
+    second = await cached.embed([" What is Qdrant? "])
+    assert first == second
+    assert len(inner.calls) == 1
+    assert cached.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryEmbeddingCache(max_entries=2, ttl_seconds=3600)
+    cache.put(("m", "a"), [1.0])
+    cache.put(("m", "b"), [2.0])
+    assert cache.get(("m", "a")) == [1.0]
+    cache.put(("m", "c"), [3.0])
+    assert cache.get(("m", "b")) is None
+    assert len(cache) == 2
+    expired = MemoryEmbeddingCache(max_entries=2, ttl_seconds=1e-9)
+    expired.put(("m", "a"), [1.0])
+    time.sleep(0.001)
+    assert expired.get(("m", "a")) is None
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_survives_restart_and_dedupes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    inner = CountingEmbedding()
+    cached = CachedEmbedding(inner, "m", disk=DiskEmbeddingCache(path))
+    vectors = await cached.embed(["chunk a", "chunk b", "chunk a"])
+    assert inner.calls == [["chunk a", "chunk b"]]
+    assert vectors[0] == vectors[2]
+    cached.disk.close()
+
+    inner2 = CountingEmbedding()
+    reopened = CachedEmbedding(inner2, "m", disk=DiskEmbeddingCache(path))
+    assert await reopened.embed(["chunk b", "chunk a"]) == [vectors[1], vectors[0]]
+    assert inner2.calls == []
+    assert reopened.stats["disk_hits"] == 2
+    # A different model name never shares entries.
+    other = CachedEmbedding(inner2, "other", disk=reopened.disk)
+    await other.embed(["chunk a"])
+    assert inner2.calls == [["chunk a"]]
+
+
+def test_disk_cache_evicts_by_size(tmp_path):
+    vector = [0.0] * 64  # 256 bytes as float32
+    cache = DiskEmbeddingCache(tmp_path / "cache.sqlite", max_bytes=256 * 10)
+    for i in range(30):
+        cache.put_many([(content_hash("m", str(i)), vector)])
+    assert cache.size_bytes <= 256 * 10
+    assert len(cache) <= 10
+    assert cache.get_many([content_hash("m", "29")])
+
+
+class FakeTokenizer:
+    def encode_batch(self, texts):
+        # One token per word; ids are word lengths.
+        return [SimpleNamespace(ids=[len(w) for w in t.split()]) for t in texts]
+
+
+class FakeSession:
+    """Token state i is (id, 1.0), so a mean-pooled vector is (mean id, 1.0) before normalization."""
+
+    def __init__(self, inputs=("input_ids", "attention_mask", "token_type_ids")):
+        self.inputs = inputs
+        self.feeds: list[dict] = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=n) for n in self.inputs]
+
+    def run(self, outputs, feeds):
+        self.feeds.append(feeds)
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def _onnx_embedding(session, batch_size=2, **config):
+    embedding = OnnxEmbedding("unused", batch_size=batch_size)
+    embedding._session, embedding._tokenizer = session, FakeTokenizer()
+    embedding._config = {"pooling": "mean", "normalize": False, **config}
+    return embedding
+
+
+def test_pool_modes():
+    hidden = np.array([[[3.0, 4.0], [1.0, 0.0], [9.0, 9.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert pool(hidden, mask, "cls", normalize=False).tolist() == [[3.0, 4.0]]
+    assert np.allclose(pool(hidden, mask, "cls"), [[0.6, 0.8]])
+    assert pool(hidden, mask, "mean", normalize=False).tolist() == [[2.0, 2.0]]
+    with pytest.raises(ValueError):
+        pool(hidden, mask, "max")
+
+
+def test_onnx_batches_are_sorted_by_length_and_padded_to_their_longest_text():
+    session = FakeSession()
+    embedding = _onnx_embedding(session)
+    texts = ["a bb ccc dddd", "a", "eeeee ff", "ggg", "h ii jjj"]
+    vectors = embedding._encode(texts)
+    assert [f["input_ids"].shape for f in session.feeds] == [(2, 1), (2, 3), (1, 4)]
+    assert all((f["token_type_ids"] == 0).all() for f in session.feeds)
+    # Results come back in input order and padding does not change them.
+    expected = [[float(np.mean([len(w) for w in t.split()])), 1.0] for t in texts]
+    assert np.allclose(vectors, expected)
+    assert np.allclose([_onnx_embedding(FakeSession(), batch_size=1)._encode([t])[0] for t in texts], expected)
+
+
+def test_onnx_feeds_only_the_model_inputs():
+    session = FakeSession(inputs=("input_ids", "attention_mask"))
+    _onnx_embedding(session, pooling="cls", normalize=True)._encode(["a bb"])
+    assert set(session.feeds[0]) == {"input_ids", "attention_mask"}
+
+
+def test_onnx_missing_export_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="export_onnx"):
+        OnnxEmbedding(str(tmp_path)).warmup()
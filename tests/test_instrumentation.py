@@ -0,0 +1,106 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.llm.base import BaseLLM
+from core.metrics import PROMPT_TOKENS, RERANK_CANDIDATES, STAGE_SECONDS, Counter, Gauge, Histogram, Registry
+from core.rag_service import RAGService
+from core.retriever.reranker import KeywordReranker, RerankingRetriever
+from core.retriever.vector import VectorRetriever
+
+
+def _count(histogram: Histogram, *labels) -> int:
+    return histogram.labels(*labels).count
+
+
+def test_text_exposition_format():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("route",), registry=registry)
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    Gauge("rate", "Rate.", registry=registry).set(1.5)
+    latency = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 5.0):
+        latency.labels("embed").observe(value)
+    text = registry.render()
+    assert '# TYPE requests_total counter\nrequests_total{route="/a\\"b"} 3\n' in text
+    assert "rate 1.5\n" in text
+    assert 'latency_seconds_bucket{stage="embed",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{stage="embed",le="1"} 2\n' in text
+    assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 3\n' in text
+    assert 'latency_seconds_sum{stage="embed"} 5.55\n' in text
+    assert 'latency_seconds_count{stage="embed"} 3\n' in text
+    with pytest.raises(ValueError):
+        Counter("requests_total", "Duplicate.", registry=registry)
+    with pytest.raises(ValueError):
+        latency.labels()
+
+
+def test_timed_blocks_are_recorded():
+    series = Histogram("bench_seconds", "Bench.", ("stage",), registry=Registry()).labels("x")
+    for _ in range(1000):
+        with series.time():
+            pass
+    assert series.count == 1000
+    assert 0 <= series.sum < 1.0
+
+
+@pytest.mark.asyncio
+async def test_retrieval_stages_are_recorded():
+    embedding = MagicMock()
+    embedding.embed = AsyncMock(return_value=[[1.0, 0.0]])
+    store = MagicMock()
+    docs = [MagicMock(payload={"text": f"alpha {i}"}, score=1.0 - i / 10, id=str(i)) for i in range(7)]
+    store.search = AsyncMock(return_value=docs)
+    retriever = RerankingRetriever(VectorRetriever(embedding, store), KeywordReranker(), initial_k=7, top_k=3)
+    before = {stage: _count(STAGE_SECONDS, stage) for stage in ("embed", "search", "rerank")}
+    candidates = RERANK_CANDIDATES.labels().sum
+    assert len(await retriever.retrieve("alpha")) == 3
+    assert {stage: _count(STAGE_SECONDS, stage) - n for stage, n in before.items()} == {
+        "embed": 1,
+        "search": 1,
+        "rerank": 1,
+    }
+    assert RERANK_CANDIDATES.labels().sum - candidates == 7
+
+
+@pytest.mark.asyncio
+async def test_generation_stages_and_prompt_size_are_recorded():
+    class FakeLLM(BaseLLM):
+        async def generate(self, prompt):
+            return "answer"
+
+        async def stream(self, prompt):
+            for token in ("a", "b"):
+                yield token
+
+    retriever = MagicMock()
+    retriever.retrieve = AsyncMock(return_value=[MagicMock(payload={"text": "Some context."}, score=1.0, id="1")])
+    service = RAGService(retriever, FakeLLM())
+    stages = ("retrieve", "context", "generate", "first_token")
+    before = {stage: _count(STAGE_SECONDS, stage) for stage in stages}
+    prompts = PROMPT_TOKENS.labels().count
+    await service.answer("question")
+    [event async for event in service.answer_stream("question")]
+    assert {stage: _count(STAGE_SECONDS, stage) - n for stage, n in before.items()} == {
+        "retrieve": 2,
+        "context": 2,
+        "generate": 2,
+        "first_token": 1,
+    }
+    assert PROMPT_TOKENS.labels().count - prompts == 2
+
+
+def test_metrics_endpoint_reports_request_latency_by_route():
+    from app.main import app
+
+    client = TestClient(app)
+    assert client.get("/").status_code == 200
+    assert client.get("/no-such-page").status_code == 404
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'rag_http_request_duration_seconds_count{method="GET",route="/",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "# TYPE rag_stage_duration_seconds histogram" in body
@@ -0,0 +1,58 @@
+import json
+
+import httpx
+import pytest
+
+from core.http_client import SharedHTTPClient
+from core.llm.ollama import OllamaLLM
+
+
+def _ollama_transport(seen: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        seen.append(body)
+        if body["stream"]:
+            lines = [
+                {"response": "Hel", "done": False},
+                {"response": "lo", "done": False},
+                {"response": "", "done": True},
+            ]
+            return httpx.Response(200, content="\n".join(json.dumps(l) for l in lines).encode())
+        return httpx.Response(200, json={"response": "Hello", "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_generate_uses_shared_client():
+    seen: list = []
+    http = SharedHTTPClient(transport=_ollama_transport(seen))
+    llm = OllamaLLM(model="m", base_url="http://ollama", timeout=5, http=http)
+    assert await llm.generate("p1") == "Hello"
+    first_client = http.client
+    assert await llm.generate("p2") == "Hello"
+    assert http.client is first_client
+    assert [b["prompt"] for b in seen] == ["p1", "p2"]
+    assert all(b["stream"] is False for b in seen)
+    await http.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_tokens():
+    seen: list = []
+    http = SharedHTTPClient(transport=_ollama_transport(seen))
+    llm = OllamaLLM(model="m", base_url="http://ollama", timeout=5, http=http)
+    tokens = [t async for t in llm.stream("p")]
+    assert tokens == ["Hel", "lo"]
+    assert seen[0]["stream"] is True
+    await http.aclose()
+
+
+@pytest.mark.asyncio
+async def test_shared_client_recreated_after_close():
+    http = SharedHTTPClient(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+    first = http.start()
+    await http.aclose()
+    assert first.is_closed
+    assert http.client is not first
+    await http.aclose()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from ingestion.loaders import load_file, stream_file, stream_text
+from ingestion.parallel import ParallelLoader
+from tests.documents import make_pdf
+
+
+def slow_loader(path: Path):
+    # Runs in the worker process: simulates a pathological document.
+    if path.name.startswith("slow"):
+        time.sleep(30)
+    return load_file(path)
+
+
+def crashing_loader(path: Path):
+    if path.name.startswith("crash"):
+        os._exit(1)
+    return load_file(path)
+
+
+@pytest.mark.asyncio
+async def test_parallel_loader_streams_results(tmp_path):
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"page{i}.html"
+        p.write_text(f"<html><body><h1>Title {i}</h1><p>Body text {i}.</p></body></html>")
+        paths.append(p)
+    txt = tmp_path / "notes.txt"
+    txt.write_text("plain text")
+    paths.append(txt)
+    loader = ParallelLoader(workers=2, timeout=30)
+    try:
+        results = {path: doc async for path, doc in loader.iter_load(paths)}
+    finally:
+        loader.close()
+    assert set(results) == set(paths)
+    assert "Title 2" in results[tmp_path / "page2.html"].content
+    assert results[txt].content == "plain text"
+
+
+@pytest.mark.asyncio
+async def test_parallel_loader_times_out_and_recovers(tmp_path):
+    slow = tmp_path / "slow.html"
+    slow.write_text("<p>never finishes</p>")
+    ok = tmp_path / "ok.html"
+    ok.write_text("<p>fine</p>")
+    loader = ParallelLoader(workers=1, timeout=2.0, load_fn=slow_loader)
+    try:
+        t0 = time.perf_counter()
+        assert await loader.load(slow) is None
+        assert time.perf_counter() - t0 < 10
+        doc = await loader.load(ok)
+    finally:
+        loader.close()
+    assert doc is not None and "fine" in doc.content
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_only_the_hung_file_with_more_loads_than_workers(tmp_path):
+    # The pipeline runs max(4, workers) load tasks, so files wait for the single worker.
+    slow = tmp_path / "slow.html"
+    slow.write_text("<p>never finishes</p>")
+    paths = [slow]
+    for i in range(6):
+        p = tmp_path / f"ok{i}.html"
+        p.write_text(f"<p>fine {i}</p>")
+        paths.append(p)
+    loader = ParallelLoader(workers=1, timeout=1.5, load_fn=slow_loader)
+    try:
+        docs = await asyncio.gather(*(loader.load(p) for p in paths))
+    finally:
+        loader.close()
+    assert docs[0] is None
+    assert [d.content for d in docs[1:]] == [f"fine {i}" for i in range(6)]
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_replaced_and_the_file_retried(tmp_path):
+    paths = [tmp_path / f"{name}.html" for name in ("crash", "ok")]
+    for p in paths:
+        p.write_text("<p>text</p>")
+    loader = ParallelLoader(workers=2, timeout=30, load_fn=crashing_loader)
+    try:
+        crashed, ok = await asyncio.gather(*(loader.load(p) for p in paths))
+    finally:
+        loader.close()
+    assert crashed is None
+    assert ok.content == "text"
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 4096])
+def test_stream_text_matches_read_text(tmp_path, block_size):
+    path = tmp_path / "mixed.txt"
+    path.write_bytes("line one\r\nline two\rcafé €5 😀\n".encode() * 50 + b"\xff broken\r")
+    blocks = list(stream_text(path, block_size))
+    assert "".join(b.text for b in blocks) == path.read_text(encoding="utf-8", errors="replace")
+    assert all(b.page is None for b in blocks)
+    assert load_file(path).content == path.read_text(encoding="utf-8", errors="replace")
+
+
+def test_empty_and_unsupported_files(tmp_path):
+    empty = tmp_path / "empty.md"
+    empty.write_bytes(b"")
+    assert list(stream_file(empty)) == []
+    assert load_file(empty).content == ""
+    assert stream_file(tmp_path / "data.csv") is None
+
+
+def test_pdf_streams_pages(tmp_path):
+    path = tmp_path / "doc.pdf"
+    make_pdf(path, pages=3, lines_per_page=2)
+    blocks = list(stream_file(path))
+    assert [b.page for b in blocks] == [1, 2, 3]
+    assert "Page 1 line 0" in blocks[1].text and blocks[1].text.startswith("\n\n")
+    doc = load_file(path)
+    assert doc.content == "".join(b.text for b in blocks).strip()
+    assert [number for _, number in doc.pages] == [1, 2, 3]
+    assert [b.page for b in doc.blocks()] == [1, 2, 3]
+    assert "".join(b.text for b in doc.blocks()) == doc.content
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from evaluation.loadtest import (
+    LoadTestConfig,
+    StandInEmbedding,
+    StandInLLM,
+    compare_results,
+    run_load_test,
+    stand_in_service,
+)
+from evaluation.metrics import latency_percentiles
+
+_FAST = dict(
+    requests=40,
+    concurrency=8,
+    embed_latency_ms=1.0,
+    search_latency_ms=1.0,
+    llm_latency_ms=5.0,
+    token_latency_ms=0.0,
+    corpus_size=200,
+    warmup_requests=2,
+)
+
+
+@pytest.mark.asyncio
+async def test_stand_ins_are_deterministic():
+    a, b = StandInEmbedding(dim=16), StandInEmbedding(dim=16)
+    assert await a.embed(["vector search"]) == await b.embed(["vector search"])
+    llm = StandInLLM()
+    streamed = "".join([t async for t in llm.stream("prompt")])
+    assert streamed == await llm.generate("prompt") == await StandInLLM().generate("prompt")
+
+
+@pytest.mark.asyncio
+async def test_stand_in_service_retrieves_matching_documents():
+    async with stand_in_service(LoadTestConfig(corpus_size=200, reranker="bm25", rerank_initial_k=20)) as service:
+        result = await service.answer("quantization memory disk")
+    assert len(result["sources"]) == 5
+    assert result["answer"].startswith("Stand-in answer")
+    assert any("quantization" in doc.payload["text"] for doc in result["sources"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("endpoint", ["/query/", "/query/stream"])
+async def test_closed_loop_run_reports_latency_and_loop_lag(endpoint):
+    result = await run_load_test(LoadTestConfig(endpoint=endpoint, **_FAST))
+    assert result["requests"] == 40 and result["errors"] == 0
+    assert result["status_counts"] == {"200": 40}
+    assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert result["throughput_rps"] > 0
+    assert set(result["loop_lag"]) == {"p50_ms", "p99_ms", "max_ms"}
+    json.dumps(result)
+
+
+@pytest.mark.asyncio
+async def test_in_process_run_ignores_api_key_and_rate_limit(monkeypatch):
+    from app import auth
+    from core.rate_limit import MemoryRateLimiter
+
+    limiter = MemoryRateLimiter(1, burst=1)
+    monkeypatch.setattr(auth.settings, "api_key", "secret")
+    monkeypatch.setattr(auth, "rate_limiter", limiter)
+    result = await run_load_test(LoadTestConfig(**_FAST))
+    assert result["status_counts"] == {"200": 40}
+    # Restored afterwards.
+    assert auth.settings.api_key == "secret" and auth.rate_limiter is limiter
+
+
+@pytest.mark.asyncio
+async def test_open_loop_run_through_uvicorn():
+    result = await run_load_test(LoadTestConfig(mode="uvicorn", rate=200.0, **_FAST))
+    assert result["requests"] == 40 and result["errors"] == 0
+    # 40 arrivals at 200/s take at least ~0.2 s.
+    assert result["duration_s"] >= 0.19
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0, "throughput_rps": 100.0, "error_rate": 0.0}
+    same = dict(baseline, p95_ms=22.0)
+    assert compare_results(baseline, same) == []
+    worse = dict(baseline, p99_ms=40.0, throughput_rps=70.0, error_rate=0.05)
+    assert [line.split(":")[0] for line in compare_results(baseline, worse)] == [
+        "p99_ms",
+        "throughput_rps",
+        "error_rate",
+    ]
+
+
+def test_latency_percentiles_custom_levels():
+    out = latency_percentiles([float(i) for i in range(1, 101)], (50, 95, 99))
+    assert out == {"p50_ms": 51.0, "p95_ms": 96.0, "p99_ms": 100.0}
@@ -0,0 +1,222 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from core.chunking.smart_chunker import SmartChunker
+from core.retriever.vector import VectorRetriever
+from db.vector.local import IVFIndex, LocalVectorStore
+from db.vector.quantization import QuantizationConfig
+from evaluation.quantization import compare_quantization, default_configs
+from ingestion.pipeline import IngestionPipeline
+
+
+def _unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = LocalVectorStore("test", path=tmp_path)
+    s.ensure_collection(vector_size=8)
+    return s
+
+
+@pytest.mark.asyncio
+async def test_exact_search_matches_brute_force(store):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+    ids = [f"id-{i}" for i in range(300)]
+    await store.upsert(vectors.tolist(), [{"text": str(i), "source": "a"} for i in range(300)], ids=ids)
+    queries = rng.normal(size=(3, 8))
+    expected = np.argsort(-(_unit(queries) @ _unit(vectors).T), axis=1)[:, :5]
+    results = await store.search_batch(queries.tolist(), k=5)
+    for hits, want in zip(results, expected):
+        assert [h.id for h in hits] == [ids[i] for i in want]
+    [single] = [await store.search(queries[0].tolist(), k=5)]
+    assert [h.id for h in single] == [h.id for h in results[0]]
+    assert single[0].payload["source"] == "a"
+    assert -1.0 <= single[-1].score <= single[0].score <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_replace_delete_and_reopen(store, tmp_path):
+    await store.upsert([[1.0] + [0.0] * 7, [0.0, 1.0] + [0.0] * 6], [{"text": "x", "source": "a"}, {"text": "y", "source": "b"}], ids=["p1", "p2"])
+    version = store.version
+    await store.upsert([[0.0, 1.0] + [0.0] * 6], [{"text": "x2", "source": "a"}], ids=["p1"])
+    assert store.version > version
+    assert len(store) == 2
+    hits = await store.search([0.0, 1.0] + [0.0] * 6, k=2)
+    assert {h.id for h in hits} == {"p1", "p2"}
+    assert next(h for h in hits if h.id == "p1").payload["text"] == "x2"
+
+    await store.delete_by_source("b")
+    await store.delete_by_source("a", keep_ids={"p1"})
+    assert [h.id for h in await store.search([1.0] * 8, k=5)] == ["p1"]
+    # Freed rows are reused.
+    await store.upsert([[0.0] * 7 + [1.0]], [{"text": "z", "source": "c"}], ids=["p3"])
+    assert store._rows == 2
+    store.close()
+
+    reopened = LocalVectorStore("test", path=tmp_path)
+    assert len(reopened) == 2
+    assert (await reopened.search([0.0] * 7 + [1.0], k=1))[0].id == "p3"
+    with pytest.raises(ValueError):
+        reopened.ensure_collection(vector_size=16)
+
+
+@pytest.mark.asyncio
+async def test_float16_and_approximate_index(tmp_path):
+    rng = np.random.default_rng(1)
+    centers = _unit(rng.normal(size=(20, 16)))
+    vectors = _unit(np.repeat(centers, 100, axis=0) + 0.05 * rng.normal(size=(2000, 16)))
+    exact = LocalVectorStore("exact", path=tmp_path)
+    approx = LocalVectorStore("approx", path=tmp_path, dtype="float16", ann_min_points=1000, ann_nprobe=4)
+    for s in (exact, approx):
+        s.ensure_collection(vector_size=16)
+        await s.upsert(vectors, [{"text": str(i)} for i in range(2000)], ids=[str(i) for i in range(2000)])
+    queries = _unit(centers + 0.05 * rng.normal(size=centers.shape))
+    want = await exact.search_batch(queries, k=10)
+    got = await approx.search_batch(queries, k=10)
+    assert approx._ivf is not None
+    recall = np.mean([len({h.id for h in w} & {h.id for h in g}) / 10 for w, g in zip(want, got)])
+    assert recall >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_ivf_is_trained_on_write_not_during_search(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    store = LocalVectorStore("ivf", path=tmp_path, ann_min_points=100)
+    store.ensure_collection(vector_size=8)
+    await store.upsert(rng.normal(size=(99, 8)), [{"text": str(i)} for i in range(99)], ids=[str(i) for i in range(99)])
+    assert store._ivf is None
+    await store.upsert(rng.normal(size=(1, 8)), [{"text": "x"}], ids=["x"])
+    assert store._ivf is not None and store._ivf.trained_rows == 100
+
+    def fail(*args, **kwargs):
+        raise AssertionError("trained during search")
+
+    monkeypatch.setattr(IVFIndex, "train", fail)
+    assert len(await store.search(rng.normal(size=8), k=5)) == 5
+    store.close()
+    # Reopening trains before the first search too.
+    monkeypatch.undo()
+    assert LocalVectorStore("ivf", path=tmp_path, ann_min_points=100)._ivf is not None
+
+
+@pytest.mark.asyncio
+async def test_search_drops_rows_rewritten_after_scoring(store, monkeypatch):
+    await store.upsert([[1.0] + [0.0] * 7, [0.9, 0.1] + [0.0] * 6], [{"text": "a", "source": "a"}, {"text": "b", "source": "b"}], ids=["a", "b"])
+    fetch = store._fetch
+    calls = 0
+
+    def racing_fetch(hits, version):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            # Between scoring and payload lookup: "a" is deleted and its row reused by "c".
+            store._delete_by_source("a", set())
+            store._upsert(["c"], [[0.0] * 7 + [1.0]], [{"text": "c", "source": "c"}])
+        return fetch(hits, version)
+
+    monkeypatch.setattr(store, "_fetch", racing_fetch)
+    hits = await store.search([1.0] + [0.0] * 7, k=2)
+    assert store._row_of["c"] == 0  # the row "a" was scored in
+    assert calls == 2  # the first result was stale and the search ran again
+    assert [h.id for h in hits] == ["b", "c"]
+    assert hits[1].score == pytest.approx(0.0)
+
+
+@pytest.mark.asyncio
+async def test_search_waits_for_writers_off_the_event_loop(store):
+    await store.upsert([[1.0] * 8], [{"text": "a"}], ids=["a"])
+    with store._lock:  # a write in progress
+        task = asyncio.create_task(store.search([1.0] * 8, k=1))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+    assert [h.id for h in await task] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_and_retriever_without_qdrant(tmp_path, store):
+    class HashEmbedding:
+        async def embed(self, texts):
+            return [[float((hash(w) % 7) - 3) for w in (t.split() + ["pad"] * 8)[:8]] for t in texts]
+
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text("Alpha beta gamma. Delta epsilon zeta.")
+    pipeline = IngestionPipeline(HashEmbedding(), store)
+    pipeline.chunker = SmartChunker(chunk_size=20, overlap=0)
+    n = await pipeline.run(tmp_path / "docs")
+    assert n == len(store) > 0
+    docs = await VectorRetriever(HashEmbedding(), store).retrieve("Alpha beta gamma.", k=1)
+    assert docs[0].payload["text"] == "Alpha beta gamma."
+
+
+def _clustered(n_centers: int, per_center: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    noise = 0.5 / np.sqrt(dim)
+    centers = _unit(rng.normal(size=(n_centers, dim)))
+    vectors = _unit(np.repeat(centers, per_center, axis=0) + noise * rng.normal(size=(n_centers * per_center, dim)))
+    return vectors.astype(np.float32), _unit(centers + noise * rng.normal(size=centers.shape)).astype(np.float32)
+
+
+@pytest.mark.asyncio
+# 1-bit codes need more dimensions and oversampling to recover the exact top-k.
+@pytest.mark.parametrize("mode,dim,oversampling", [("int8", 64, 4.0), ("binary", 256, 10.0)])
+async def test_quantized_search_rescores_to_exact_order(tmp_path, mode, dim, oversampling):
+    vectors, queries = _clustered(10, 100, dim, seed=2)
+    ids = [str(i) for i in range(len(vectors))]
+    exact = LocalVectorStore("exact", path=tmp_path)
+    quantized = LocalVectorStore(
+        mode, path=tmp_path, quantization=QuantizationConfig(mode=mode, oversampling=oversampling)
+    )
+    for s in (exact, quantized):
+        s.ensure_collection(vector_size=dim)
+        await s.upsert(vectors, [{"text": i} for i in ids], ids=ids)
+    want = await exact.search_batch(queries, k=5)
+    got = await quantized.search_batch(queries, k=5)
+    recall = np.mean([len({h.id for h in w} & {h.id for h in g}) / 5 for w, g in zip(want, got)])
+    assert recall >= 0.8
+    # Rescored hits carry exact cosine scores.
+    for w, g in zip(want, got):
+        exact_scores = {h.id: h.score for h in w}
+        for h in g:
+            if h.id in exact_scores:
+                assert h.score == pytest.approx(exact_scores[h.id], abs=1e-5)
+    memory = quantized.memory_bytes()
+    assert memory["search_bytes"] < exact.memory_bytes()["search_bytes"]
+    assert memory["disk_bytes"] > memory["search_bytes"]
+
+
+@pytest.mark.asyncio
+async def test_truncation_and_mode_switch_rebuilds_codes(tmp_path):
+    vectors, queries = _clustered(5, 40, 32, seed=3)
+    ids = [str(i) for i in range(len(vectors))]
+    config = QuantizationConfig(truncate_dim=16)
+    store = LocalVectorStore("c", path=tmp_path, quantization=config)
+    store.ensure_collection(vector_size=32)
+    await store.upsert(vectors, [{"text": i} for i in ids], ids=ids)
+    before = [h.id for h in await store.search(queries[0], k=5)]
+    store.close()
+    int8 = LocalVectorStore(
+        "c", path=tmp_path, quantization=QuantizationConfig(mode="int8", truncate_dim=16, oversampling=4.0)
+    )
+    int8.ensure_collection(vector_size=32)
+    assert [h.id for h in await int8.search(queries[0], k=5)] == before
+    with pytest.raises(ValueError):
+        int8.ensure_collection(vector_size=8)
+
+
+@pytest.mark.asyncio
+async def test_compare_quantization_reports_each_mode(tmp_path):
+    vectors, queries = _clustered(8, 50, 32, seed=4)
+    payloads = [{"text": f"chunk {i}", "source": f"doc{i % 8}.md"} for i in range(len(vectors))]
+    configs = default_configs(truncate_dims=[16])
+    rows = await compare_quantization(vectors, payloads, queries, configs, k=5, repeats=1, workdir=tmp_path)
+    assert [r["mode"] for r in rows] == [c.label for c in configs]
+    assert rows[0]["mode"] == "none" and rows[0]["recall_vs_exact"] == 1.0
+    by_mode = {r["mode"]: r for r in rows}
+    assert by_mode["int8"]["recall_vs_exact"] >= 0.8
+    assert by_mode["binary"]["search_bytes"] < by_mode["int8"]["search_bytes"] < by_mode["none"]["search_bytes"]
+    assert all(r["p95_ms"] >= r["p50_ms"] >= 0 for r in rows)
@@ -1,11 +1,18 @@
 import asyncio
+import os
+import tracemalloc
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from core.chunking.base import chunk_id
 from core.chunking.smart_chunker import SmartChunker
+from core.collection_version import CollectionVersion
+from ingestion import loaders
+from ingestion.manifest import FileManifest
 from ingestion.pipeline import IngestionPipeline
+from tests.documents import make_pdf
 
 
 @pytest.fixture
@@ -55,3 +62,284 @@ async def test_pipeline_empty_folder_no_chunks(tmp_path, mock_embedding, mock_ve
     n = await pipeline.run(tmp_path)
     assert n == 0
     mock_vector_store.upsert.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_embed_and_upsert(tmp_path):
+    for i in range(6):
+        (tmp_path / f"doc{i}.txt").write_text(" ".join(f"Sentence {i}-{j}." for j in range(20)))
+    active = {"embed": 0, "upsert": 0}
+    overlapped = False
+
+    class SlowEmbedding:
+        async def embed(self, texts):
+            nonlocal overlapped
+            active["embed"] += 1
+            overlapped = overlapped or active["upsert"] > 0
+            await asyncio.sleep(0.01)
+            active["embed"] -= 1
+            return [[0.1] * 4 for _ in texts]
+
+    class SlowStore:
+        def __init__(self):
+            self.payloads = []
+
+        async def upsert(self, vectors, payloads):
+            nonlocal overlapped
+            active["upsert"] += 1
+            overlapped = overlapped or active["embed"] > 0
+            await asyncio.sleep(0.01)
+            active["upsert"] -= 1
+            self.payloads.extend(payloads)
+
+    store = SlowStore()
+    pipeline = IngestionPipeline(SlowEmbedding(), store, batch_size=4, queue_size=2)
+    pipeline.chunker = SmartChunker(chunk_size=60, overlap=0)
+
+    n = await pipeline.run(tmp_path)
+
+    assert n == len(store.payloads) > 6
+    assert {p["source"] for p in store.payloads} == {str(tmp_path / f"doc{i}.txt") for i in range(6)}
+    assert overlapped
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stage_error_propagates(tmp_path, mock_vector_store):
+    (tmp_path / "doc.txt").write_text("First sentence. Second sentence.")
+    broken = MagicMock()
+    broken.embed = AsyncMock(side_effect=RuntimeError("embedding down"))
+    pipeline = IngestionPipeline(broken, mock_vector_store)
+    with pytest.raises(RuntimeError, match="embedding down"):
+        await pipeline.run(tmp_path)
+    mock_vector_store.upsert.assert_not_called()
+
+
+class InMemoryStore:
+    def __init__(self):
+        self.points: dict[str, dict] = {}
+        self.upserts = 0
+
+    async def upsert(self, vectors, payloads):
+        self.upserts += len(payloads)
+        for p in payloads:
+            self.points[chunk_id(p["source"], p["text"])] = p
+
+    async def delete_by_source(self, source, keep_ids=None):
+        keep = set(keep_ids or ())
+        for pid, p in list(self.points.items()):
+            if p["source"] == source and pid not in keep:
+                del self.points[pid]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_incremental_reingest(tmp_path, mock_embedding):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    a, b = docs / "a.txt", docs / "b.txt"
+    a.write_text("Alpha one. Alpha two.")
+    b.write_text("Beta one. Beta two.")
+    store = InMemoryStore()
+    manifest = FileManifest(tmp_path / "manifest.sqlite", namespace="test")
+
+    def make_pipeline():
+        pipeline = IngestionPipeline(mock_embedding, store, manifest=manifest)
+        pipeline.chunker = SmartChunker(chunk_size=12, overlap=0)
+        return pipeline
+
+    assert await make_pipeline().run(docs) == 4
+    # Unchanged files are skipped without re-embedding or re-upserting.
+    embeds = mock_embedding.embed.await_count
+    assert await make_pipeline().run(docs) == 0
+    assert mock_embedding.embed.await_count == embeds
+
+    # Modified file: stale chunk removed, nothing duplicated.
+    a.write_text("Alpha one. Alpha three.")
+    assert await make_pipeline().run(docs) == 2
+    texts = sorted(p["text"] for p in store.points.values())
+    assert texts == ["Alpha one.", "Alpha three.", "Beta one.", "Beta two."]
+
+    # Removed file: its chunks and manifest entry are dropped.
+    b.unlink()
+    await make_pipeline().run(docs)
+    assert {p["source"] for p in store.points.values()} == {str(a)}
+    assert manifest.get(str(b)) is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_touched_file_not_reembedded(tmp_path, mock_embedding):
+    f = tmp_path / "doc.txt"
+    f.write_text("Same content.")
+    store = InMemoryStore()
+    manifest = FileManifest(tmp_path / "manifest.sqlite")
+    assert await IngestionPipeline(mock_embedding, store, manifest=manifest).run(f) == 1
+    f.write_text("Same content.")
+    stat = f.stat()
+    os.utime(f, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert await IngestionPipeline(mock_embedding, store, manifest=manifest).run(f) == 0
+    assert manifest.get(str(f)).mtime_ns == f.stat().st_mtime_ns
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_pages_and_offsets(tmp_path, mock_embedding):
+    path = tmp_path / "doc.pdf"
+    make_pdf(path, pages=3, lines_per_page=4)
+    store = InMemoryStore()
+    pipeline = IngestionPipeline(mock_embedding, store)
+    pipeline.chunker = SmartChunker(chunk_size=200, overlap=0)
+    await pipeline.run(path)
+    payloads = sorted(store.points.values(), key=lambda p: p["chunk_index"])
+    assert {p["page"] for p in payloads} == {1, 2, 3}
+    for p in payloads:
+        assert p["text"].startswith(f"Page {p['page'] - 1} line")
+    offsets = [p["char_offset"] for p in payloads]
+    assert offsets == sorted(offsets) and offsets[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_streams_large_files_in_bounded_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, "TEXT_BLOCK_SIZE", 1 << 16)
+    path = tmp_path / "export.log"
+    line = "2024-01-01 12:00:00 INFO request served in 12 ms. Cache hit for key abc.\n"
+    path.write_text(line * 30_000)  # ~2.2 MB
+    monkeypatch.setitem(loaders.STREAM_LOADERS, ".log", loaders.stream_text)
+
+    class Embedding:  # not a mock, which would keep every call's texts
+        async def embed(self, texts):
+            return [[0.1] * 4 for _ in texts]
+
+    class CountingStore:
+        chunks = 0
+
+        async def upsert(self, vectors, payloads):
+            self.chunks += len(payloads)
+
+    store = CountingStore()
+    pipeline = IngestionPipeline(Embedding(), store, batch_size=16)
+    pipeline.chunker = SmartChunker(chunk_size=512, overlap=50)
+    tracemalloc.start()
+    try:
+        n = await pipeline.run(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert n == store.chunks > 2_500
+    # Bounded by the queues, not the file: loading it whole would take several times its size.
+    assert peak < path.stat().st_size / 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_file_failing_mid_stream(tmp_path, mock_embedding, monkeypatch):
+    (tmp_path / "bad.txt").write_text("unused")
+    (tmp_path / "good.txt").write_text("Good one. Good two.")
+
+    def failing(path):
+        if path.name == "bad.txt":
+            yield loaders.TextBlock("First sentence. Second sentence. ")
+            raise OSError("disk error")
+        yield from loaders.stream_text(path)
+
+    monkeypatch.setitem(loaders.STREAM_LOADERS, ".txt", failing)
+    store = InMemoryStore()
+    manifest = FileManifest(tmp_path / "manifest.sqlite")
+    pipeline = IngestionPipeline(mock_embedding, store, manifest=manifest)
+    await pipeline.run(tmp_path)
+    assert pipeline.progress.files_done == 1
+    assert manifest.get(str(tmp_path / "good.txt")) is not None
+    # Not recorded, so the next run reads it again.
+    assert manifest.get(str(tmp_path / "bad.txt")) is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_removes_chunks_of_file_failing_after_upserts(tmp_path, mock_embedding, monkeypatch):
+    bad, good = tmp_path / "bad.txt", tmp_path / "good.txt"
+    bad.write_text("Old one. Old two.")
+    good.write_text("Good one. Good two.")
+    store = InMemoryStore()
+    manifest = FileManifest(tmp_path / "manifest.sqlite")
+
+    def make_pipeline():
+        pipeline = IngestionPipeline(mock_embedding, store, batch_size=2, queue_size=1, manifest=manifest)
+        pipeline.chunker = SmartChunker(chunk_size=12, overlap=0)
+        return pipeline
+
+    await make_pipeline().run(tmp_path)
+    upserted = asyncio.Event()
+    upsert = store.upsert
+
+    async def recording_upsert(vectors, payloads):
+        await upsert(vectors, payloads)
+        if any(p["source"] == str(bad) for p in payloads):
+            upserted.set()
+
+    monkeypatch.setattr(store, "upsert", recording_upsert)
+    loop = asyncio.get_running_loop()
+
+    def failing(path):
+        if path != bad:
+            yield from loaders.stream_text(path)
+            return
+        for i in range(4):
+            yield loaders.TextBlock(f"New {i}a. New {i}b. ")
+        # Fails only after some of its chunks are in the store and more are queued.
+        asyncio.run_coroutine_threadsafe(upserted.wait(), loop).result(5)
+        for i in range(4, 12):
+            yield loaders.TextBlock(f"New {i}a. New {i}b. ")
+        raise OSError("disk error")
+
+    monkeypatch.setitem(loaders.STREAM_LOADERS, ".txt", failing)
+    bad.write_text("changed")
+    pipeline = make_pipeline()
+    n = await pipeline.run(tmp_path)
+    assert upserted.is_set()
+    assert n == 0 and pipeline.progress.files_done == 0
+    assert not [p for p in store.points.values() if p["source"] == str(bad)]
+    assert {p["text"] for p in store.points.values()} == {"Good one.", "Good two."}
+    # Forgotten, so the next run reads it again.
+    assert manifest.get(str(bad)) is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_ingestion_closes_the_file_being_read(tmp_path, monkeypatch):
+    path = tmp_path / "big.txt"
+    path.write_text("A sentence of text. " * 5_000)
+    streams = []
+
+    def tracking(p):
+        streams.append(loaders.stream_text(p, block_size=256))
+        return streams[-1]
+
+    monkeypatch.setitem(loaders.STREAM_LOADERS, ".txt", tracking)
+    embedding_started = asyncio.Event()
+
+    class StuckEmbedding:
+        async def embed(self, texts):
+            embedding_started.set()
+            await asyncio.Event().wait()
+
+    pipeline = IngestionPipeline(StuckEmbedding(), InMemoryStore(), batch_size=4, queue_size=1)
+    pipeline.chunker = SmartChunker(chunk_size=64, overlap=0)
+    task = asyncio.ensure_future(pipeline.run(path))
+    await embedding_started.wait()
+    await asyncio.sleep(0.05)  # let the reader fill the queues
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    for _ in range(100):
+        if streams[0].gi_frame is None:
+            break
+        await asyncio.sleep(0.01)
+    # Closed generator: its memory map and file have been released.
+    assert streams[0].gi_frame is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bumps_collection_version_on_writes(tmp_path, mock_embedding, mock_vector_store):
+    (tmp_path / "doc.txt").write_text("First sentence. Second sentence.")
+    marker = CollectionVersion(tmp_path / "versions" / "docs")
+    pipeline = IngestionPipeline(mock_embedding, mock_vector_store, collection_version=marker)
+    assert marker.current() is None
+    await pipeline.run(tmp_path / "doc.txt")
+    first = marker.current()
+    assert first is not None
+    await pipeline.run(tmp_path / "doc.txt")
+    assert marker.current() != first
@@ -0,0 +1,238 @@
+import asyncio
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from core.collection_version import CollectionVersion
+from core.llm.base import BaseLLM
+from core.rag_service import RAGService
+from core.semantic_cache import SemanticCache
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    async def generate(self, prompt: str) -> str:
+        return "".join(self.tokens)
+
+    async def stream(self, prompt: str):
+        for t in self.tokens:
+            yield t
+
+
+@pytest.fixture
+def mock_retriever():
+    m = MagicMock()
+    docs = [
+        MagicMock(payload={"text": "chunk one", "source": "a.txt"}, score=0.9, id="1"),
+        MagicMock(payload={"text": "chunk two", "source": "b.txt"}, score=0.8, id="2"),
+    ]
+    m.retrieve = AsyncMock(return_value=docs)
+    return m
+
+
+@pytest.mark.asyncio
+async def test_answer_returns_answer_and_sources(mock_retriever):
+    service = RAGService(mock_retriever, FakeLLM(["Hello", " world"]), top_k=2)
+    result = await service.answer("question?")
+    assert result["answer"] == "Hello world"
+    assert len(result["sources"]) == 2
+    mock_retriever.retrieve.assert_awaited_once_with("question?", k=2)
+
+
+@pytest.mark.asyncio
+async def test_answer_stream_emits_sources_first_then_tokens(mock_retriever):
+    service = RAGService(mock_retriever, FakeLLM(["Hel", "lo"]), top_k=2)
+    events = [e async for e in service.answer_stream("question?")]
+    assert [e["type"] for e in events] == ["sources", "token", "token", "done"]
+    assert len(events[0]["sources"]) == 2
+    assert "".join(e["token"] for e in events if e["type"] == "token") == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_base_llm_stream_falls_back_to_generate():
+    class OneShotLLM(BaseLLM):
+        async def generate(self, prompt: str) -> str:
+            return "full answer"
+
+    chunks = [c async for c in OneShotLLM().stream("p")]
+    assert chunks == ["full answer"]
+
+
+class CountingLLM(FakeLLM):
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        return await super().generate(prompt)
+
+    async def stream(self, prompt: str):
+        self.calls += 1
+        async for t in super().stream(prompt):
+            yield t
+
+
+class TableEmbedding:
+    """Maps known queries to fixed vectors so similarity is controlled by the test."""
+
+    VECTORS = {
+        "what is qdrant?": [1.0, 0.0, 0.0],
+        "what's qdrant?": [0.99, 0.05, 0.0],
+        "how do i bake bread?": [0.0, 1.0, 0.0],
+    }
+
+    async def embed(self, texts):
+        return [self.VECTORS[t.lower()] for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_reuses_answer_for_similar_query(mock_retriever):
+    llm = CountingLLM(["cached"])
+    store = MagicMock(version=0)
+    cache = SemanticCache(TableEmbedding(), store, threshold=0.95)
+    service = RAGService(mock_retriever, llm, top_k=2, cache=cache)
+    first = await service.answer("What is Qdrant?")
+    second = await service.answer("What's Qdrant?")
+    assert second["answer"] == first["answer"] == "cached"
+    assert llm.calls == 1
+    await service.answer("How do I bake bread?")
+    assert llm.calls == 2
+    assert cache.stats == {"hits": 1, "misses": 2}
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_invalidated_by_collection_write(mock_retriever):
+    llm = CountingLLM(["answer"])
+    store = MagicMock(version=0)
+    service = RAGService(mock_retriever, llm, top_k=2, cache=SemanticCache(TableEmbedding(), store))
+    await service.answer("What is Qdrant?")
+    store.version = 1
+    await service.answer("What is Qdrant?")
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_invalidated_by_ingestion_in_another_process(mock_retriever, tmp_path):
+    llm = CountingLLM(["answer"])
+    marker = CollectionVersion(tmp_path / "versions" / "docs")
+    cache = SemanticCache(TableEmbedding(), MagicMock(version=0), collection_version=marker)
+    service = RAGService(mock_retriever, llm, top_k=2, cache=cache)
+    await service.answer("What is Qdrant?")
+    await service.answer("What is Qdrant?")
+    assert llm.calls == 1
+    # The in-process store version is unchanged; only the shared marker moves.
+    bump = f"from core.collection_version import CollectionVersion; CollectionVersion({str(marker.path)!r}).bump()"
+    subprocess.run([sys.executable, "-c", bump], check=True)
+    await service.answer("What is Qdrant?")
+    assert llm.calls == 2
+    await service.answer("What is Qdrant?")
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_ttl_and_max_entries(mock_retriever):
+    llm = CountingLLM(["answer"])
+    cache = SemanticCache(TableEmbedding(), None, ttl_seconds=1e-9)
+    service = RAGService(mock_retriever, llm, top_k=2, cache=cache)
+    await service.answer("What is Qdrant?")
+    await service.answer("What is Qdrant?")
+    assert llm.calls == 2
+    bounded = SemanticCache(TableEmbedding(), None, max_entries=1)
+    service = RAGService(mock_retriever, llm, top_k=2, cache=bounded)
+    await service.answer("What is Qdrant?")
+    await service.answer("How do I bake bread?")
+    assert len(bounded) == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_stream_populates_and_hits_cache(mock_retriever):
+    llm = CountingLLM(["Hel", "lo"])
+    service = RAGService(mock_retriever, llm, top_k=2, cache=SemanticCache(TableEmbedding(), None))
+    first = [e async for e in service.answer_stream("What is Qdrant?")]
+    second = [e async for e in service.answer_stream("What is Qdrant?")]
+    assert llm.calls == 1
+    assert [e["type"] for e in second] == ["sources", "token", "done"]
+    assert second[1]["token"] == "Hello"
+    assert len(second[0]["sources"]) == len(first[0]["sources"])
+
+
+class SlowLLM(BaseLLM):
+    """Answers after a per-prompt delay and records peak concurrency; fails prompts containing 'boom'."""
+
+    def __init__(self, delays: dict[str, float]):
+        self.delays = delays
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str) -> str:
+        query = prompt.rsplit("Question:", 1)[-1].strip()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(next((d for q, d in self.delays.items() if q in prompt), 0.0))
+            if "boom" in prompt:
+                raise RuntimeError("generation failed")
+            return f"answer:{query}"
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def batch_retriever():
+    m = MagicMock()
+
+    async def retrieve_batch(queries, k):
+        return [[MagicMock(payload={"text": f"about {q}", "source": "s.txt"}, score=1.0, id=q)] for q in queries]
+
+    m.retrieve_batch = AsyncMock(side_effect=retrieve_batch)
+    async def retrieve(query, k):
+        return (await retrieve_batch([query], k))[0]
+
+    m.retrieve = AsyncMock(side_effect=retrieve)
+    return m
+
+
+@pytest.mark.asyncio
+async def test_answer_batch_streams_results_as_they_complete(batch_retriever):
+    llm = SlowLLM({"slow": 0.2, "fast": 0.0, "mid": 0.05, "boom": 0.0})
+    service = RAGService(batch_retriever, llm, top_k=3)
+    queries = ["slow", "fast", "mid", "boom"]
+    results = [r async for r in service.answer_batch(queries, concurrency=2)]
+    batch_retriever.retrieve_batch.assert_awaited_once_with(queries, k=3)
+    assert [r["index"] for r in results][-1] == 0  # the slow one arrives last
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    assert llm.max_in_flight <= 2
+    by_query = {r["query"]: r for r in results}
+    assert by_query["boom"]["answer"] is None and by_query["boom"]["error"] == "generation failed"
+    assert by_query["fast"]["answer"] == "answer:fast"
+    assert by_query["fast"]["sources"][0].id == "fast"
+
+
+@pytest.mark.asyncio
+async def test_answer_batch_retrieval_only_skips_generation(batch_retriever):
+    llm = CountingLLM(["unused"])
+    service = RAGService(batch_retriever, llm, top_k=1)
+    results = [r async for r in service.answer_batch(["a", "b"], retrieval_only=True)]
+    assert [r["index"] for r in results] == [0, 1]
+    assert all(r["answer"] is None and len(r["sources"]) == 1 for r in results)
+    assert llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_answer_batch_uses_cache_with_one_embed_call(batch_retriever):
+    embedding = TableEmbedding()
+    embedding.embed = AsyncMock(side_effect=TableEmbedding().embed)
+    llm = CountingLLM(["answer"])
+    service = RAGService(batch_retriever, llm, top_k=1, cache=SemanticCache(embedding, None))
+    await service.answer("What is Qdrant?")
+    embedding.embed.reset_mock()
+    results = [r async for r in service.answer_batch(["What's Qdrant?", "How do I bake bread?"])]
+    assert embedding.embed.await_count == 1
+    assert results[0]["index"] == 0 and results[0]["answer"] == "answer"
+    assert llm.calls == 2
+    batch_retriever.retrieve_batch.assert_awaited_once_with(["How do I bake bread?"], k=1)
@@ -0,0 +1,90 @@
+import multiprocessing
+
+import pytest
+
+from core.rate_limit import MemoryRateLimiter, SQLiteRateLimiter
+
+def _key(i: int) -> str:
+    return f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_limiter(request, tmp_path):
+    def make(rate, burst=0, **kwargs):
+        if request.param == "memory":
+            return MemoryRateLimiter(rate, burst=burst, **kwargs)
+        kwargs.setdefault("cleanup_every", 10)
+        return SQLiteRateLimiter(tmp_path / "limits.sqlite", rate, burst=burst, **kwargs)
+
+    return make
+
+
+def test_burst_then_steady_rate(make_limiter):
+    limiter = make_limiter(60, burst=3)
+    assert [limiter.hit("a", now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit("a", now=100.0) == pytest.approx(1.0)
+    assert limiter.hit("b", now=100.0) == 0.0
+    # One request per second refills.
+    assert limiter.hit("a", now=101.0) == 0.0
+    assert limiter.hit("a", now=101.5) == pytest.approx(0.5)
+    assert [limiter.hit("a", now=200.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_default_burst_matches_per_minute_limit(make_limiter):
+    limiter = make_limiter(5)
+    assert sum(limiter.hit("k", now=0.0) == 0.0 for _ in range(10)) == 5
+
+
+def test_idle_keys_are_evicted(make_limiter):
+    limiter = make_limiter(60, burst=2)
+    for i in range(100):
+        limiter.hit(f"old-{i}", now=0.0)
+    for i in range(100):
+        limiter.hit(f"new-{i}", now=60.0)
+    assert 100 <= len(limiter) < 200
+
+
+def test_memory_limiter_caps_tracked_keys():
+    limiter = MemoryRateLimiter(60, max_keys=50)
+    for i in range(1000):
+        limiter.hit(str(i), now=0.0)
+    assert len(limiter) == 50
+
+
+def _hammer(path: str, key: str, hits: int, results) -> None:
+    limiter = SQLiteRateLimiter(path, 60, burst=10)
+    results.put(sum(limiter.hit(key, now=1000.0) == 0.0 for _ in range(hits)))
+    limiter.close()
+
+
+def test_sqlite_limit_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    SQLiteRateLimiter(path, 60).close()
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_hammer, args=(path, "client", 25, results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    allowed = sum(results.get(timeout=60) for _ in procs)
+    for p in procs:
+        p.join()
+    assert allowed == 10
+
+
+def test_memory_limiter_replaces_an_idle_wave_of_clients():
+    limiter = MemoryRateLimiter(60, max_keys=20_000)
+    keys = [_key(i) for i in range(10_000)]
+    for key in keys:
+        limiter.hit(key, now=0.0)
+    assert len(limiter) == 10_000
+    # A second wave of distinct clients a minute later replaces the idle first wave.
+    for key in keys:
+        limiter.hit("x" + key, now=120.0)
+    assert len(limiter) == 10_000
+    assert all(limiter.hit("x" + key, now=120.0) == 0.0 for key in keys[:10])
+
+
+def test_memory_limiter_with_no_key_budget():
+    limiter = MemoryRateLimiter(60, max_keys=0)
+    assert [limiter.hit("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert len(limiter) == 0
@@ -0,0 +1,80 @@
+import random
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from core.retriever.reranker import BM25Reranker, KeywordReranker, _rrf_merge
+from core.retriever.tokens import TOKEN_IDS, token_stats
+
+# Shared with scripts/bench_reranker.py, which times these previous implementations.
+_WORDS = [f"w{i}" for i in range(2000)] + ["error", "e1234", "disk", "cache", "timeout", "retry"]
+
+QUERY = "disk cache error E1234 retry after timeout w17 w17"
+
+
+def corpus(n: int, words_per_doc: int = 300, seed: int = 0, precomputed: bool = True) -> list:
+    # ~300 words of ~5 chars is roughly a 2 KB chunk.
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        text = " ".join(rng.choice(_WORDS) for _ in range(words_per_doc))
+        payload = {"text": text, **(token_stats(text) if precomputed else {})}
+        docs.append(SimpleNamespace(id=str(i), score=rng.random(), payload=payload))
+    return docs
+
+
+def legacy_keyword(query: str, docs: list, top_k: int) -> list:
+    q = set(re.findall(r"\b\w+\b", query.lower()))
+    scored = []
+    for doc in docs:
+        d = set(re.findall(r"\b\w+\b", doc.payload["text"].lower()))
+        scored.append((0.7 * doc.score + 0.3 * (len(q & d) / len(q) * 2.0), doc))
+    scored.sort(key=lambda x: -x[0])
+    return [doc for _, doc in scored[:top_k]]
+
+
+def legacy_bm25(query: str, docs: list, top_k: int) -> list:
+    tokenized = [re.findall(r"\b\w+\b", d.payload["text"].lower()) for d in docs]
+    scores = BM25Okapi(tokenized).get_scores(re.findall(r"\b\w+\b", query.lower()))
+    return _rrf_merge(docs, [d.score for d in docs], scores.tolist(), top_k)
+
+
+def test_bm25_scores_match_rank_bm25():
+    docs = corpus(50, words_per_doc=40)
+    tokenized = [re.findall(r"\b\w+\b", d.payload["text"].lower()) for d in docs]
+    expected = BM25Okapi(tokenized).get_scores(re.findall(r"\b\w+\b", QUERY.lower()))
+    np.testing.assert_allclose(BM25Reranker().scores(QUERY, docs), expected)
+    assert [d.id for d in BM25Reranker().rerank(QUERY, docs, 10)] == [d.id for d in legacy_bm25(QUERY, docs, 10)]
+
+
+def test_keyword_reranker_matches_set_overlap():
+    docs = corpus(50, words_per_doc=40)
+    assert [d.id for d in KeywordReranker().rerank(QUERY, docs, 10)] == [
+        d.id for d in legacy_keyword(QUERY, docs, 10)
+    ]
+
+
+def test_rerankers_use_stored_stats_and_fall_back_to_text():
+    stored = SimpleNamespace(id="a", score=0.1, payload={"text": "", **token_stats("disk cache")})
+    legacy = SimpleNamespace(id="b", score=0.1, payload={"text": "disk"})
+    assert TOKEN_IDS not in legacy.payload
+    assert [d.id for d in KeywordReranker().rerank("disk cache", [legacy, stored], 2)] == ["a", "b"]
+    assert BM25Reranker().rerank("anything", [], 5) == []
+
+
+@pytest.mark.parametrize("query", ["", "?!"])
+def test_keyword_reranker_without_query_terms_follows_vector_score(query):
+    docs = [SimpleNamespace(id=i, score=score, payload={"text": "disk cache"}) for i, score in zip("abc", (0.2, 0.9, 0.5))]
+    np.testing.assert_allclose(KeywordReranker().scores(query, docs), [0.14, 0.63, 0.35])
+    assert [d.id for d in KeywordReranker().rerank(query, docs, 3)] == ["b", "c", "a"]
+
+
+@pytest.mark.parametrize("k", [20, 100, 500])
+def test_rankings_match_previous_implementations_at_candidate_set_sizes(k):
+    # Stored stats and re-tokenized text rank the same; scripts/bench_reranker.py times both.
+    docs, raw = corpus(k), corpus(k, precomputed=False)
+    assert [d.id for d in KeywordReranker().rerank(QUERY, docs, 10)] == [d.id for d in legacy_keyword(QUERY, raw, 10)]
+    assert [d.id for d in BM25Reranker().rerank(QUERY, docs, 10)] == [d.id for d in legacy_bm25(QUERY, raw, 10)]
@@ -2,6 +2,8 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from core.retriever.base import ScoredDoc
+from core.retriever.hybrid import HybridRetriever
 from core.retriever.vector import VectorRetriever
 
 
@@ -39,3 +41,56 @@ async def test_retriever_returns_store_results(mock_embedding, mock_vector_store
     call_k = mock_vector_store.search.call_args[1].get("k") or mock_vector_store.search.call_args[0][1]
     if mock_vector_store.search.call_args[0][0] is not None:
         assert mock_vector_store.search.call_args[1].get("k") == 2
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retriever_fuses_vector_and_sparse(mock_embedding):
+    vector_store = MagicMock()
+    vector_store.search = AsyncMock(return_value=[
+        ScoredDoc(id="v1", score=0.9, payload={"text": "semantic match"}),
+        ScoredDoc(id="both", score=0.8, payload={"text": "error E1234"}),
+    ])
+    sparse = MagicMock()
+    # The BM25 index returns only the source; payloads come from the vector store.
+    sparse.search = MagicMock(return_value=[
+        ScoredDoc(id="both", score=7.0, payload={"source": "errors.md"}),
+        ScoredDoc(id="s1", score=3.0, payload={"source": "appendix.md"}),
+        ScoredDoc(id="gone", score=2.0, payload={"source": "old.md"}),
+    ])
+    vector_store.payloads = AsyncMock(return_value={"s1": {"text": "E1234 appendix", "source": "appendix.md"}})
+    retriever = HybridRetriever(VectorRetriever(mock_embedding, vector_store), sparse, candidate_k=10)
+    results = await retriever.retrieve("E1234", k=4)
+    # "gone" was deleted from the vector store after BM25 indexed it.
+    assert [d.id for d in results] == ["both", "v1", "s1"]
+    # Fused RRF scores: a doc only one list returned gets nothing from the other.
+    assert [d.score for d in results] == pytest.approx([1 / 61 + 1 / 60, 1 / 60, 1 / 61])
+    assert results[0].payload == {"text": "error E1234"}
+    assert results[2].payload == {"text": "E1234 appendix", "source": "appendix.md"}
+    assert sorted(vector_store.payloads.call_args[0][0]) == ["gone", "s1"]
+    sparse.search.assert_called_once_with("E1234", 10)
+    assert vector_store.search.call_args[1]["k"] == 10
+
+
+@pytest.mark.asyncio
+async def test_vector_retrieve_batch_embeds_and_searches_once(tmp_path):
+    from db.vector.local import LocalVectorStore
+
+    embedding = MagicMock()
+    embedding.embed = AsyncMock(return_value=[[1.0, 0.0], [0.0, 1.0]])
+    store = LocalVectorStore("batch", path=tmp_path)
+    store.ensure_collection(vector_size=2)
+    await store.upsert([[1.0, 0.1], [0.1, 1.0]], [{"text": "x"}, {"text": "y"}], ids=["x", "y"])
+    results = await VectorRetriever(embedding, store).retrieve_batch(["q1", "q2"], k=1)
+    embedding.embed.assert_awaited_once_with(["q1", "q2"])
+    assert [[d.id for d in hits] for hits in results] == [["x"], ["y"]]
+
+
+@pytest.mark.asyncio
+async def test_local_store_payloads_by_id(tmp_path):
+    from db.vector.local import LocalVectorStore
+
+    store = LocalVectorStore("payloads", path=tmp_path)
+    store.ensure_collection(vector_size=2)
+    await store.upsert([[1.0, 0.0], [0.0, 1.0]], [{"text": "x"}, {"text": "y"}], ids=["x", "y"])
+    assert await store.payloads(["y", "missing"]) == {"y": {"text": "y"}}
+    assert await store.payloads([]) == {}
@@ -0,0 +1,158 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from core.llm.base import BaseLLM
+from core.rag_service import RAGService
+from core.retriever.vector import VectorRetriever
+from core.singleflight import SingleFlight
+
+
+class SlowLLM(BaseLLM):
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return "answer"
+
+    async def stream(self, prompt: str):
+        self.calls += 1
+        for token in ("a", "b", "c"):
+            await self.release.wait()
+            yield token
+
+
+@pytest.fixture
+def retriever():
+    m = MagicMock()
+    m.retrieve = AsyncMock(return_value=[MagicMock(payload={"text": "chunk", "source": "a.txt"}, score=1.0, id="1")])
+    return m
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_answers_run_once(retriever):
+    llm = SlowLLM()
+    service = RAGService(retriever, llm, top_k=1, single_flight=SingleFlight())
+    tasks = [asyncio.create_task(service.answer(q)) for q in ("What is X?", "what  is x?", "What is X?")]
+    await asyncio.sleep(0.01)
+    llm.release.set()
+    results = await asyncio.gather(*tasks)
+    assert [r["answer"] for r in results] == ["answer"] * 3
+    assert llm.calls == 1 and retriever.retrieve.await_count == 1
+    assert service.single_flight.stats == {"started": 1, "coalesced": 2}
+    assert len(service.single_flight) == 0
+    # Finished flights are not cached.
+    await service.answer("What is X?")
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await release.wait()
+        return 42
+
+    first = asyncio.create_task(flight.do("k", work))
+    second = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await second == 42
+    assert first.cancelled() and runs == 1
+
+
+@pytest.mark.asyncio
+async def test_work_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    tasks = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(flight) == 0
+
+    async def quick():
+        return "fresh"
+
+    assert await flight.do("k", quick) == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight()
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        if attempts == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    results = await asyncio.gather(flight.do("k", flaky), flight.do("k", flaky), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results) and attempts == 1
+    assert await flight.do("k", flaky) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_stream_fan_out_with_late_joiner_and_disconnect(retriever):
+    llm = SlowLLM()
+    service = RAGService(retriever, llm, top_k=1, single_flight=SingleFlight())
+
+    async def collect(stop_after: int | None = None):
+        events = []
+        async for event in service.answer_stream("question"):
+            events.append(event)
+            if stop_after is not None and len(events) == stop_after:
+                break
+        return events
+
+    early = asyncio.create_task(collect())
+    leaver = asyncio.create_task(collect(stop_after=1))
+    await asyncio.sleep(0.01)
+    assert len(await leaver) == 1
+    late = asyncio.create_task(collect())
+    await asyncio.sleep(0.01)
+    llm.release.set()
+    first, second = await early, await late
+    assert first == second
+    assert [e["type"] for e in first] == ["sources", "token", "token", "token", "done"]
+    assert llm.calls == 1 and retriever.retrieve.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_vector_retriever_coalesces_embed_and_search():
+    embedding = MagicMock()
+
+    async def embed(texts):
+        await asyncio.sleep(0.01)
+        return [[1.0, 0.0] for _ in texts]
+
+    embedding.embed = AsyncMock(side_effect=embed)
+    store = MagicMock()
+    store.search = AsyncMock(return_value=["hit"])
+    retriever = VectorRetriever(embedding, store, single_flight=SingleFlight())
+    results = await asyncio.gather(retriever.retrieve("q", k=3), retriever.retrieve(" Q ", k=3), retriever.retrieve("q", k=5))
+    assert results == [["hit"]] * 3
+    assert embedding.embed.await_count == 2 and store.search.await_count == 2
@@ -0,0 +1,149 @@
+import math
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.retriever.tokens import tokenize
+from db.sparse.bm25 import BM25Index
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = BM25Index(tmp_path / "bm25.sqlite")
+    idx.add(
+        ["p1", "p2", "p3"],
+        [
+            {"text": "Error E1234 occurs when the disk is full", "source": "errors.md"},
+            {"text": "The disk cache speeds up reads", "source": "cache.md"},
+            {"text": "Part number PN-99812 ships with the kit", "source": "parts.md"},
+        ],
+    )
+    return idx
+
+
+def test_exact_term_lookup(index):
+    hits = index.search("what does E1234 mean", k=3)
+    assert hits[0].id == "p1"
+    assert hits[0].payload["source"] == "errors.md"
+    assert index.search("pn 99812", k=1)[0].id == "p3"
+    assert index.search("nonexistentterm", k=3) == []
+
+
+def test_scores_use_corpus_statistics(index):
+    # "disk" appears in 2 of 3 docs, "cache" in 1: a corpus-wide rare term scores higher.
+    [hit] = index.search("cache", k=1)
+    n, df = 3, 1
+    idf = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+    length, avg = 6, (8 + 6 + 8) / 3
+    expected = idf * (1 * 2.5) / (1 + 1.5 * (1 - 0.75 + 0.75 * length / avg))
+    assert hit.score == pytest.approx(expected)
+
+
+def test_incremental_replace_and_delete(index, tmp_path):
+    index.add(["p2"], [{"text": "Completely new wording", "source": "cache.md"}])
+    assert len(index) == 3
+    assert index.search("cache reads", k=3) == []
+    index.delete_by_source("errors.md")
+    assert len(index) == 2
+    assert index.search("E1234", k=3) == []
+    index.delete_by_source("parts.md", keep_ids={"p3"})
+    assert index.search("PN-99812", k=1)[0].id == "p3"
+    index.close()
+    reopened = BM25Index(tmp_path / "bm25.sqlite")
+    assert len(reopened) == 2
+    assert reopened.search("wording", k=1)[0].id == "p2"
+
+
+def _brute_force(index, query, k):
+    conn = index._reader()
+    n, total = index._stat(conn, "doc_count"), index._stat(conn, "total_length")
+    scores = {}
+    for term in set(tokenize(query)):
+        row = conn.execute("SELECT id, df FROM terms WHERE term = ?", (term,)).fetchone()
+        if not row or not row[1]:
+            continue
+        idf = math.log((n - row[1] + 0.5) / (row[1] + 0.5) + 1.0)
+        for point_id, tf, length in conn.execute(
+            "SELECT d.point_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term_id = ?",
+            (row[0],),
+        ):
+            norm = 1.5 * (1 - 0.75 + 0.75 * length / (total / n))
+            scores[point_id] = scores.get(point_id, 0.0) + idf * tf * 2.5 / (tf + norm)
+    return sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+
+
+def test_pruned_search_matches_exhaustive_scoring(tmp_path):
+    rng = random.Random(0)
+    common = ["the", "error", "disk", "and", "of"]
+    rare = [f"code{i}" for i in range(40)]
+    index = BM25Index(tmp_path / "bm25.sqlite")
+    texts = [" ".join(rng.choices(common, k=20) + rng.choices(rare, k=rng.randint(0, 3))) for _ in range(600)]
+    index.add([f"p{i}" for i in range(len(texts))], [{"text": t} for t in texts])
+    scanned = []
+    index._reader().set_trace_callback(lambda sql: scanned.append(sql) if "postings" in sql and " IN " not in sql else None)
+    for query in ("the error code7", "code3 code12 of", "disk", "code39 and the error disk of"):
+        exact = dict(_brute_force(index, query, len(texts)))
+        got = [(d.id, d.score) for d in index.search(query, k=5)]
+        # Same scores as exhaustive scoring, and the best five (ties may come in either order).
+        assert [s for _, s in got] == pytest.approx([exact[i] for i, _ in got])
+        assert [s for _, s in got] == pytest.approx(sorted(exact.values(), reverse=True)[:5])
+    # Rare terms decided the top 5 of the first query; the common terms' full lists were skipped.
+    scanned.clear()
+    index.search("code7 the error of", k=5)
+    assert len(scanned) == 1
+
+
+def test_batch_add_counts_each_document_once(tmp_path):
+    index = BM25Index(tmp_path / "bm25.sqlite")
+    index.add(["a", "b", "a"], [{"text": "one two"}, {"text": "two"}, {"text": "two three"}])
+    assert len(index) == 2
+    assert index.search("one", k=3) == []
+    assert [d.id for d in index.search("three", k=3)] == ["a"]
+    conn = index._reader()
+    assert conn.execute("SELECT df FROM terms WHERE term = 'two'").fetchone()[0] == 2
+    assert index._stat(conn, "total_length") == 3
+
+
+def test_search_does_not_wait_for_writers(index):
+    with index._lock:  # a long add or delete in another thread
+        with ThreadPoolExecutor(1) as pool:
+            hits = pool.submit(index.search, "E1234", 1).result(timeout=5)
+    assert hits[0].id == "p1"
+
+
+def test_opens_an_index_written_before_postings_stored_lengths(tmp_path):
+    path = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, df INTEGER NOT NULL);
+        CREATE TABLE docs (id INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE, source TEXT,
+                           length INTEGER NOT NULL, payload TEXT NOT NULL);
+        CREATE TABLE postings (term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+                               PRIMARY KEY (term_id, doc_id)) WITHOUT ROWID;
+        CREATE TABLE stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        INSERT INTO stats VALUES ('doc_count', 1), ('total_length', 2);
+        INSERT INTO terms VALUES (1, 'legacy', 1), (2, 'doc', 1);
+        INSERT INTO docs VALUES (1, 'old', NULL, 2, '{"text": "legacy doc"}');
+        INSERT INTO postings VALUES (1, 1, 1), (2, 1, 1);
+        """
+    )
+    conn.close()
+    [hit] = BM25Index(path).search("legacy", k=1)
+    assert hit.id == "old" and hit.score > 0
+    # The copy of the payload is dropped; the vector store has it.
+    assert "payload" not in {row[1] for row in sqlite3.connect(path).execute("PRAGMA table_info(docs)")}
+
+
+def test_index_stores_no_chunk_text(tmp_path):
+    path = tmp_path / "bm25.sqlite"
+    index = BM25Index(path)
+    index.add(["p1"], [{"text": "alpha beta gamma delta", "source": "a.md", "token_ids": "c3RhdHNibG9i"}])
+    [hit] = index.search("gamma", k=1)
+    assert hit.payload == {"source": "a.md"}
+    index.close()
+    # Terms are interned one by one; neither the text nor the token stats are kept.
+    data = path.read_bytes()
+    assert b"alpha beta" not in data and b"c3RhdHNibG9i" not in data
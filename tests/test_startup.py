@@ -0,0 +1,113 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.dependencies import Container, get_rag_service
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("sentence_transformers", "torch", "onnxruntime", "qdrant_client", "openai")
+
+
+class FakeEmbedding:
+    def __init__(self):
+        self.warmed = False
+
+    def warmup(self):
+        self.warmed = True
+
+    async def embed(self, texts):
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts]
+
+
+def _settings(tmp_path, **overrides) -> Settings:
+    values = dict(
+        vector_store_backend="local",
+        local_vector_path=str(tmp_path / "vectors"),
+        embedding_dim=4,
+        embedding_disk_cache_path="",
+        ingest_manifest_path=str(tmp_path / "manifest.sqlite"),
+        ingest_job_store_path=str(tmp_path / "jobs.sqlite"),
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def test_importing_the_app_defers_heavy_packages():
+    code = f"import json, sys, app.main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_components_are_built_on_first_access(tmp_path):
+    container = Container(_settings(tmp_path))
+    assert not container.built("vector_store")
+    store = container.vector_store
+    assert container.vector_store is store
+    assert container.built("vector_store") and not container.built("llm")
+
+
+@pytest.mark.asyncio
+async def test_warmup_reports_readiness(tmp_path):
+    container = Container(_settings(tmp_path))
+    fake = FakeEmbedding()
+    container.__dict__["base_embedding"] = fake
+    await container.warmup()
+    assert container.readiness == {"embedding": "ok", "query_path": "ok"}
+    assert fake.warmed and container.built("rag_service")
+    await container.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_warmup_step_is_reported_and_retried_on_next_access(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    container = Container(_settings(tmp_path, local_vector_path=str(blocker / "vectors")))
+    container.__dict__["base_embedding"] = FakeEmbedding()
+    await container.warmup()
+    assert container.readiness["embedding"] == "ok"
+    assert container.readiness["query_path"] != "ok"
+    assert not container.built("vector_store")
+    blocker.unlink()
+    assert container.vector_store is not None
+
+
+def test_ready_endpoint_and_route_dependency_override():
+    from app.dependencies import container
+    from app.main import app
+
+    class FakeService:
+        async def answer(self, query):
+            return {"answer": f"echo {query}", "sources": [], "usage": None}
+
+    app.dependency_overrides[get_rag_service] = FakeService
+    saved = dict(container.readiness)
+    try:
+        client = TestClient(app)
+        container.readiness.update(embedding="pending")
+        assert client.get("/ready").status_code == 503
+        container.readiness.update(embedding="ok")
+        container.readiness.pop("query_path", None)
+        assert client.get("/ready").json()["status"] == "ready"
+        assert client.post("/query/", json={"query": "hi"}).json()["answer"] == "echo hi"
+    finally:
+        app.dependency_overrides.clear()
+        container.readiness.clear()
+        container.readiness.update(saved)
+
+
+def test_onnx_embedding_cache_key_follows_the_exported_model(tmp_path):
+    export = tmp_path / "onnx"
+    export.mkdir()
+    (export / "pooling.json").write_text(json.dumps({"model_name": "BAAI/bge-base-en", "pooling": "cls"}))
+    settings = dict(embedding_provider="onnx", embedding_model_name="BAAI/bge-small-en", onnx_model_path=str(export))
+    # Not the configured model name: its PyTorch vectors are cached under that.
+    assert Container(_settings(tmp_path, **settings))._embedding_cache_key() == "BAAI/bge-base-en:onnx-int8"
+    unquantized = Container(_settings(tmp_path, onnx_quantized=False, **settings))
+    assert unquantized._embedding_cache_key() == "BAAI/bge-base-en:onnx"
+    missing = Container(_settings(tmp_path, **{**settings, "onnx_model_path": str(tmp_path / "none")}))
+    assert missing._embedding_cache_key() == f"{tmp_path / 'none'}:onnx-int8"
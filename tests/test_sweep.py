@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from core.embeddings.cache import CachedEmbedding, MemoryEmbeddingCache
+from evaluation.loadtest import StandInEmbedding, synthetic_corpus
+from evaluation import sweep
+from evaluation.metrics import mrr_at_k, ndcg_at_k, ranking_metrics, recall_at_k, relevance_matrix
+from evaluation.sweep import SweepConfig, config_grid, format_table, load_cases, mark_pareto, run_sweep
+from evaluation.test_queries import TestCase as Case
+
+
+class _CountingEmbedding(StandInEmbedding):
+    def __init__(self):
+        super().__init__(dim=16)
+        self.texts = 0
+
+    async def embed(self, texts):
+        self.texts += len(texts)
+        return await super().embed(texts)
+
+
+def test_vectorized_metrics_match_per_query_functions():
+    docs = [{"source": f"doc{i}.txt", "text": f"text {i}"} for i in range(6)]
+    results = [docs[:5], docs[1:6], docs[3:], []]
+    cases = [Case("a", "doc2"), Case("b", "doc0"), Case("c", "doc", "text 5"), Case("d", "doc1")]
+    metrics = ranking_metrics(relevance_matrix(results, cases, 5))
+    for name, fn in (("recall_at_k", recall_at_k), ("mrr_at_k", mrr_at_k), ("ndcg_at_k", ndcg_at_k)):
+        scalar = [float(fn(r, c.expected_source_substr, c.expected_phrase_in_text, k=5)) for r, c in zip(results, cases)]
+        assert metrics[name] == pytest.approx(sum(scalar) / len(scalar))
+
+
+def test_config_grid_drops_meaningless_combinations():
+    configs = config_grid(
+        chunk_size=[100, 200], chunk_overlap=[0, 150], reranker_type=["none", "bm25"], rerank_initial_k=[10, 20]
+    )
+    # overlap 150 >= size 100 is skipped; "none" ignores rerank_initial_k.
+    assert len(configs) == 3 * (1 + 2)
+    assert len({c.index_key for c in configs}) == 3
+    with pytest.raises(ValueError):
+        config_grid(chunk_sise=[100])
+
+
+def test_mark_pareto():
+    rows = [
+        {"ndcg_at_k": 0.9, "p95_ms": 5.0, "index_bytes": 100},
+        {"ndcg_at_k": 0.8, "p95_ms": 1.0, "index_bytes": 100},
+        {"ndcg_at_k": 0.8, "p95_ms": 2.0, "index_bytes": 100},
+        {"ndcg_at_k": 0.5, "p95_ms": 1.0, "index_bytes": 50},
+    ]
+    assert [r["pareto"] for r in mark_pareto(rows)] == [True, True, False, True]
+
+
+def test_load_cases(tmp_path):
+    path = tmp_path / "cases.jsonl"
+    path.write_text(
+        json.dumps({"query": "q1", "expected_source_substr": "a.md"})
+        + "\n\n"
+        + json.dumps({"query": "q2", "expected_source_substr": "b.md", "expected_phrase_in_text": "x"})
+        + "\n"
+    )
+    assert load_cases(path) == [Case("q1", "a.md"), Case("q2", "b.md", "x")]
+
+
+@pytest.mark.asyncio
+async def test_sweep_embeds_each_unique_chunk_once(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    for i, text in enumerate(synthetic_corpus(8, seed=3)):
+        (source / f"doc{i}.txt").write_text(text)
+    cases = [Case(" ".join(text.split()[:4]), f"doc{i}.txt") for i, text in enumerate(synthetic_corpus(8, seed=3))]
+    # Every document fits in one chunk at both sizes, so the two chunkings share all their texts.
+    configs = config_grid(chunk_size=[4000, 8000], chunk_overlap=[0], reranker_type=["none", "bm25"])
+    inner = _CountingEmbedding()
+    embedding = CachedEmbedding(inner, "stand-in", memory=MemoryEmbeddingCache(ttl_seconds=0))
+
+    rows = await run_sweep(embedding, source, configs, cases, k=3, concurrency=2, latency_queries=4, workdir=tmp_path)
+
+    assert [r["label"] for r in rows] == [c.label for c in configs]
+    assert inner.texts == 8 + len(cases)
+    assert all(r["chunks"] == 8 and r["recall_at_k"] > 0 for r in rows)
+    # Identical chunks give identical indexes, so the same quality.
+    assert rows[0]["ndcg_at_k"] == rows[2]["ndcg_at_k"] and rows[1]["ndcg_at_k"] == rows[3]["ndcg_at_k"]
+    assert all(r["index_bytes"] == 8 * 16 * 4 for r in rows)
+    assert any(r["pareto"] for r in rows)
+    # A second run over the same embedding is served from its cache.
+    await run_sweep(embedding, source, configs[:1], cases, k=3, workdir=tmp_path)
+    assert inner.texts == 8 + len(cases)
+    assert "smart/4000/0 bm25@20" in format_table(rows)
+
+
+@pytest.mark.asyncio
+async def test_sweep_times_latency_after_all_quality_passes(tmp_path, monkeypatch):
+    source = tmp_path / "docs"
+    source.mkdir()
+    for i, text in enumerate(synthetic_corpus(6, seed=4)):
+        (source / f"doc{i}.txt").write_text(text)
+    cases = [Case(" ".join(text.split()[:4]), f"doc{i}.txt") for i, text in enumerate(synthetic_corpus(6, seed=4))]
+    events = []
+    evaluate, latencies = sweep._evaluate, sweep._latencies
+
+    async def tracked_evaluate(*args):
+        events.append("quality")
+        await asyncio.sleep(0.01)
+        return await evaluate(*args)
+
+    async def tracked_latencies(*args):
+        events.append("latency start")
+        result = await latencies(*args)
+        events.append("latency end")
+        return result
+
+    monkeypatch.setattr(sweep, "_evaluate", tracked_evaluate)
+    monkeypatch.setattr(sweep, "_latencies", tracked_latencies)
+    configs = config_grid(chunk_size=[200, 400, 800], chunk_overlap=[0], reranker_type=["none", "bm25"])
+    rows = await run_sweep(StandInEmbedding(dim=16), source, configs, cases, k=3, concurrency=4, workdir=tmp_path)
+    assert events == ["quality"] * len(configs) + ["latency start", "latency end"] * len(configs)
+    assert all(r["p95_ms"] >= r["p50_ms"] > 0 for r in rows)
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import grpc
+import pytest
+
+from core.chunking.base import chunk_id
+from db.vector.qdrant import QdrantVectorStore
+from db.vector.quantization import QuantizationConfig
+
+
+class SlowAsyncClient:
+    """Stands in for AsyncQdrantClient: every call takes `delay` seconds of I/O wait."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.upserted = []
+
+    async def search(self, collection_name, query_vector, limit, search_params=None):
+        self.search_params = search_params
+        self.query_vector = query_vector
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return [{"collection": collection_name, "limit": limit}]
+
+    async def upsert(self, collection_name, points):
+        self.upserted.extend(points)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def store():
+    return QdrantVectorStore(collection_name="test", host="localhost", port=6333, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_are_not_serialized(store):
+    fake = SlowAsyncClient(delay=0.1)
+    store._async_clients[asyncio.get_running_loop()] = fake
+    n = 10
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(store.search([0.0] * 4, k=3) for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    assert len(results) == n
+    assert fake.max_in_flight == n
+    # Serialized calls would take n * delay = 1.0 s.
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_upsert_builds_points(store):
+    fake = SlowAsyncClient(delay=0)
+    store._async_clients[asyncio.get_running_loop()] = fake
+    await store.upsert([[0.1] * 4, [0.2] * 4], [{"text": "a"}, {"text": "b"}])
+    assert [p.payload["text"] for p in fake.upserted] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_ids_are_deterministic(store):
+    fake = SlowAsyncClient(delay=0)
+    store._async_clients[asyncio.get_running_loop()] = fake
+    payloads = [{"text": "a", "source": "x.txt"}, {"text": "b", "source": "x.txt"}]
+    await store.upsert([[0.1] * 4] * 2, payloads)
+    await store.upsert([[0.1] * 4] * 2, payloads)
+    ids = [p.id for p in fake.upserted]
+    assert ids[:2] == ids[2:]
+    assert ids[0] != ids[1]
+    assert ids[0] == chunk_id("x.txt", "a")
+
+
+@pytest.mark.asyncio
+async def test_async_client_reused_per_loop(store):
+    assert store.aclient is store.aclient
+    await store.aclose()
+
+
+@pytest.mark.asyncio
+async def test_quantized_collection_config_and_rescoring_search():
+    store = QdrantVectorStore(
+        collection_name="test",
+        timeout=1,
+        quantization=QuantizationConfig(mode="binary", truncate_dim=2, on_disk=True, oversampling=3.0),
+    )
+    store.client = MagicMock()
+    store.create_collection(vector_size=4)
+    params = store.client.recreate_collection.call_args.kwargs["vectors_config"]
+    assert params.size == 2 and params.on_disk is True
+    assert params.quantization_config.binary.always_ram is True
+
+    fake = SlowAsyncClient(delay=0)
+    store._async_clients[asyncio.get_running_loop()] = fake
+    await store.search([0.1, 0.2, 0.3, 0.4], k=5)
+    assert fake.query_vector == pytest.approx([0.1, 0.2])
+    assert fake.search_params.quantization.rescore is True
+    assert fake.search_params.quantization.oversampling == 3.0
+    await store.upsert([[1.0, 2.0, 3.0, 4.0]], [{"text": "t", "source": "s"}])
+    assert fake.upserted[0].vector == pytest.approx([1.0, 2.0])
+
+
+class MissingCollectionsStub:
+    """The gRPC collections service of a Qdrant with no collections."""
+
+    class NotFound(grpc.RpcError):
+        def code(self):
+            return grpc.StatusCode.NOT_FOUND
+
+    def Get(self, request, timeout=None):
+        raise self.NotFound()
+
+    def CollectionExists(self, request, timeout=None):
+        return SimpleNamespace(result=SimpleNamespace(exists=False))
+
+
+@pytest.mark.parametrize("exists", [False, True])
+def test_ensure_collection_over_grpc(exists):
+    store = QdrantVectorStore(collection_name="test", prefer_grpc=True, timeout=1)
+    stub = MissingCollectionsStub()
+    if exists:
+        stub.CollectionExists = lambda request, timeout=None: SimpleNamespace(result=SimpleNamespace(exists=True))
+    store.client._client._grpc_collections_client = stub
+    store.create_collection = MagicMock()
+    store.ensure_collection(vector_size=4)
+    assert store.create_collection.called is not exists
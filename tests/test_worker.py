@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from ingestion.pipeline import IngestProgress
+from ingestion.worker import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, IngestionJobManager, JobStore
+
+
+class FakePipeline:
+    def __init__(self, duration: float = 0.0, fail: bool = False):
+        self.duration = duration
+        self.fail = fail
+        self.progress = IngestProgress()
+
+    async def run(self, source):
+        self.progress.files_discovered = 3
+        steps = 10
+        for _ in range(steps):
+            await asyncio.sleep(self.duration / steps)
+            self.progress.chunks += 5
+        if self.fail:
+            raise RuntimeError("bad file")
+        self.progress.files_done = 3
+        return self.progress.chunks
+
+
+def _wait_for(manager, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {manager.get(job_id).status}")
+
+
+def test_job_runs_in_background_and_reports_progress(tmp_path):
+    manager = IngestionJobManager(JobStore(tmp_path / "jobs.sqlite"), lambda: FakePipeline(0.05), progress_interval=0.01)
+    manager.start()
+    try:
+        job = manager.submit(str(tmp_path))
+        assert job.status == QUEUED
+        done = _wait_for(manager, job.id, {COMPLETED})
+    finally:
+        manager.stop()
+    data = done.to_dict()
+    assert data["chunks"] == 50
+    assert data["files_done"] == 3
+    assert data["chunks_per_sec"] > 0
+
+
+def test_failed_job_records_error(tmp_path):
+    manager = IngestionJobManager(JobStore(tmp_path / "jobs.sqlite"), lambda: FakePipeline(fail=True))
+    manager.start()
+    try:
+        job = _wait_for(manager, manager.submit("x").id, {FAILED})
+    finally:
+        manager.stop()
+    assert job.error == "bad file"
+
+
+def test_cancel_running_and_queued_jobs(tmp_path):
+    manager = IngestionJobManager(JobStore(tmp_path / "jobs.sqlite"), lambda: FakePipeline(5.0), workers=1)
+    manager.start()
+    try:
+        first = manager.submit("a")
+        second = manager.submit("b")
+        _wait_for(manager, first.id, {RUNNING})
+        assert manager.cancel(second.id).status == CANCELLED
+        manager.cancel(first.id)
+        job = _wait_for(manager, first.id, {CANCELLED})
+        # The worker skips the queued one and forgets both cancel requests.
+        deadline = time.monotonic() + 5
+        while (manager._cancel_requested or not manager._queue.empty()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager._cancel_requested == set()
+    finally:
+        manager.stop()
+    assert job.finished_at is not None
+    assert manager.get(second.id).status == CANCELLED
+
+
+def test_jobs_survive_restart(tmp_path):
+    store_path = tmp_path / "jobs.sqlite"
+    manager = IngestionJobManager(JobStore(store_path), lambda: FakePipeline(5.0))
+    manager.start()
+    job = manager.submit("a")
+    _wait_for(manager, job.id, {RUNNING})
+    manager.stop()
+    assert manager.get(job.id).status == QUEUED
+
+    restarted = IngestionJobManager(JobStore(store_path), lambda: FakePipeline(0.01))
+    restarted.start()
+    try:
+        assert _wait_for(restarted, job.id, {COMPLETED}).chunks == 50
+    finally:
+        restarted.stop()